@@ -1,15 +1,30 @@
 import streamlit as st
 import pandas as pd
-import gspread
-from google.oauth2.service_account import Credentials
 from datetime import datetime, timedelta
-import plotly.express as px
-import plotly.graph_objects as go
 import numpy as np
 from typing import Dict, List, Optional, Tuple
+from contextlib import closing, contextmanager, nullcontext
+from itertools import zip_longest
+import functools
+import hashlib
+import html
+import inspect
 import io
 import json
+import os
 import re
+import sqlite3
+import sys
+import threading
+import time
+
+# Dependensi berat (gspread/google-auth, plotly, pyarrow) di-import di dalam
+# fungsi yang memakainya: hanya saat cache miss / halaman yang butuh grafik.
+
+try:
+    import fcntl
+except ImportError:  # Windows: lock antar proses tidak tersedia
+    fcntl = None
 
 # ================================
 # KONFIGURASI HALAMAN
@@ -21,6 +36,1181 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# ================================
+# KONFIGURASI OPSIONAL
+# ================================
+def baca_konfigurasi(nama: str, default=None):
+    """
+    Ambil konfigurasi dari env var PBG_<NAMA>, lalu st.secrets["<nama>"],
+    lalu default. Semua fitur opsional membaca lewat fungsi ini.
+    """
+    nilai = os.environ.get(f"PBG_{nama.upper()}")
+    if nilai is not None:
+        return nilai
+    try:
+        return st.secrets.get(nama.lower(), default)
+    except Exception:
+        return default
+
+# ================================
+# PENYIMPANAN SQL (opsional, offline)
+# ================================
+class PenyimpananSQL:
+    """
+    Salinan ramping frame siap pakai dalam file SQLite lokal, ber-index
+    untuk pencarian, rentang tanggal, hitungan bulanan dan statistik.
+    Query hanya mengembalikan posisi baris / agregat yang dibutuhkan.
+
+    Tiap versi data punya tabel sendiri (permohonan_<hash versi>), jadi
+    posisi baris selalu cocok dengan frame versi yang dipakai sesi itu,
+    walau proses lain sudah memuat versi yang lebih baru ke file yang sama.
+    """
+
+    KOLOM_CARI = ["NO. REGISTRASI", "NAMA PEMOHON", "PEMROSES", "SURVEY SUBKO", "PENILAI TEKNIS TPT/TPA"]
+    SIMPAN_VERSI = 3
+
+    def __init__(self, path: str, versi: str):
+        self.path = path
+        self.versi = versi
+        self.tabel = f"permohonan_{hashlib.sha1(versi.encode('utf-8')).hexdigest()[:16]}"
+
+    def _koneksi(self):
+        # Satu koneksi per query: sesi Streamlit berjalan di thread berbeda
+        return sqlite3.connect(self.path, timeout=30)
+
+    def ada(self) -> bool:
+        """Tabel versi ini sudah lengkap di file"""
+        try:
+            with closing(self._koneksi()) as con:
+                baris = con.execute("SELECT 1 FROM tabel_versi WHERE tabel = ?", (self.tabel,)).fetchone()
+            return baris is not None
+        except sqlite3.Error:
+            return False
+
+    def muat(self, df, kolom_retribusi: Optional[str]):
+        """
+        Tulis tabel versi ini dari frame siap pakai (dilewati jika sudah ada).
+        Diisi ke tabel sementara lalu di-rename, jadi tabel yang terlihat
+        selalu lengkap; tabel versi lama di luar SIMPAN_VERSI terbaru dibuang.
+        """
+        if self.ada():
+            return
+
+        n = len(df)
+        tgl = df["TGL REGISTRASI"] if "TGL REGISTRASI" in df.columns else pd.Series(pd.NaT, index=df.index)
+        ada_tgl = tgl.notna()
+        data = pd.DataFrame({
+            "pos": np.arange(n, dtype="int64"),
+            "status": df["STATUS"].astype(str) if "STATUS" in df.columns else "",
+            "tgl": pd.Series(tgl.to_numpy(dtype="datetime64[ns]").view("int64"), index=df.index).where(ada_tgl),
+            "tahun": tgl.dt.year.where(ada_tgl),
+            "bulan": tgl.dt.to_period("M").astype(str).where(ada_tgl),
+            "retribusi": df[kolom_retribusi].astype("int64") if kolom_retribusi else 0,
+        })
+        for i, kolom in enumerate(self.KOLOM_CARI):
+            if kolom in df.columns:
+                data[f"cari{i}"] = df[kolom].astype(str).str.lower()
+            else:
+                data[f"cari{i}"] = None
+
+        sementara = f"{self.tabel}_{os.getpid()}_{threading.get_ident()}"
+        with closing(self._koneksi()) as con:
+            with con:
+                con.execute("CREATE TABLE IF NOT EXISTS tabel_versi (tabel TEXT PRIMARY KEY, versi TEXT, dibuat REAL)")
+                con.execute(f'DROP TABLE IF EXISTS "{sementara}"')
+            data.to_sql(sementara, con, index=False)
+            with con:
+                con.execute(f'CREATE INDEX "{sementara}_tgl" ON "{sementara}" (tgl)')
+                con.execute(f'CREATE INDEX "{sementara}_status" ON "{sementara}" (status)')
+                con.execute(f'CREATE INDEX "{sementara}_tahun_bulan" ON "{sementara}" (tahun, bulan, status)')
+            with con:
+                # Proses lain bisa lebih dulu selesai memuat versi yang sama
+                if con.execute("SELECT 1 FROM tabel_versi WHERE tabel = ?", (self.tabel,)).fetchone():
+                    con.execute(f'DROP TABLE "{sementara}"')
+                else:
+                    con.execute(f'ALTER TABLE "{sementara}" RENAME TO "{self.tabel}"')
+                    con.execute("INSERT INTO tabel_versi VALUES (?, ?, ?)", (self.tabel, self.versi, time.time()))
+                lama = con.execute(
+                    "SELECT tabel FROM tabel_versi ORDER BY dibuat DESC LIMIT -1 OFFSET ?", (self.SIMPAN_VERSI,)
+                ).fetchall()
+                for (tabel,) in lama:
+                    con.execute(f'DROP TABLE IF EXISTS "{tabel}"')
+                    con.execute("DELETE FROM tabel_versi WHERE tabel = ?", (tabel,))
+
+    def _posisi(self, sql: str, params) -> np.ndarray:
+        with closing(self._koneksi()) as con:
+            baris = con.execute(sql, params).fetchall()
+        return np.fromiter((b[0] for b in baris), dtype="int64", count=len(baris))
+
+    def cari(self, kolom: str, kata_kunci: str, status_list: List[str]) -> np.ndarray:
+        """Posisi baris yang kolomnya memuat kata kunci (tanpa beda huruf besar/kecil)"""
+        syarat, params = [], []
+        if kata_kunci.strip():
+            syarat.append(f"instr(cari{self.KOLOM_CARI.index(kolom)}, ?) > 0")
+            params.append(kata_kunci.lower())
+        if status_list:
+            syarat.append(f"status IN ({','.join('?' * len(status_list))})")
+            params.extend(status_list)
+        where = f"WHERE {' AND '.join(syarat)}" if syarat else ""
+        return self._posisi(f"SELECT pos FROM {self.tabel} {where} ORDER BY pos", params)
+
+    def rentang_tanggal(self, start, end) -> np.ndarray:
+        """Posisi baris dengan TGL REGISTRASI di antara start dan end (inklusif)"""
+        return self._posisi(
+            f"SELECT pos FROM {self.tabel} WHERE tgl BETWEEN ? AND ? ORDER BY pos",
+            (pd.Timestamp(start).value, pd.Timestamp(end).value)
+        )
+
+    def hitung_bulanan(self, tahun: Optional[int]):
+        """Jumlah permohonan per bulan per STATUS"""
+        sql = f"SELECT bulan AS Bulan, status AS STATUS, COUNT(*) AS Jumlah FROM {self.tabel} WHERE tgl IS NOT NULL"
+        params = []
+        if tahun is not None:
+            sql += " AND tahun = ?"
+            params.append(int(tahun))
+        sql += " GROUP BY bulan, status ORDER BY bulan, status"
+        with closing(self._koneksi()) as con:
+            return pd.read_sql_query(sql, con, params=params)
+
+    def hitung_status(self) -> Dict[str, int]:
+        """Jumlah baris per STATUS"""
+        with closing(self._koneksi()) as con:
+            return dict(con.execute(f"SELECT status, COUNT(*) FROM {self.tabel} GROUP BY status").fetchall())
+
+    def total_retribusi(self, tahun: Optional[int]) -> int:
+        """Jumlah retribusi baris bertanggal registrasi, opsional per tahun"""
+        sql = f"SELECT COALESCE(SUM(retribusi), 0) FROM {self.tabel} WHERE tgl IS NOT NULL"
+        params = []
+        if tahun is not None:
+            sql += " AND tahun = ?"
+            params.append(int(tahun))
+        with closing(self._koneksi()) as con:
+            return int(con.execute(sql, params).fetchone()[0])
+
+# ================================
+# CACHE BERSAMA LINTAS PROSES (opsional)
+# ================================
+class CacheDisk:
+    """
+    Cache frame siap pakai di disk (Arrow IPC) untuk beberapa proses/replika
+    Streamlit di satu mesin. File terkini.json menunjuk versi data terbaru;
+    lock file memastikan hanya satu proses yang mengambil data dari Sheets
+    saat versi itu basi, proses lain menunggu lalu membaca file yang sama
+    lewat memory map. Kolom frame menunjuk langsung ke halaman file (lihat
+    baca), jadi N proses berbagi satu salinan frame di page cache; yang
+    tetap per proses hanya turunan seperti matriks tanggal dan kolom SOP.
+
+    Satu versi disimpan utuh (<versi>.arrow) atau dipartisi per tahun
+    registrasi (<versi>.json berisi {tahun: hash}, isi di partisi/<hash>.arrow
+    + ringkasan partisi/<hash>.json). Partisi dengan hash sama dipakai ulang
+    antar versi, jadi tahun lama yang tidak berubah tidak disiapkan ulang.
+    """
+
+    def __init__(self, direktori: str, ttl: float = 300, simpan_versi: int = 3):
+        self.direktori = direktori
+        self.ttl = ttl
+        self.simpan_versi = simpan_versi
+        self._kunci_thread = threading.Lock()
+        os.makedirs(direktori, exist_ok=True)
+
+    def _path(self, nama: str) -> str:
+        return os.path.join(self.direktori, nama)
+
+    @contextmanager
+    def kunci(self, nama: str = "fetch"):
+        """Lock eksklusif antar proses (fcntl); tanpa fcntl hanya antar thread"""
+        with self._kunci_thread, open(self._path(f"{nama}.lock"), "a+") as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _baca_penunjuk(self) -> Optional[Dict]:
+        try:
+            with open(self._path("terkini.json"), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _masih_segar(self, penunjuk: Optional[Dict], tata: Optional[str] = None) -> bool:
+        return (
+            penunjuk is not None
+            and time.time() - penunjuk.get("waktu", 0) < penunjuk.get("interval", self.ttl)
+            and self.ada(penunjuk["versi"], tata)
+        )
+
+    def interval_terkini(self) -> float:
+        """Interval refresh yang sedang berlaku (dari terkini.json)"""
+        return (self._baca_penunjuk() or {}).get("interval", self.ttl)
+
+    def ada(self, versi: str, tata: Optional[str] = None) -> bool:
+        """Apakah versi ini sudah tersimpan dalam tata letak `tata` ("utuh"/"partisi"; None = salah satu)"""
+        utuh = tata != "partisi" and os.path.exists(self._path(f"{versi}.arrow"))
+        return utuh or (tata != "utuh" and os.path.exists(self._path(f"{versi}.json")))
+
+    def versi_terkini(self, tulis_versi, atur_interval=None, tata: Optional[str] = None) -> str:
+        """
+        Versi data terbaru. Jika basi, satu proses memanggil tulis_versi(cache)
+        yang mengambil data, menyimpannya lewat cache ini, lalu mengembalikan versinya.
+        Versi yang belum tersimpan dalam tata letak `tata` dianggap basi (mis.
+        partisi_tahun baru dinyalakan pada cache_dir yang berisi versi utuh).
+        """
+        penunjuk = self._baca_penunjuk()
+        if self._masih_segar(penunjuk, tata):
+            return penunjuk["versi"]
+
+        with self.kunci():
+            # Cek ulang: proses lain mungkin baru saja selesai
+            penunjuk = self._baca_penunjuk()
+            if self._masih_segar(penunjuk, tata):
+                return penunjuk["versi"]
+
+            versi = tulis_versi(self)
+            lama = penunjuk or {}
+            interval = self.ttl
+            if atur_interval is not None:
+                # Interval berikutnya dibagi semua proses lewat terkini.json
+                interval = atur_interval(versi, lama.get("versi"), lama.get("interval", self.ttl))
+            isi = {"versi": versi, "waktu": time.time(), "interval": interval}
+            self._tulis_atomik("terkini.json", json.dumps(isi).encode("utf-8"))
+            self._buang_versi_lama(versi)
+            return versi
+
+    def _tulis_atomik(self, nama: str, isi: bytes):
+        tmp = self._path(f"{nama}.{os.getpid()}.tmp")
+        with open(tmp, "wb") as f:
+            f.write(isi)
+        os.replace(tmp, self._path(nama))
+
+    def simpan(self, nama: str, df):
+        """
+        Tulis frame ke <nama>.arrow (atomik). Kolom tanggal (NaT), bool dan
+        category disimpan sebagai array angka polos tanpa null (int64 dengan
+        NaT, uint8, kode category + daftar kategori di metadata) agar baca()
+        bisa memakainya langsung dari map tanpa salinan.
+        """
+        import pyarrow as pa
+        import pyarrow.ipc
+
+        polos = {"waktu": {}, "bool": [], "kategori": {}}
+        kolom = {}
+        for k in df.columns:
+            s = df[k]
+            if s.dtype.kind == "M":
+                polos["waktu"][k] = str(s.dtype)
+                kolom[k] = s.to_numpy().view("int64")
+            elif s.dtype == bool:
+                polos["bool"].append(k)
+                kolom[k] = s.to_numpy().view("uint8")
+            elif isinstance(s.dtype, pd.CategoricalDtype) and s.cat.categories.inferred_type == "string":
+                polos["kategori"][k] = [str(c) for c in s.cat.categories]
+                kolom[k] = s.cat.codes.to_numpy()
+            else:
+                kolom[k] = s
+        tabel = pa.Table.from_pandas(pd.DataFrame(kolom, index=df.index), preserve_index=True)
+        tabel = tabel.replace_schema_metadata({
+            **(tabel.schema.metadata or {}), b"pbg_polos": json.dumps(polos).encode("utf-8")
+        })
+        tmp = self._path(f"{nama}.arrow.{os.getpid()}.tmp")
+        with pa.OSFile(tmp, "wb") as sink, pa.ipc.new_file(sink, tabel.schema) as writer:
+            writer.write_table(tabel)
+        os.replace(tmp, self._path(f"{nama}.arrow"))
+
+    def baca(self, nama: str):
+        """
+        Baca <nama>.arrow lewat memory map. Kolom angka/tanggal/bool/kode
+        category tanpa null dan kolom teks (string pyarrow) menunjuk langsung
+        ke halaman file, jadi dibagi antar proses lewat page cache; hanya
+        kolom nullable (mis. TOTAL HARI) dan daftar kategori yang disalin.
+        """
+        import pyarrow as pa
+        import pyarrow.ipc
+
+        # Map tidak ditutup manual: buffer hasil to_pandas masih merujuk ke sana
+        source = pa.memory_map(self._path(f"{nama}.arrow"), "r")
+        tabel = pa.ipc.open_file(source).read_all()
+        # split_blocks: satu blok per kolom, tanpa konsolidasi yang menyalin
+        df = tabel.to_pandas(split_blocks=True)
+        polos = json.loads((tabel.schema.metadata or {}).get(b"pbg_polos", b"{}"))
+        kolom = {}
+        for k in df.columns:
+            if k in polos.get("waktu", {}):
+                kolom[k] = df[k].to_numpy().view(polos["waktu"][k])
+            elif k in polos.get("bool", []):
+                kolom[k] = df[k].to_numpy().view(bool)
+            elif k in polos.get("kategori", {}):
+                kolom[k] = pd.Categorical.from_codes(
+                    df[k].to_numpy(), categories=polos["kategori"][k], validate=False
+                )
+            else:
+                kolom[k] = df[k]
+        return pd.DataFrame(kolom, index=df.index, copy=False)
+
+    def simpan_partisi(self, versi: str, partisi: Dict[str, str], siapkan_partisi):
+        """
+        Simpan versi terpartisi. partisi = {tahun: hash isi mentah};
+        siapkan_partisi(tahun) -> (df, ringkasan) hanya dipanggil untuk hash
+        yang belum ada di disk.
+        """
+        os.makedirs(self._path("partisi"), exist_ok=True)
+        for tahun, kode in partisi.items():
+            if os.path.exists(self._path(f"partisi/{kode}.arrow")):
+                continue
+            df, ringkasan = siapkan_partisi(tahun)
+            self.simpan(f"partisi/{kode}", df)
+            self._tulis_atomik(f"partisi/{kode}.json", json.dumps(ringkasan).encode("utf-8"))
+        self._tulis_atomik(f"{versi}.json", json.dumps(partisi).encode("utf-8"))
+
+    def baca_manifest(self, versi: str) -> Dict[str, str]:
+        """{tahun: hash partisi} untuk versi terpartisi"""
+        with open(self._path(f"{versi}.json"), encoding="utf-8") as f:
+            return json.load(f)
+
+    def baca_ringkasan(self, kode: str) -> Dict:
+        """Ringkasan kecil satu partisi (hitungan status, bulanan, retribusi, ...)"""
+        with open(self._path(f"partisi/{kode}.json"), encoding="utf-8") as f:
+            return json.load(f)
+
+    def _buang_versi_lama(self, versi_terkini: str):
+        file_versi = sorted(
+            (f for f in os.listdir(self.direktori) if f.endswith((".arrow", ".json")) and f != "terkini.json"),
+            key=lambda f: os.path.getmtime(self._path(f)),
+            reverse=True
+        )
+        simpan = file_versi[: self.simpan_versi]
+        for f in file_versi[self.simpan_versi:]:
+            if not f.startswith(f"{versi_terkini}."):
+                try:
+                    os.remove(self._path(f))
+                except OSError:
+                    pass
+
+        # Partisi yang tidak dirujuk versi mana pun ikut dibuang
+        if not os.path.isdir(self._path("partisi")):
+            return
+        dipakai = set()
+        for f in simpan + [f"{versi_terkini}.json"]:
+            if f.endswith(".json") and os.path.exists(self._path(f)):
+                dipakai.update(self.baca_manifest(f[: -len(".json")]).values())
+        for f in os.listdir(self._path("partisi")):
+            if f.split(".")[0] not in dipakai:
+                try:
+                    os.remove(self._path(f"partisi/{f}"))
+                except OSError:
+                    pass
+
+# ================================
+# LOG PERUBAHAN ANTAR VERSI DATA
+# ================================
+class LogPerubahan:
+    """
+    Log kejadian append-only (JSON Lines) hasil membandingkan tiap versi data
+    baru dengan versi sebelumnya per NO. REGISTRASI. Versi sebelumnya hanya
+    disimpan sebagai snapshot ringkas (kunci, hash baris, tahap terakhir,
+    STATUS) di <log>.snapshot.arrow; versi yang sudah dicatat ada di
+    <log>.state.json. Lock file mencegah dua proses mencatat versi yang sama.
+    Log yang melewati `batas` byte digeser ke <log>.1 (menimpa yang lama),
+    jadi paling banyak dua file yang dibaca.
+    """
+
+    JENIS = ["baru", "tahap", "selesai", "status", "ubah", "hapus"]
+
+    def __init__(self, path: str, batas: int = 0):
+        self.path = path
+        self.batas = batas
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    def bagian(self) -> List[str]:
+        """File log yang masih ada, terlama dulu"""
+        return [p for p in (f"{self.path}.1", self.path) if os.path.exists(p)]
+
+    @contextmanager
+    def kunci(self):
+        with open(f"{self.path}.lock", "a+") as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def state(self) -> Dict:
+        try:
+            with open(f"{self.path}.state.json", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    @staticmethod
+    def bandingkan(lama, baru, tahapan: List[str]) -> pd.DataFrame:
+        """Kejadian dari dua snapshot (kolom KUNCI, NO, HASH, TAHAP, STATUS)"""
+        gabung = lama.merge(baru, on="KUNCI", how="outer", suffixes=("_LAMA", ""), indicator=True)
+        nama_tahap = np.array(["-"] + tahapan, dtype=object)
+
+        def tahap(kolom):
+            return nama_tahap[gabung[kolom].fillna(-1).astype(int).to_numpy() + 1]
+
+        hanya_baru = (gabung["_merge"] == "right_only").to_numpy()
+        hanya_lama = (gabung["_merge"] == "left_only").to_numpy()
+        berubah = (gabung["_merge"] == "both").to_numpy() & (gabung["HASH"] != gabung["HASH_LAMA"]).to_numpy()
+        tahap_lama, tahap_baru = tahap("TAHAP_LAMA"), tahap("TAHAP")
+        status_lama = gabung["STATUS_LAMA"].astype(object).to_numpy()
+        status_baru = gabung["STATUS"].astype(object).to_numpy()
+        no = gabung["NO"].fillna(gabung["NO_LAMA"]).to_numpy()
+
+        pindah_tahap = berubah & (tahap_lama != tahap_baru)
+        ganti_status = berubah & (status_lama != status_baru)
+        selesai = pindah_tahap & (tahap_baru == tahapan[-1])
+        aturan = [
+            ("baru", hanya_baru, None, status_baru),
+            ("hapus", hanya_lama, status_lama, None),
+            ("selesai", selesai, tahap_lama, tahap_baru),
+            ("tahap", pindah_tahap & ~selesai, tahap_lama, tahap_baru),
+            ("status", ganti_status, status_lama, status_baru),
+            ("ubah", berubah & ~pindah_tahap & ~ganti_status, None, None),
+        ]
+        bagian = [
+            pd.DataFrame({
+                "no": no[mask],
+                "jenis": jenis,
+                "dari": None if dari is None else dari[mask],
+                "ke": None if ke is None else ke[mask],
+            })
+            for jenis, mask, dari, ke in aturan if mask.any()
+        ]
+        if not bagian:
+            return pd.DataFrame(columns=["no", "jenis", "dari", "ke"])
+        return pd.concat(bagian, ignore_index=True)
+
+    def perbarui(self, versi_dasar: str, versi: str, snapshot, tahapan: List[str]) -> int:
+        """
+        Catat kejadian versi baru (sekali per versi di semua proses), lalu ganti
+        snapshot. Versi pertama dan perubahan SOP saja tidak menulis kejadian.
+        Kembalikan jumlah kejadian yang ditulis.
+        """
+        with self.kunci():
+            state = self.state()
+            if state.get("versi") == versi:
+                return 0
+
+            jumlah = 0
+            path_snapshot = f"{self.path}.snapshot.arrow"
+            if state.get("versi_dasar") not in (None, versi_dasar) and os.path.exists(path_snapshot):
+                kejadian = self.bandingkan(pd.read_feather(path_snapshot), snapshot, tahapan)
+                if len(kejadian):
+                    kejadian.insert(0, "versi", versi_dasar)
+                    kejadian.insert(0, "waktu", datetime.now().isoformat(timespec="seconds"))
+                    if self.batas > 0 and os.path.exists(self.path) and os.path.getsize(self.path) > self.batas:
+                        os.replace(self.path, f"{self.path}.1")
+                    with open(self.path, "a", encoding="utf-8") as f:
+                        f.write(kejadian.to_json(orient="records", lines=True, force_ascii=False))
+                jumlah = len(kejadian)
+
+            snapshot.to_feather(f"{path_snapshot}.tmp")
+            os.replace(f"{path_snapshot}.tmp", path_snapshot)
+            state = {"versi": versi, "versi_dasar": versi_dasar}
+            with open(f"{self.path}.state.json.tmp", "w", encoding="utf-8") as f:
+                json.dump(state, f)
+            os.replace(f"{self.path}.state.json.tmp", f"{self.path}.state.json")
+            return jumlah
+
+# ================================
+# METRIK PANGGILAN SHEETS & REFRESH ADAPTIF
+# ================================
+class MetrikSheets:
+    """
+    Penghitung dan histogram latensi tiap jenis panggilan Sheets (auth, open,
+    header, fetch) per proses, serta seberapa sering fetch membawa data baru.
+    Interval refresh menyesuaikan: data berubah -> interval dipersingkat,
+    tidak berubah -> diperpanjang, selalu di antara batas minimum & maksimum.
+    """
+
+    BATAS_MS = [100, 250, 500, 1000, 2500, 5000]
+    FAKTOR_BERUBAH = 0.5
+    FAKTOR_TETAP = 1.5
+
+    def __init__(self, interval_awal: float, interval_min: float, interval_max: float):
+        self.interval_min = interval_min
+        self.interval_max = interval_max
+        self.interval = min(max(interval_awal, interval_min), interval_max)
+        self.panggilan: Dict[str, Dict] = {}
+        self.jumlah_fetch = 0
+        self.jumlah_berubah = 0
+        self.versi_terakhir = None
+        self.fetch_terakhir = None
+        self.giliran = 0
+        self.kunci = threading.Lock()
+
+    @contextmanager
+    def catat(self, jenis: str):
+        """Ukur satu panggilan Sheets; exception tetap diteruskan dan dihitung gagal"""
+        mulai = time.perf_counter()
+        gagal = False
+        try:
+            yield
+        except Exception:
+            gagal = True
+            raise
+        finally:
+            ms = (time.perf_counter() - mulai) * 1000
+            with self.kunci:
+                data = self.panggilan.setdefault(
+                    jenis, {"jumlah": 0, "gagal": 0, "total_ms": 0.0, "histogram": [0] * (len(self.BATAS_MS) + 1)}
+                )
+                data["jumlah"] += 1
+                data["gagal"] += gagal
+                data["total_ms"] += ms
+                data["histogram"][int(np.searchsorted(self.BATAS_MS, ms))] += 1
+
+    def catat_versi(self, versi: str, versi_sebelumnya: Optional[str] = None,
+                    interval: Optional[float] = None) -> float:
+        """
+        Catat hasil satu fetch lalu kembalikan interval refresh berikutnya.
+        Tanpa argumen opsional, pembanding = fetch sebelumnya di proses ini.
+        """
+        with self.kunci:
+            if versi_sebelumnya is None:
+                versi_sebelumnya = self.versi_terakhir
+            if interval is None:
+                interval = self.interval
+            self.jumlah_fetch += 1
+            if versi_sebelumnya is not None:
+                berubah = versi != versi_sebelumnya
+                self.jumlah_berubah += berubah
+                interval *= self.FAKTOR_BERUBAH if berubah else self.FAKTOR_TETAP
+            self.interval = min(max(interval, self.interval_min), self.interval_max)
+            self.versi_terakhir = versi
+            return self.interval
+
+    def giliran_refresh(self) -> int:
+        """
+        Nomor giliran fetch untuk kunci cache: naik satu kali setelah interval
+        lewat, jadi semua sesi dalam proses berbagi satu fetch per giliran.
+        """
+        with self.kunci:
+            sekarang = time.time()
+            if self.fetch_terakhir is None or sekarang - self.fetch_terakhir >= self.interval:
+                self.giliran += 1
+                self.fetch_terakhir = sekarang
+            return self.giliran
+
+    def tabel(self) -> pd.DataFrame:
+        """Ringkasan per jenis panggilan + histogram latensi"""
+        label = [f"≤{b} ms" for b in self.BATAS_MS] + [f">{self.BATAS_MS[-1]} ms"]
+        with self.kunci:
+            baris = [
+                {
+                    "PANGGILAN": jenis,
+                    "JUMLAH": d["jumlah"],
+                    "GAGAL": d["gagal"],
+                    "RATA-RATA (ms)": d["total_ms"] / d["jumlah"],
+                    **dict(zip(label, d["histogram"])),
+                }
+                for jenis, d in self.panggilan.items()
+            ]
+        return pd.DataFrame(baris, columns=["PANGGILAN", "JUMLAH", "GAGAL", "RATA-RATA (ms)"] + label)
+
+# ================================
+# TULIS BALIK STATUS KE SHEET
+# ================================
+class PenulisStatus:
+    """
+    Tulis balik kolom hasil hitung (STATUS, TOTAL HARI) ke worksheet. Hanya
+    sel yang isinya berbeda yang ditulis, dikelompokkan jadi rentang baris
+    berurutan dan dikirim lewat batch_update (bukan per sel), maksimal
+    batas_sel sel per request. Baris dicocokkan per NO. REGISTRASI (+ urutan
+    kemunculan) dengan isi sheet saat menulis, jadi baris yang bergeser
+    setelah fetch tetap kena. Antar request dijeda sesuai kuota per menit.
+
+    Tanpa `timpa` hanya sel kosong dan sel yang masih berisi nilai tulisan
+    aplikasi sebelumnya yang diperbarui; isian manual petugas tidak
+    tertimpa. Nilai yang terakhir ditulis dicatat per worksheet di
+    <direktori>/<hash sheet>.arrow (kunci baris -> nilai per kolom). Sel
+    yang isinya sudah sama dengan hasil hitung ikut dicatat sebagai milik
+    aplikasi, jadi tulisan dari sebelum ada catatan tetap diperbarui.
+    """
+
+    def __init__(self, per_menit: float, batas_sel: int, timpa: bool = False, direktori: Optional[str] = None):
+        self.jeda = 60.0 / per_menit
+        self.batas_sel = max(1, batas_sel)
+        self.timpa = timpa
+        self.direktori = direktori
+        self.terakhir = 0.0
+        self.kunci = threading.Lock()
+
+    def tunggu(self):
+        """Jeda sampai request tulis berikutnya boleh dikirim (dibagi semua sesi di proses)"""
+        with self.kunci:
+            sisa = self.terakhir + self.jeda - time.monotonic()
+            if sisa > 0:
+                time.sleep(sisa)
+            self.terakhir = time.monotonic()
+
+    @staticmethod
+    def kunci_baris(no) -> np.ndarray:
+        """NO. REGISTRASI + '#' + urutan kemunculan (nomor ganda tetap unik)"""
+        no = pd.Series(no, dtype=object).fillna("").astype(str)
+        return (no + "#" + no.groupby(no).cumcount().astype(str)).to_numpy()
+
+    def _path_catatan(self, sheet) -> str:
+        nama = f"{getattr(sheet, 'spreadsheet_id', '')}/{getattr(sheet, 'id', '')}"
+        return os.path.join(self.direktori, f"{hashlib.sha1(nama.encode('utf-8')).hexdigest()[:16]}.arrow")
+
+    def baca_catatan(self, sheet) -> pd.DataFrame:
+        """Nilai yang terakhir ditulis aplikasi ke worksheet ini (indeks = kunci baris)"""
+        if self.direktori is None:
+            return pd.DataFrame()
+        try:
+            return pd.read_feather(self._path_catatan(sheet)).set_index("KUNCI")
+        except (OSError, ValueError, KeyError):
+            return pd.DataFrame()
+
+    def simpan_catatan(self, sheet, catatan: pd.DataFrame):
+        if self.direktori is None:
+            return
+        os.makedirs(self.direktori, exist_ok=True)
+        path = self._path_catatan(sheet)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        catatan.rename_axis("KUNCI").reset_index().to_feather(tmp)
+        os.replace(tmp, path)
+
+    def rencana(self, header: List[str], isi_sheet: Dict[str, List[str]], kunci_frame,
+                nilai: Dict[str, np.ndarray], catatan: Optional[pd.DataFrame] = None) -> Tuple[List[List[Dict]], pd.DataFrame]:
+        """
+        Susun request batch_update: isi_sheet = kolom sheet saat ini (tanpa
+        header) untuk NO. REGISTRASI dan kolom tujuan, catatan = nilai yang
+        terakhir ditulis aplikasi. Kembalikan (daftar request, masing-masing
+        daftar {range, values}; catatan baru setelah request terkirim).
+        """
+        from gspread.utils import rowcol_to_a1
+
+        no_sheet = isi_sheet["NO. REGISTRASI"]
+        n = max((len(v) for v in isi_sheet.values()), default=0)
+        no_sheet = list(no_sheet) + [""] * (n - len(no_sheet))
+        kunci_sheet = self.kunci_baris(no_sheet)
+        posisi = pd.Index(kunci_frame).get_indexer(kunci_sheet)
+        cocok = posisi >= 0
+        if catatan is None:
+            catatan = pd.DataFrame()
+        posisi_catatan = catatan.index.get_indexer(kunci_sheet) if len(catatan) else np.full(n, -1)
+        catatan_baru = pd.DataFrame(index=pd.Index(kunci_sheet[cocok]))
+
+        rentang = []
+        for kolom, baru in nilai.items():
+            if kolom not in header or kolom not in isi_sheet:
+                continue
+            lama = np.full(n, "", dtype=object)
+            lama[:len(isi_sheet[kolom])] = isi_sheet[kolom]
+            lama = lama.astype(str)
+            target = lama.copy().astype(object)
+            target[cocok] = np.asarray(baru, dtype=object)[posisi[cocok]]
+            target = target.astype(str)
+            boleh = self.timpa | (lama == "") | (lama == target)
+            if kolom in catatan.columns:
+                terakhir = np.where(
+                    posisi_catatan >= 0, catatan[kolom].to_numpy(dtype=object)[np.maximum(posisi_catatan, 0)], None
+                )
+                boleh |= lama == terakhir
+            boleh &= cocok
+            # Sel yang (akan) berisi hasil hitung dicatat sebagai milik aplikasi
+            catatan_baru[kolom] = np.where(boleh, target, None)[cocok]
+            beda = np.flatnonzero(boleh & (target != lama))
+            if not len(beda):
+                continue
+
+            # Pecah indeks yang berbeda jadi potongan berurutan <= batas_sel baris
+            huruf = rowcol_to_a1(1, header.index(kolom) + 1)[:-1]
+            putus = np.flatnonzero(np.diff(beda) != 1) + 1
+            for potongan in np.split(beda, putus):
+                for a in range(0, len(potongan), self.batas_sel):
+                    i0, i1 = potongan[a], potongan[min(a + self.batas_sel, len(potongan)) - 1]
+                    rentang.append({
+                        "range": f"{huruf}{i0 + 2}:{huruf}{i1 + 2}",
+                        "values": [[v] for v in target[i0:i1 + 1]],
+                    })
+
+        # Gabungkan rentang ke request sampai batas_sel sel
+        request, sel = [], self.batas_sel
+        for r in rentang:
+            if sel + len(r["values"]) > self.batas_sel:
+                request.append([])
+                sel = 0
+            request[-1].append(r)
+            sel += len(r["values"])
+        return request, catatan_baru
+
+    def tulis(self, sheet, kunci_frame, nilai: Dict[str, np.ndarray], metrik: Optional["MetrikSheets"] = None) -> Dict[str, int]:
+        """Baca kolom kunci & tujuan di sheet, lalu kirim hanya sel yang berubah"""
+        from gspread.utils import rowcol_to_a1
+
+        def ukur(jenis):
+            return metrik.catat(jenis) if metrik is not None else nullcontext()
+
+        with ukur("header"):
+            header = sheet.row_values(1)
+        kolom = ["NO. REGISTRASI"] + [k for k in nilai if k in header]
+        if "NO. REGISTRASI" not in header or len(kolom) == 1:
+            return {"sel": 0, "request": 0}
+
+        huruf = [rowcol_to_a1(1, header.index(k) + 1)[:-1] for k in kolom]
+        with ukur("cek"):
+            blok = sheet.batch_get([f"{h}2:{h}" for h in huruf])
+        isi_sheet = {k: [baris[0] if baris else "" for baris in b] for k, b in zip(kolom, blok)}
+
+        request, catatan = self.rencana(header, isi_sheet, kunci_frame, nilai, self.baca_catatan(sheet))
+        for data in request:
+            self.tunggu()
+            with ukur("tulis"):
+                # USER_ENTERED: TOTAL HARI tersimpan sebagai angka, bukan teks
+                sheet.batch_update(data, raw=False)
+        self.simpan_catatan(sheet, catatan)
+        return {"sel": sum(len(r["values"]) for data in request for r in data), "request": len(request)}
+
+# ================================
+# ARTEFAK LAPORAN PERIODE STANDAR
+# ================================
+class ArtefakLaporan:
+    """
+    Laporan periode standar yang disiapkan di latar belakang per versi data:
+    <dir>/<versi>/<kode>.json (ringkasan), .npy (posisi baris di frame
+    versi itu), .csv dan .parquet (isi unduhan). File .json ditulis
+    terakhir, jadi artefak dianggap ada hanya bila lengkap. Satu proses
+    membangun tiap versi (lock file); versi lama dan artefak yang paling
+    lama tidak dibaca dibuang bila melebihi batas ukuran.
+    """
+
+    def __init__(self, direktori: str, batas_mb: float = 200, pekerja: int = 2, simpan_versi: int = 2):
+        self.direktori = direktori
+        self.batas_byte = batas_mb * 1e6
+        self.pekerja = max(1, pekerja)
+        self.simpan_versi = simpan_versi
+        os.makedirs(direktori, exist_ok=True)
+
+    def _path(self, versi: str, kode: str = "", akhiran: str = "") -> str:
+        return os.path.join(self.direktori, versi, f"{kode}{akhiran}")
+
+    def baca(self, versi: str, kode: str) -> Optional[Dict]:
+        """Ringkasan + posisi baris artefak, atau None bila belum selesai dibangun"""
+        try:
+            with open(self._path(versi, kode, ".json"), encoding="utf-8") as f:
+                isi = json.load(f)
+            isi["indeks"] = np.load(self._path(versi, kode, ".npy"))
+        except (OSError, ValueError):
+            return None
+        # mtime = waktu terakhir dibaca, dipakai urutan buang
+        os.utime(self._path(versi, kode, ".json"))
+        return isi
+
+    def unduhan(self, versi: str, kode: str, format: str) -> bytes:
+        with open(self._path(versi, kode, f".{format}"), "rb") as f:
+            return f.read()
+
+    def _tulis_atomik(self, path: str, isi: bytes):
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(isi)
+        os.replace(tmp, path)
+
+    def _simpan(self, versi: str, kode: str, ringkasan: Dict, indeks: np.ndarray, ekspor):
+        buffer = io.BytesIO()
+        np.save(buffer, indeks)
+        self._tulis_atomik(self._path(versi, kode, ".npy"), buffer.getvalue())
+        self._tulis_atomik(self._path(versi, kode, ".csv"), ekspor.to_csv(index=False).encode("utf-8"))
+        self._tulis_atomik(self._path(versi, kode, ".parquet"), ekspor.to_parquet(index=False))
+        self._tulis_atomik(self._path(versi, kode, ".json"), json.dumps(ringkasan).encode("utf-8"))
+
+    @contextmanager
+    def _kunci(self, path: str):
+        """Lock file eksklusif; menunggu sampai pemegang lain selesai"""
+        with open(path, "a+") as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def bangun(self, versi: str, periode: Dict[str, Tuple[str, str]], siapkan) -> threading.Thread:
+        """
+        Mulai thread latar yang membangun artefak yang belum ada:
+        siapkan(mulai, akhir) -> (ringkasan, indeks, frame ekspor), dijalankan
+        paralel di pool pekerja. Lock per versi: proses lain yang sedang
+        membangun versi yang sama ditunggu, lalu hanya sisa yang belum ada
+        yang dibangun (versi lain tidak saling menghalangi).
+        """
+        def jalankan():
+            os.makedirs(self._path(versi), exist_ok=True)
+            with self._kunci(self._path(versi, "bangun.lock")):
+                from concurrent.futures import ThreadPoolExecutor
+
+                def satu(kode):
+                    mulai, akhir = periode[kode]
+                    self._simpan(versi, kode, *siapkan(mulai, akhir))
+
+                belum = [k for k in periode if not os.path.exists(self._path(versi, k, ".json"))]
+                with ThreadPoolExecutor(self.pekerja, thread_name_prefix="laporan") as pool:
+                    list(pool.map(satu, belum))
+            # Buang antar-versi tetap satu proses sekaligus
+            with self._kunci(os.path.join(self.direktori, "buang.lock")):
+                self._buang_lama(versi)
+
+        thread = threading.Thread(target=jalankan, name=f"laporan-{versi}", daemon=True)
+        thread.start()
+        return thread
+
+    def _sedang_dibangun(self, versi: str) -> bool:
+        """Lock versi ini sedang dipegang (proses lain masih menulis artefaknya)"""
+        if fcntl is None or not os.path.exists(self._path(versi, "bangun.lock")):
+            return False
+        with open(self._path(versi, "bangun.lock"), "a+") as f:
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                return True
+            fcntl.flock(f, fcntl.LOCK_UN)
+            return False
+
+    def _buang_lama(self, versi_terkini: str):
+        """Simpan simpan_versi versi terbaru, lalu buang artefak paling lama tidak dibaca sampai di bawah batas"""
+        versi_lain = sorted(
+            (v for v in os.listdir(self.direktori) if v != versi_terkini and os.path.isdir(self._path(v))),
+            key=lambda v: os.path.getmtime(self._path(v)), reverse=True
+        )
+        for v in versi_lain[self.simpan_versi - 1:]:
+            if self._sedang_dibangun(v):
+                continue
+            for f in os.listdir(self._path(v)):
+                try:
+                    os.remove(self._path(v, f))
+                except OSError:
+                    pass
+            try:
+                os.rmdir(self._path(v))
+            except OSError:
+                pass
+
+        artefak = []
+        for v in os.listdir(self.direktori):
+            if not os.path.isdir(self._path(v)):
+                continue
+            for f in os.listdir(self._path(v)):
+                if f.endswith(".json"):
+                    kode = f[: -len(".json")]
+                    ukuran = sum(
+                        os.path.getsize(self._path(v, kode, a))
+                        for a in (".json", ".npy", ".csv", ".parquet") if os.path.exists(self._path(v, kode, a))
+                    )
+                    artefak.append((os.path.getmtime(self._path(v, f)), v, kode, ukuran))
+        total = sum(a[3] for a in artefak)
+        for _, v, kode, ukuran in sorted(artefak):
+            if total <= self.batas_byte:
+                break
+            # .json dulu agar pembaca tidak melihat artefak setengah terhapus
+            for a in (".json", ".npy", ".csv", ".parquet"):
+                try:
+                    os.remove(self._path(v, kode, a))
+                except OSError:
+                    pass
+            total -= ukuran
+
+# ================================
+# AGREGAT BEBAN KERJA (inkremental)
+# ================================
+class AgregatBebanKerja:
+    """
+    Jumlah aditif per petugas (per STATUS, total hari kerja berkas selesai).
+    Versi data baru hanya mengurangi/menambah kontribusi baris yang berubah,
+    jadi groupby tidak diulang untuk seluruh frame.
+    """
+
+    KOLOM_PETUGAS = ["PEMROSES", "SURVEY SUBKO", "PENILAI TEKNIS TPT/TPA"]
+    KOLOM_JUMLAH = ["Diproses", "Tepat waktu", "Terlambat", "HARI", "SELESAI"]
+
+    def __init__(self):
+        self.versi = None
+        self.kontribusi = None
+        self.jumlah: Dict[str, pd.DataFrame] = {}
+        self.kunci = threading.Lock()
+
+    @staticmethod
+    def hitung_kontribusi(df, total_hari) -> pd.DataFrame:
+        """Satu baris per permohonan (kunci = NO. REGISTRASI + urutan duplikat)"""
+        no_reg = df["NO. REGISTRASI"].astype(str) if "NO. REGISTRASI" in df.columns else pd.Series("", index=df.index)
+        kunci = no_reg + "#" + no_reg.groupby(no_reg).cumcount().astype(str)
+
+        status = df["STATUS"].astype(str).to_numpy()
+        selesai = status != "Diproses"
+        hari = np.where(selesai & ~np.isnan(total_hari), total_hari, 0.0)
+        kontribusi = pd.DataFrame({
+            "Diproses": (status == "Diproses").astype("int64"),
+            "Tepat waktu": (status == "Tepat waktu").astype("int64"),
+            "Terlambat": (status == "Terlambat").astype("int64"),
+            "HARI": hari,
+            "SELESAI": (selesai & ~np.isnan(total_hari)).astype("int64"),
+        }, index=kunci.to_numpy())
+        for kolom in AgregatBebanKerja.KOLOM_PETUGAS:
+            if kolom in df.columns:
+                nama = df[kolom].astype(str).str.strip().to_numpy()
+                kontribusi[kolom] = np.where(nama == "", "(kosong)", nama)
+        kontribusi["HASH"] = pd.util.hash_pandas_object(kontribusi, index=True).to_numpy()
+        return kontribusi
+
+    def _jumlahkan(self, baris: pd.DataFrame, kolom: str) -> pd.DataFrame:
+        return baris.groupby(kolom)[self.KOLOM_JUMLAH].sum()
+
+    def perbarui(self, versi: str, kontribusi: pd.DataFrame) -> int:
+        """Terapkan versi data baru; kembalikan jumlah baris yang dihitung ulang"""
+        with self.kunci:
+            if self.versi == versi:
+                return 0
+
+            if self.kontribusi is None:
+                kurang = kontribusi.iloc[:0]
+                tambah = kontribusi
+            else:
+                # Baris berubah/hilang dikurangi, baris berubah/baru ditambah
+                hash_lama = self.kontribusi["HASH"]
+                sama = kontribusi["HASH"].reindex(hash_lama.index).eq(hash_lama).to_numpy()
+                kurang = self.kontribusi[~sama]
+                tambah = kontribusi[~kontribusi.index.isin(hash_lama.index[sama])]
+
+            for kolom in self.KOLOM_PETUGAS:
+                if kolom not in kontribusi.columns:
+                    self.jumlah.pop(kolom, None)
+                    continue
+                total = self.jumlah.get(kolom, pd.DataFrame(columns=self.KOLOM_JUMLAH, dtype="float64"))
+                if kolom in kurang.columns and len(kurang):
+                    total = total.sub(self._jumlahkan(kurang, kolom), fill_value=0)
+                total = total.add(self._jumlahkan(tambah, kolom), fill_value=0)
+                self.jumlah[kolom] = total[(total[["Diproses", "Tepat waktu", "Terlambat"]] != 0).any(axis=1)]
+
+            self.kontribusi = kontribusi
+            self.versi = versi
+            return len(kurang) + len(tambah)
+
+    def tabel(self, kolom: str) -> pd.DataFrame:
+        """Tabel beban kerja siap tampil untuk satu jenis petugas"""
+        total = self.jumlah.get(kolom)
+        if total is None:
+            return pd.DataFrame()
+        hasil = pd.DataFrame({
+            "PETUGAS": total.index,
+            "TOTAL": (total["Diproses"] + total["Tepat waktu"] + total["Terlambat"]).astype("int64").to_numpy(),
+            "DIPROSES": total["Diproses"].astype("int64").to_numpy(),
+            "TEPAT WAKTU": total["Tepat waktu"].astype("int64").to_numpy(),
+            "TERLAMBAT": total["Terlambat"].astype("int64").to_numpy(),
+            "RATA-RATA HARI KERJA": (total["HARI"] / total["SELESAI"].where(total["SELESAI"] > 0)).to_numpy(),
+        })
+        selesai = hasil["TEPAT WAKTU"] + hasil["TERLAMBAT"]
+        hasil["RASIO TERLAMBAT"] = hasil["TERLAMBAT"] / selesai.where(selesai > 0)
+        return hasil.sort_values("TOTAL", ascending=False, ignore_index=True)
+
+# ================================
+# ANGGARAN MEMORI CACHE (lintas cache)
+# ================================
+class RegistriCache:
+    """
+    Daftar bersama entri cache besar (data mentah, frame siap pakai, matriks,
+    grafik, ...) per proses dengan anggaran memori total. Ukuran entri
+    diperkirakan saat miss; bila total melewati anggaran, entri dengan skor
+    ukuran x lama tidak dipakai / lama hitung terbesar dibuang dari cache
+    Streamlit-nya (per kunci). Entri yang dipakai LINDUNG_DETIK terakhir
+    tidak ikut dibuang, kecuali total melewati LEWAT_LINDUNG x anggaran:
+    entri terlindung lalu ikut dibuang sampai kembali ke anggaran, supaya
+    sesi yang aktif terus tidak membuat cache tumbuh tanpa batas.
+    """
+
+    LINDUNG_DETIK = 30
+    LEWAT_LINDUNG = 1.5
+
+    def __init__(self, batas_mb: float):
+        self.batas = batas_mb * 1e6
+        self.entri: Dict[Tuple[str, str], Dict] = {}
+        self.statistik: Dict[str, Dict[str, int]] = {}
+        self.kunci = threading.Lock()
+
+    @staticmethod
+    def perkiraan_ukuran(obj, dilihat=None) -> int:
+        """
+        Perkiraan bytes satu nilai cache. Kolom yang dibagi dengan entri lain
+        (mis. salinan dangkal frame) ikut terhitung, jadi cenderung melebihi.
+        """
+        if dilihat is None:
+            dilihat = set()
+        if id(obj) in dilihat:
+            return 0
+        dilihat.add(id(obj))
+        if isinstance(obj, pd.DataFrame):
+            return int(obj.memory_usage(deep=True).sum())
+        if isinstance(obj, (pd.Series, pd.Index)):
+            return int(obj.memory_usage(deep=True))
+        if isinstance(obj, np.ndarray):
+            return int(obj.nbytes)
+        if isinstance(obj, dict):
+            return sys.getsizeof(obj) + sum(
+                RegistriCache.perkiraan_ukuran(k, dilihat) + RegistriCache.perkiraan_ukuran(v, dilihat)
+                for k, v in obj.items()
+            )
+        if isinstance(obj, (list, tuple, set, frozenset)):
+            return sys.getsizeof(obj) + sum(RegistriCache.perkiraan_ukuran(v, dilihat) for v in obj)
+        if hasattr(obj, "to_plotly_json"):
+            # Figure Plotly: isi trace & layout
+            return RegistriCache.perkiraan_ukuran(obj.to_plotly_json(), dilihat)
+        return sys.getsizeof(obj)
+
+    def _stat(self, nama: str) -> Dict[str, int]:
+        return self.statistik.setdefault(nama, {"hit": 0, "miss": 0, "dibuang": 0})
+
+    def catat_hit(self, nama: str, kunci: str):
+        with self.kunci:
+            self._stat(nama)["hit"] += 1
+            entri = self.entri.get((nama, kunci))
+            if entri is not None:
+                entri["dipakai"] = time.time()
+
+    def catat_miss(self, nama: str, kunci: str, ukuran: int, detik: float, hapus,
+                   maks_entri: Optional[int] = None) -> List:
+        """
+        Daftarkan entri baru; kembalikan fungsi hapus entri yang harus dibuang
+        (dipanggil di luar lock). Entri lama cache yang sama di atas maks_entri
+        sudah dibuang Streamlit sendiri, jadi hanya dilupakan.
+        """
+        sekarang = time.time()
+        with self.kunci:
+            self._stat(nama)["miss"] += 1
+            self.entri[(nama, kunci)] = {"ukuran": ukuran, "detik": detik, "dipakai": sekarang, "hapus": hapus}
+            if maks_entri:
+                milik = sorted((k for k in self.entri if k[0] == nama), key=lambda k: self.entri[k]["dipakai"])
+                for k in milik[:-maks_entri]:
+                    del self.entri[k]
+            if self.batas <= 0:
+                return []
+
+            total = sum(e["ukuran"] for e in self.entri.values())
+            lindung = sekarang - self.LINDUNG_DETIK
+            if total > self.batas * self.LEWAT_LINDUNG:
+                lindung = sekarang
+            calon = [k for k, e in self.entri.items() if k != (nama, kunci) and e["dipakai"] <= lindung]
+            # Besar, lama menganggur, dan murah dihitung ulang -> dibuang dulu
+            calon.sort(key=lambda k: self.entri[k]["ukuran"] * (sekarang - self.entri[k]["dipakai"] + 1)
+                       / (self.entri[k]["detik"] + 0.01), reverse=True)
+            dibuang = []
+            for k in calon:
+                if total <= self.batas:
+                    break
+                entri = self.entri.pop(k)
+                total -= entri["ukuran"]
+                self._stat(k[0])["dibuang"] += 1
+                dibuang.append(entri["hapus"])
+            return dibuang
+
+    def total(self) -> int:
+        with self.kunci:
+            return sum(e["ukuran"] for e in self.entri.values())
+
+    def tabel(self) -> pd.DataFrame:
+        """Per cache: entri tersimpan, ukuran, hit/miss/dibuang"""
+        with self.kunci:
+            baris = []
+            for nama, stat in self.statistik.items():
+                ukuran = [e["ukuran"] for k, e in self.entri.items() if k[0] == nama]
+                panggilan = stat["hit"] + stat["miss"]
+                baris.append({
+                    "CACHE": nama,
+                    "ENTRI": len(ukuran),
+                    "UKURAN (MB)": sum(ukuran) / 1e6,
+                    "HIT": stat["hit"],
+                    "MISS": stat["miss"],
+                    "DIBUANG": stat["dibuang"],
+                    "HIT RATE": stat["hit"] / panggilan if panggilan else 0.0,
+                })
+        kolom = ["CACHE", "ENTRI", "UKURAN (MB)", "HIT", "MISS", "DIBUANG", "HIT RATE"]
+        return pd.DataFrame(baris, columns=kolom).sort_values("UKURAN (MB)", ascending=False, ignore_index=True)
+
+
+_cache_dihitung = threading.local()
+
+
+def cache_terukur(jenis=None, **opsi):
+    """
+    Pengganti @st.cache_resource(**opsi) (atau jenis=st.cache_data) untuk
+    method PBGMonitoringApp yang hasilnya besar: setiap panggilan dicatat
+    hit/miss di registri_cache(), dan entrinya bisa dibuang per kunci saat
+    anggaran memori (cache_batas_mb) terlewati.
+    """
+    def dekorator(fungsi):
+        nama = fungsi.__name__
+        parameter = list(inspect.signature(fungsi).parameters)
+
+        @functools.wraps(fungsi)
+        def hitung(*args, **kwargs):
+            # Hanya jalan saat miss; tandai panggilan terluar milik fungsi ini
+            _cache_dihitung.tumpukan[-1] = True
+            return fungsi(*args, **kwargs)
+
+        tersimpan = (jenis or st.cache_resource)(**opsi)(hitung)
+
+        @functools.wraps(fungsi)
+        def panggil(self, *args, **kwargs):
+            # Argumen ber-awalan "_" tidak di-hash Streamlit: tidak disimpan untuk hapus
+            args_kunci = tuple(
+                None if i + 1 < len(parameter) and parameter[i + 1].startswith("_") else a
+                for i, a in enumerate(args)
+            )
+            kwargs_kunci = {k: None if k.startswith("_") else v for k, v in kwargs.items()}
+            kunci = repr((args_kunci, sorted(kwargs_kunci.items())))
+
+            tumpukan = _cache_dihitung.__dict__.setdefault("tumpukan", [])
+            tumpukan.append(False)
+            mulai = time.perf_counter()
+            try:
+                hasil = tersimpan.__get__(self)(*args, **kwargs)
+            finally:
+                miss = tumpukan.pop()
+            registri = self.registri_cache()
+            if not miss:
+                registri.catat_hit(nama, kunci)
+                return hasil
+            dibuang = registri.catat_miss(
+                nama, kunci, RegistriCache.perkiraan_ukuran(hasil), time.perf_counter() - mulai,
+                lambda: tersimpan.clear(None, *args_kunci, **kwargs_kunci), opsi.get("max_entries")
+            )
+            for hapus in dibuang:
+                hapus()
+            return hasil
+
+        panggil.clear = tersimpan.clear
+        return panggil
+    return dekorator
+
+
+@functools.lru_cache(maxsize=None)
+def _kelas_figur_beku():
+    # plotly diimpor malas, jadi subkelasnya juga dibuat saat pertama dipakai
+    import plotly.graph_objects as go
+
+    class FigurBeku(go.Figure):
+        def to_dict(self):
+            return self._spec
+
+    return FigurBeku
+
+
+def figur_beku(fig):
+    """
+    Salinan figure Plotly yang spec (dict) -nya dihitung sekali.
+    st.plotly_chart memanggil to_dict() lalu to_json setiap rerun; figure
+    yang di-cache dan tidak diubah lagi cukup mengembalikan spec yang sama.
+    """
+    beku = _kelas_figur_beku()(fig)
+    beku._spec = fig.to_dict()
+    return beku
+
 # ================================
 # KELAS UTAMA APLIKASI
 # ================================
@@ -43,193 +1233,1688 @@ class PBGMonitoringApp:
             "KONSULTASI TPA + INPUT RETRIBUSI": 2,
             "SPPST KADIS": 1
         }
+        self.BATAS_HARI_SOP = 23
+        self.KUNCI_SPREADSHEET = "1LEKCe-bbye_mPx9pH-w22LOE95MqFD3ZEp5rLQoqVxg"
+        self.KOLOM_RETRIBUSI = ["BESARAN RETRIBUSI (Rp)", "NILAI RETRIBUSI", "TOTAL RETRIBUSI"]
+        self.KOLOM_KATEGORI = ["STATUS", "PEMROSES", "SURVEY SUBKO", "PENILAI TEKNIS TPT/TPA"]
+        self.KOLOM_WAJIB = (
+            ["NO. REGISTRASI", "NAMA PEMOHON", "TGL REGISTRASI"]
+            + list(self.SOP_TAHAPAN.keys()) + self.KOLOM_KATEGORI + self.KOLOM_RETRIBUSI
+        )
+        # Bit kolom FLAG DATA (hasil validasi sekali per versi data)
+        self.FLAG_KUALITAS = {
+            "TGL REGISTRASI kosong": 1,
+            "TGL REGISTRASI tidak terbaca": 2,
+            "Tanggal tahapan tidak terbaca": 4,
+            "Tanggal tahapan mundur": 8,
+            "Retribusi bukan angka": 16,
+        }
+        # Kolom bantu tersembunyi: FLAG DATA + bitmask per tahapan (bit i = tahapan ke-i di SOP_TAHAPAN)
+        self.KOLOM_FLAG = [
+            "FLAG DATA", "TAHAP TIDAK TERBACA", "TAHAP MUNDUR", "SPPST DILEWATI", "TAHAP MELEBIHI SOP", "TAB ASAL"
+        ]
+        # Sel maksimum yang diwarnai Styler (batas Streamlit 262.144 sel, dan lambat jauh sebelum itu)
+        self.BATAS_SEL_GAYA = 50_000
+        # Nilai bawaan bila file SOP (sop_path) tidak ada atau tidak valid
+        self.SOP_BAWAAN = dict(self.SOP_TAHAPAN)
+        self.BATAS_BAWAAN = self.BATAS_HARI_SOP
+        self.kode_sop = None
+        self.versi_dasar = None
+        self.partisi = None
+        self.hasil_tulis = None
+        self.hasil_snapshot = None
         self.df = None
-        self.load_data()
-        
-    @st.cache_data(ttl=300)
-    def load_data(_self):
+        self.df_raw = None
+        self.versi = None
+        self.sql = None
+
+    @st.cache_resource
+    def metrik_sheets(_self) -> MetrikSheets:
+        """Metrik panggilan Sheets & interval refresh adaptif (satu per proses)"""
+        return MetrikSheets(
+            float(baca_konfigurasi("cache_ttl", 300)),
+            float(baca_konfigurasi("refresh_min", 60)),
+            float(baca_konfigurasi("refresh_max", 1800)),
+        )
+
+    @st.cache_resource
+    def registri_cache(_self) -> RegistriCache:
+        """Registri & anggaran memori semua cache besar (satu per proses)"""
+        return RegistriCache(float(baca_konfigurasi("cache_batas_mb", 0)))
+
+    @cache_terukur(st.cache_data, max_entries=2)
+    def load_data(_self, giliran: int):
+        """Fetch sekali per giliran refresh (lihat MetrikSheets.giliran_refresh)"""
+        df = _self.ambil_data_sheet()
+        _self.metrik_sheets().catat_versi(_self.versi_data(df))
+        return df
+
+    def ambil_data_sheet(self):
+        """
+        Ambil isi sheet dari Google Sheets (tanpa cache). Bila konfigurasi
+        worksheet berisi beberapa tab, semuanya diambil paralel (pool thread
+        terbatas) lalu disatukan, jadi lamanya mendekati tab yang paling lambat.
+        """
+        daftar = self.daftar_worksheet()
+        if len(daftar) == 1:
+            return self.ambil_worksheet(self.buka_worksheet(*daftar[0]))
+
+        from concurrent.futures import ThreadPoolExecutor
+        from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+        client = self.klien_sheets()
+        ctx = get_script_run_ctx()
+
+        def ambil(kunci_judul):
+            # Thread pekerja ikut konteks sesi agar cache Streamlit (metrik, header) bisa dipakai
+            add_script_run_ctx(threading.current_thread(), ctx)
+            return self.ambil_worksheet(self.buka_worksheet(*kunci_judul, client=client))
+
+        pekerja = max(1, min(len(daftar), int(baca_konfigurasi("fetch_pekerja", 4))))
+        with self.metrik_sheets().catat("fetch semua tab"), ThreadPoolExecutor(pekerja, thread_name_prefix="fetch") as pool:
+            bagian = list(pool.map(ambil, daftar))
+        return self.gabung_worksheet(bagian, [self.nama_tab(*k) for k in daftar])
+
+    def ambil_worksheet(self, sheet):
+        """Isi satu worksheet sesuai fetch_mode"""
+        if baca_konfigurasi("fetch_mode", "semua") == "kolom":
+            return self.ambil_kolom_terpilih(sheet)
+
+        with self.metrik_sheets().catat("fetch"):
+            records = sheet.get_all_records()
+        df = pd.DataFrame(records)
+        return df
+
+    def gabung_worksheet(self, bagian, tab: Optional[List[str]] = None):
+        """
+        Satukan isi beberapa tab ke satu skema: nama kolom dirapikan (spasi,
+        huruf besar/kecil) ke nama di KOLOM_WAJIB, kolom yang tidak ada di
+        suatu tab diisi "". Digabung sebagai object agar angka tidak jadi float.
+        Bila `tab` diisi, asal tiap baris disimpan di kolom bantu TAB ASAL
+        (dipakai tulis balik STATUS untuk mencocokkan baris per tab).
+        """
+        kanonik = {k.upper(): k for k in self.KOLOM_WAJIB}
+        rapi = []
+        for i, df in enumerate(bagian):
+            nama = [kanonik.get(str(c).strip().upper(), str(c).strip()) for c in df.columns]
+            df = df.astype(object).set_axis(nama, axis=1)
+            df = df.loc[:, ~df.columns.duplicated()]
+            if tab is not None:
+                df = df.assign(**{"TAB ASAL": tab[i]})
+            rapi.append(df)
+        if not rapi:
+            return pd.DataFrame()
+        return pd.concat(rapi, ignore_index=True, sort=False).fillna("")
+
+    def nama_tab(self, kunci: str, judul: Optional[str]) -> str:
+        """Nama tab seperti entri konfigurasi worksheet (kunci hanya bila bukan spreadsheet utama)"""
+        judul = judul or "sheet1"
+        return judul if kunci == self.KUNCI_SPREADSHEET else f"{kunci}/{judul}"
+
+    def daftar_worksheet(self) -> List[Tuple[str, Optional[str]]]:
+        """
+        (kunci spreadsheet, judul tab) dari konfigurasi worksheet: daftar atau
+        teks dipisah koma, tiap entri "judul" (spreadsheet utama) atau
+        "<kunci spreadsheet>/judul". Kosong = sheet1 spreadsheet utama.
+        """
+        nilai = baca_konfigurasi("worksheet", "")
+        if isinstance(nilai, str):
+            nilai = nilai.split(",")
+        daftar = []
+        for entri in map(str.strip, map(str, nilai)):
+            if not entri:
+                continue
+            cocok = re.match(r"^([A-Za-z0-9_-]{25,})/(.+)$", entri)
+            daftar.append((cocok.group(1), cocok.group(2)) if cocok else (self.KUNCI_SPREADSHEET, entri))
+        return daftar or [(self.KUNCI_SPREADSHEET, None)]
+
+    def klien_sheets(self):
+        """Autentikasi service account (client gspread)"""
+        import gspread
+        from google.oauth2.service_account import Credentials
+
         scope = [
             "https://www.googleapis.com/auth/spreadsheets",
             "https://www.googleapis.com/auth/drive"
         ]
 
-        creds_info = st.secrets["google_credentials"]
-        creds = Credentials.from_service_account_info(
-            creds_info, 
-            scopes=scope
+        with self.metrik_sheets().catat("auth"):
+            creds_info = st.secrets["google_credentials"]
+            creds = Credentials.from_service_account_info(
+                creds_info, 
+                scopes=scope
+            )
+
+            return gspread.authorize(creds)
+
+    def buka_worksheet(self, kunci: Optional[str] = None, judul: Optional[str] = None, client=None):
+        """Buka satu worksheet; default sheet1 spreadsheet utama"""
+        if client is None:
+            client = self.klien_sheets()
+        with self.metrik_sheets().catat("open"):
+            spreadsheet = client.open_by_key(kunci or self.KUNCI_SPREADSHEET)
+            return spreadsheet.sheet1 if judul is None else spreadsheet.worksheet(judul)
+
+    @st.cache_resource
+    def cache_header(_self) -> Dict[str, List[str]]:
+        """Header worksheet per proses, supaya tidak dibaca ulang tiap fetch"""
+        return {}
+
+    def ambil_kolom_terpilih(self, sheet, _ulang: bool = True):
+        """
+        Ambil hanya kolom yang dipakai aplikasi lewat satu batch_get per
+        rentang kolom berurutan, lalu bentuk frame langsung dari array nilai
+        (tanpa list of dict). Baris 1 ikut diambil untuk memastikan header
+        yang di-cache masih sama; jika berubah, header dibaca ulang sekali.
+        """
+        from gspread.utils import rowcol_to_a1
+
+        cache = self.cache_header()
+        kunci = f"{getattr(sheet, 'spreadsheet_id', '')}/{getattr(sheet, 'id', '')}"
+        if kunci not in cache:
+            with self.metrik_sheets().catat("header"):
+                cache[kunci] = sheet.row_values(1)
+        header = cache[kunci]
+
+        perlu = set(self.KOLOM_WAJIB)
+        posisi = [i for i, nama in enumerate(header) if nama in perlu]
+        if not posisi:
+            return pd.DataFrame()
+
+        # Kelompokkan posisi kolom yang berurutan jadi satu rentang A1
+        rentang = []
+        for i in posisi:
+            if rentang and rentang[-1][1] == i - 1:
+                rentang[-1][1] = i
+            else:
+                rentang.append([i, i])
+
+        def huruf(i):
+            return rowcol_to_a1(1, i + 1)[:-1]
+
+        with self.metrik_sheets().catat("fetch"):
+            nilai = sheet.batch_get([f"{huruf(a)}1:{huruf(b)}" for a, b in rentang])
+
+        header_terbaca = []
+        for (a, b), blok in zip(rentang, nilai):
+            baris_header = list(blok[0]) if len(blok) else []
+            header_terbaca += baris_header + [""] * (b - a + 1 - len(baris_header))
+        if header_terbaca != [header[i] for i in posisi]:
+            cache.pop(kunci, None)
+            if _ulang:
+                return self.ambil_kolom_terpilih(sheet, _ulang=False)
+            raise ValueError("Header worksheet berubah saat pengambilan data")
+
+        jumlah_baris = max((len(blok) - 1 for blok in nilai), default=0)
+        data = {}
+        for (a, b), blok in zip(rentang, nilai):
+            isi = list(blok[1:]) + [[]] * (jumlah_baris - max(len(blok) - 1, 0))
+            lebar = b - a + 1
+            # Transpos baris -> kolom, sel kosong di ujung baris diisi ""
+            kolom = list(zip_longest(*isi, fillvalue="")) if isi else []
+            for j in range(lebar):
+                nilai_kolom = kolom[j] if j < len(kolom) else ()
+                arr = np.full(jumlah_baris, "", dtype=object)
+                arr[: len(nilai_kolom)] = nilai_kolom
+                data[header[a + j]] = arr
+        return pd.DataFrame(data)
+
+    # ================================
+    # PERSIAPAN DATA (sekali per versi data)
+    # ================================
+    def muat_data(self):
+        """
+        Isi self.versi dan self.df. Default: cache per proses (load_data).
+        Dengan cache_backend=disk, satu proses mengambil & menyiapkan tiap
+        versi data lalu proses lain membaca file Arrow-nya.
+
+        self.versi_dasar = versi data (fetch & parse), self.versi = versi data
+        + kode SOP; cache turunan SLA memakai self.versi sehingga perubahan SOP
+        hanya menghitung ulang kolom SLA.
+        """
+        self.muat_sop()
+        if baca_konfigurasi("cache_backend", "memori") == "disk":
+            cache = self.cache_bersama()
+            self.df_raw = None
+            if baca_konfigurasi("partisi_tahun", "tidak") == "ya":
+                # Frame penuh baru dimuat saat halaman benar-benar membutuhkannya
+                self.versi_dasar = cache.versi_terkini(
+                    self.tulis_versi_partisi, self.metrik_sheets().catat_versi, tata="partisi"
+                )
+                self.versi = f"{self.versi_dasar}-{self.kode_sop}"
+                self.partisi = self.manifest_partisi(self.versi_dasar)
+                self.df = None
+                return
+            self.versi_dasar = cache.versi_terkini(self.tulis_versi_penuh, self.metrik_sheets().catat_versi, tata="utuh")
+            self.versi = f"{self.versi_dasar}-{self.kode_sop}"
+            self.df = self.terapkan_sop(self.versi_dasar, self.kode_sop, self.baca_cache_bersama(self.versi_dasar))
+            return
+
+        self.df_raw = self.load_data(self.metrik_sheets().giliran_refresh())
+        self.versi_dasar = self.versi_data(self.df_raw)
+        self.versi = f"{self.versi_dasar}-{self.kode_sop}"
+        self.df = self.terapkan_sop(self.versi_dasar, self.kode_sop, self.siapkan_data(self.versi_dasar, self.df_raw))
+
+    @property
+    def df(self):
+        """Frame siap pakai; pada mode partisi baru dimuat (semua tahun) saat diakses"""
+        if self._df is None and self.partisi is not None:
+            self._df = self.terapkan_sop(
+                self.versi_dasar, self.kode_sop, self.data_tahun(self.versi_dasar, tuple(self.partisi))
+            )
+        return self._df
+
+    @df.setter
+    def df(self, nilai):
+        self._df = nilai
+
+    def tulis_versi_penuh(self, cache) -> str:
+        """Fetch + persiapan penuh; dipanggil oleh cache bersama saat data basi"""
+        df_raw = self.ambil_data_sheet()
+        versi = self.versi_data(df_raw)
+        if not cache.ada(versi, "utuh"):
+            cache.simpan(versi, self.siapkan_data(versi, df_raw))
+        return versi
+
+    def tulis_versi_partisi(self, cache) -> str:
+        """
+        Fetch lalu pecah per tahun registrasi. Hanya partisi yang isinya
+        berubah (hash baru) yang disiapkan ulang dan ditulis.
+        """
+        df_raw = self.ambil_data_sheet()
+        versi = self.versi_data(df_raw)
+        if cache.ada(versi, "partisi"):
+            return versi
+
+        df_raw = df_raw.drop(columns=self.kolom_kosong(df_raw))
+        if "TGL REGISTRASI" in df_raw.columns:
+            tahun = self.parse_tanggal(df_raw["TGL REGISTRASI"]).dt.year
+        else:
+            tahun = pd.Series(np.nan, index=df_raw.index)
+        kunci_tahun = tahun.map(lambda t: "-" if pd.isna(t) else str(int(t)))
+
+        bagian = {k: df_raw[kunci_tahun == k].reset_index(drop=True) for k in sorted(kunci_tahun.unique())}
+        partisi = {k: self.versi_data(b) for k, b in bagian.items()}
+
+        def siapkan_partisi(tahun):
+            df = self.siapkan_data(partisi[tahun], bagian[tahun], buang_kolom_kosong=False)
+            return df, self.ringkasan_frame(self.terapkan_sop(partisi[tahun], self.kode_sop, df))
+
+        cache.simpan_partisi(versi, partisi, siapkan_partisi)
+        return versi
+
+    @st.cache_resource(max_entries=2)
+    def manifest_partisi(_self, versi) -> Dict[str, str]:
+        """{tahun: hash partisi} untuk satu versi (tahun "-" = tanpa tanggal)"""
+        return _self.cache_bersama().baca_manifest(versi)
+
+    @cache_terukur(max_entries=2)
+    def ringkasan_partisi(_self, versi, kode_sop) -> Dict[str, Dict]:
+        """
+        Ringkasan kecil tiap partisi tahun; cukup untuk Beranda & Monitoring.
+        Ringkasan yang ditulis dengan SOP lain (atau format lama) dihitung ulang dari partisinya.
+        """
+        cache = _self.cache_bersama()
+        hasil = {}
+        for tahun, kode in _self.manifest_partisi(versi).items():
+            ringkasan = cache.baca_ringkasan(kode)
+            if ringkasan.get("sop") != kode_sop or "terbuka" not in ringkasan:
+                df = _self.terapkan_sop(kode, kode_sop, cache.baca(f"partisi/{kode}"))
+                ringkasan = _self.ringkasan_frame(df)
+            hasil[tahun] = ringkasan
+        return hasil
+
+    @cache_terukur(max_entries=4)
+    def data_tahun(_self, versi, tahun: Tuple[str, ...]):
+        """Frame siap pakai untuk sebagian tahun, dibaca dari partisi disk"""
+        cache = _self.cache_bersama()
+        manifest = _self.manifest_partisi(versi)
+        frames = [cache.baca(f"partisi/{manifest[t]}") for t in manifest if t in tahun]
+        return _self.gabung_partisi(frames)
+
+    def telusuri_partisi(self):
+        """
+        (frame siap pakai + SOP, matriks tanggal) tiap partisi tahun, satu per
+        satu dan tanpa cache: pekerjaan sekali per versi (log perubahan, beban
+        kerja) tidak perlu memuat semua tahun sekaligus.
+        """
+        cache = self.cache_bersama()
+        for kode in self.partisi.values():
+            df = cache.baca(f"partisi/{kode}")
+            m = self.hitung_matriks_tanggal(df)
+            yield self.hitung_kolom_sop(df, m), m
+
+    def gabung_partisi(self, frames):
+        """Gabung partisi; kolom category disatukan kategorinya agar tetap category"""
+        if not frames:
+            return pd.DataFrame(columns=self.KOLOM_WAJIB)
+        kolom_kat = {c for f in frames for c in f.columns if isinstance(f[c].dtype, pd.CategoricalDtype)}
+        for c in kolom_kat:
+            if all(c in f.columns and isinstance(f[c].dtype, pd.CategoricalDtype) for f in frames):
+                kategori = pd.Index(sorted(set().union(*(f[c].cat.categories for f in frames))))
+                frames = [f.assign(**{c: f[c].cat.set_categories(kategori)}) for f in frames]
+            else:
+                frames = [f.assign(**{c: f[c].astype(str)}) if c in f.columns else f for f in frames]
+        hasil = pd.concat(frames, ignore_index=True)
+        for c in kolom_kat:
+            if not isinstance(hasil[c].dtype, pd.CategoricalDtype):
+                hasil[c] = hasil[c].astype("category")
+        return hasil
+
+    def ringkasan_frame(self, df) -> Dict:
+        """Ringkasan satu partisi yang cukup untuk statistik, grafik & aktivitas"""
+        kolom_retribusi = self.cari_kolom_retribusi(df)
+        bertanggal = df["TGL REGISTRASI"].notna() if "TGL REGISTRASI" in df.columns else pd.Series(False, index=df.index)
+        bulanan = self.hitung_bulanan_frame(df)
+        aktivitas = self.urutkan_aktivitas(df).head(5)
+        return {
+            "sop": self.kode_sop,
+            "status": {str(k): int(v) for k, v in df["STATUS"].astype(str).value_counts().items()},
+            "bertanggal": int(bertanggal.sum()),
+            "retribusi": int(df.loc[bertanggal, kolom_retribusi].sum()) if kolom_retribusi else 0,
+            "bulanan": bulanan.values.tolist(),
+            "aktivitas": [
+                {
+                    "NO. REGISTRASI": str(r.get("NO. REGISTRASI", "")),
+                    "NAMA PEMOHON": str(r.get("NAMA PEMOHON", "-")),
+                    "STATUS": str(r["STATUS"]),
+                    "TGL REGISTRASI": None if pd.isna(r["TGL REGISTRASI"]) else r["TGL REGISTRASI"].isoformat(),
+                }
+                for _, r in aktivitas.iterrows()
+            ],
+            "terbuka": self.permohonan_terbuka(df),
+        }
+
+    def permohonan_terbuka(self, df) -> Dict[str, List[int]]:
+        """Berkas Diproses bertanggal: TGL REGISTRASI (hari sejak epoch) & indeks tahap berjalan"""
+        if "TGL REGISTRASI" not in df.columns:
+            return {"registrasi": [], "tahap": []}
+        tahapan = list(self.SOP_TAHAPAN.keys())
+        buka = ((df["STATUS"].astype(str) == "Diproses") & df["TGL REGISTRASI"].notna()).to_numpy()
+        terisi = np.zeros((int(buka.sum()), len(tahapan)), dtype=bool)
+        for j, tahap in enumerate(tahapan):
+            if tahap in df.columns:
+                terisi[:, j] = df[tahap].notna().to_numpy()[buka]
+        akhir = np.where(terisi.any(axis=1), len(tahapan) - 1 - np.argmax(terisi[:, ::-1], axis=1), -1)
+        return {
+            "registrasi": df["TGL REGISTRASI"].to_numpy(dtype="datetime64[D]")[buka].astype("int64").tolist(),
+            "tahap": np.minimum(akhir + 1, len(tahapan) - 1).tolist(),
+        }
+
+    @st.cache_resource
+    def cache_bersama(_self) -> "CacheDisk":
+        """Backend cache lintas proses (satu objek per proses)"""
+        return CacheDisk(
+            baca_konfigurasi("cache_dir", ".pbg_cache"),
+            ttl=float(baca_konfigurasi("cache_ttl", 300))
         )
 
-        client = gspread.authorize(creds)
-        sheet = client.open_by_key("1LEKCe-bbye_mPx9pH-w22LOE95MqFD3ZEp5rLQoqVxg").sheet1
+    @cache_terukur(max_entries=2)
+    def baca_cache_bersama(_self, versi):
+        """Baca frame siap pakai satu versi dari cache bersama (sekali per proses)"""
+        return _self.cache_bersama().baca(versi)
 
-        df = pd.DataFrame(sheet.get_all_records())
+    @st.cache_data
+    def baca_sop(_self, path: str, waktu_ubah: float) -> Tuple[Dict[str, int], int]:
+        """
+        Baca file SOP JSON: {"batas_hari_sop": 23, "sop_tahapan": {tahap: hari}}.
+        Di-cache per waktu ubah file, jadi file yang disunting langsung terbaca ulang.
+        Tahapan yang tidak disebut memakai nilai bawaan.
+        """
+        with open(path, encoding="utf-8") as f:
+            isi = json.load(f)
+
+        tahapan = isi.get("sop_tahapan", {})
+        asing = [t for t in tahapan if t not in _self.SOP_BAWAAN]
+        if asing:
+            raise ValueError(f"Tahapan tidak dikenal: {', '.join(asing)}")
+        sop = {t: int(tahapan.get(t, hari)) for t, hari in _self.SOP_BAWAAN.items()}
+        batas = int(isi.get("batas_hari_sop", _self.BATAS_BAWAAN))
+        if batas <= 0 or any(h < 0 for h in sop.values()):
+            raise ValueError("Batas hari SOP harus bilangan positif dan SOP tahapan tidak boleh negatif (0 = selesai di hari yang sama)")
+        return sop, batas
+
+    def muat_sop(self):
+        """Isi SOP_TAHAPAN, BATAS_HARI_SOP & kode_sop dari file SOP (bila ada)"""
+        path = baca_konfigurasi("sop_path", "sop.json")
+        if os.path.exists(path):
+            try:
+                self.SOP_TAHAPAN, self.BATAS_HARI_SOP = self.baca_sop(path, os.path.getmtime(path))
+            except (ValueError, TypeError, AttributeError) as e:
+                st.warning(f"⚠️ File SOP '{path}' tidak valid, memakai SOP bawaan: {e}")
+        isi = json.dumps([self.BATAS_HARI_SOP, list(self.SOP_TAHAPAN.items())])
+        self.kode_sop = hashlib.sha1(isi.encode("utf-8")).hexdigest()[:8]
+
+    @cache_terukur(max_entries=4)
+    def terapkan_sop(_self, kunci, kode_sop, _df):
+        """
+        Kolom yang bergantung SOP, dihitung dari tanggal yang sudah di-parse:
+        STATUS (bila sheet tidak mengisinya, atau selalu pada mode tulis_status
+        karena isi sheet adalah hasil tulis balik sebelumnya) dan bitmask
+        TAHAP MELEBIHI SOP. Di-cache per (frame, kode SOP); parse & fetch tidak diulang.
+        """
+        return _self.hitung_kolom_sop(_df, _self.matriks_tanggal(kunci, _df))
+
+    def hitung_kolom_sop(self, df, m):
+        """Isi terapkan_sop tanpa cache, dengan matriks tanggal frame yang sama"""
+        df = df.copy(deep=False)
+
+        if baca_konfigurasi("tulis_status", "tidak") == "ya" or (df["STATUS"].astype(str) == "").all():
+            status = self.hitung_status(df, m)
+            df["STATUS"] = pd.Categorical(status, categories=sorted(set(status)))
+
+        sop = np.array(list(self.SOP_TAHAPAN.values()))
+        with np.errstate(invalid="ignore"):
+            lewat = m["durasi"] > sop
+        lewat[(df["STATUS"].astype(str) == "Diproses").to_numpy()] = False
+        df["TAHAP MELEBIHI SOP"] = (lewat.astype("uint16") << np.arange(len(sop), dtype="uint16")).sum(axis=1).astype("uint16")
         return df
-    
-    def normalize_workday(self, dt):
+
+    def versi_data(self, df_raw) -> str:
+        """Sidik jari isi sheet, dipakai sebagai kunci cache per versi data"""
+        hash_baris = pd.util.hash_pandas_object(df_raw.astype(str), index=False).values
+        kolom = "|".join(map(str, df_raw.columns)).encode("utf-8")
+        return hashlib.sha1(kolom + hash_baris.tobytes()).hexdigest()[:16]
+
+    def parse_tanggal(self, series):
         """
-        Geser tanggal yang jatuh di Sabtu/Minggu ke Senin terdekat.
+        Parse kolom tanggal dd/mm/yyyy secara vektor.
+        Nilai kosong dan "-" menjadi NaT; format campuran dicoba ulang per nilai.
         """
-        if dt is None or pd.isna(dt):
-            return None
+        teks = series.astype(str).str.strip()
+        kosong = teks.isin(["", "-", "nan", "None", "NaT"])
+        hasil = pd.to_datetime(teks.where(~kosong), dayfirst=True, errors="coerce")
+
+        gagal = hasil.isna() & ~kosong
+        if gagal.any():
+            hasil[gagal] = pd.to_datetime(teks[gagal], dayfirst=True, errors="coerce", format="mixed")
+        return hasil.astype("datetime64[ns]")
+
+    def parse_retribusi(self, series):
+        """Versi vektor dari konversi 'Rp 1.500.000,00' -> 1500000 (gagal -> 0)"""
+        teks = series.astype(str).str.replace(r"[^0-9.,]", "", regex=True)
+        teks = teks.str.split(",").str[0].str.replace(".", "", regex=False)
+        return pd.to_numeric(teks, errors="coerce").fillna(0).astype("int64")
+
+    def cari_kolom_retribusi(self, df) -> Optional[str]:
+        """Cari nama kolom retribusi yang dipakai di sheet"""
+        for k in self.KOLOM_RETRIBUSI:
+            if k in df.columns:
+                return k
+        return None
+
+    def kolom_kosong(self, df_raw) -> List[str]:
+        """Kolom tanpa judul / tanpa isi yang tidak dipakai halaman mana pun"""
+        return [
+            c for c in df_raw.columns
+            if c not in self.KOLOM_WAJIB and (
+                str(c).strip() == "" or df_raw[c].astype(str).str.strip().isin(["", "nan", "None"]).all()
+            )
+        ]
 
-        if dt.weekday() == 5:      # Sabtu
-            return dt + pd.Timedelta(days=2)
-        elif dt.weekday() == 6:    # Minggu
-            return dt + pd.Timedelta(days=1)
-        return dt  
+    @cache_terukur(max_entries=2)
+    def siapkan_data(_self, versi, _df_raw, buang_kolom_kosong: bool = True):
+        """
+        Bentuk frame siap pakai untuk semua halaman (sekali per versi data):
+        STATUS dihitung, tanggal jadi datetime64, retribusi & TOTAL HARI jadi
+        integer, teks berulang jadi category, kolom kosong dibuang.
+        Hasilnya dibagi ke semua sesi, jadi halaman tidak boleh mengubahnya.
+        """
+        df = _df_raw.copy()
+        if buang_kolom_kosong:
+            df = df.drop(columns=_self.kolom_kosong(df))
+
+        # STATUS yang kosong di sheet diisi terapkan_sop (bergantung SOP, bukan versi data)
+        if "STATUS" not in df.columns:
+            df["STATUS"] = ""
+
+        # Teks asli disimpan dulu untuk validasi setelah parse
+        kolom_tanggal = [k for k in ["TGL REGISTRASI"] + list(_self.SOP_TAHAPAN.keys()) if k in df.columns]
+        kolom_retribusi = _self.cari_kolom_retribusi(df)
+        teks_asli = df[kolom_tanggal + ([kolom_retribusi] if kolom_retribusi else [])].copy()
+
+        for kolom in kolom_tanggal:
+            df[kolom] = _self.parse_tanggal(df[kolom])
+
+        if kolom_retribusi:
+            df[kolom_retribusi] = _self.parse_retribusi(df[kolom_retribusi])
+
+        for kolom, nilai in _self.validasi_data(teks_asli, df).items():
+            df[kolom] = nilai
+
+        # TOTAL HARI = hari kerja TGL REGISTRASI -> SPPST KADIS
+        if "TGL REGISTRASI" in df.columns and "SPPST KADIS" in df.columns:
+            ada = (df["TGL REGISTRASI"].notna() & df["SPPST KADIS"].notna()).to_numpy()
+            total = pd.Series(pd.NA, index=df.index, dtype="Int64")
+            total[ada] = np.busday_count(
+                df["TGL REGISTRASI"].to_numpy()[ada].astype("datetime64[D]"),
+                df["SPPST KADIS"].to_numpy()[ada].astype("datetime64[D]")
+            )
+            df["TOTAL HARI"] = total
 
-    def hitung_status(self, row):
-        """Hitung status permohonan berdasarkan tahapan"""
-        tgl_registrasi = None
-        
-        # Ambil tanggal registrasi
-        if pd.notna(row.get("TGL REGISTRASI")):
-            try:
-                # tgl_registrasi = pd.to_datetime(row.get("TGL REGISTRASI"), dayfirst=True)
-                tgl_registrasi = self.normalize_workday(
-                    pd.to_datetime(row.get("TGL REGISTRASI"), dayfirst=True, errors="coerce")
-                    )
+        # Teks berulang -> category
+        for kolom in df.columns:
+            s = df[kolom]
+            if not (pd.api.types.is_object_dtype(s) or pd.api.types.is_string_dtype(s)):
+                continue
+            teks = s.where(s.notna(), "").astype(str)
+            if kolom in _self.KOLOM_KATEGORI or teks.nunique() <= max(1, len(teks) // 2):
+                df[kolom] = teks.astype("category")
+            else:
+                # Sel angka & teks bercampur -> satu tipe teks
+                df[kolom] = teks
 
-            except:
-                pass
-        
-        # Cek SPPST KADIS
-        sppst_val = row.get("SPPST KADIS")
-        
-        # Jika SPPST KADIS kosong atau tidak ada, masih diproses
-        if pd.isna(sppst_val) or str(sppst_val).strip() == "":
-            return "Diproses"
-        
-        # Jika SPPST KADIS isi "-", abaikan dan cek tahapan terakhir yang ada
-        if str(sppst_val).strip() == "-":
-            tahapan_list = [
-            "VERIFIKASI BERKAS",
-            "PERBAIKAN BERKAS I",
-            "MELENGKAPI PERBAIKAN BERKAS I", 
-            "VERIFIKASI SUBKO/TPT",
-            "VERIFIKASI TPA",
-            "PERBAIKAN BERKAS II",
-            "VERIFIKASI KABID",
-            "PERBAIKAN BERKAS III",
-            "PENILAIAN TEKNIS TPT/TPA",
-            "PERHITUNGAN VOLUME",
-            "TTD GAMBAR KABID",
-            "TTD GAMBAR KADIS",
-            "SCAN GAMBAR + BA TPT/TPA",
-            "KONSULTASI TPA + INPUT RETRIBUSI",
-            "SPPST KADIS"
-            ]
-            
-            # Cari tahapan terakhir yang ada datanya (bukan kosong dan bukan "-")
-            tgl_terakhir = None
-            
-            for tahap in reversed(tahapan_list):
-                val = row.get(tahap)
-                if pd.notna(val) and str(val).strip() != "" and str(val).strip() != "-":
-                    try:
-                        # tgl_terakhir = pd.to_datetime(val, dayfirst=True)
-                        tgl_terakhir = self.normalize_workday(
-                            pd.to_datetime(val, dayfirst=True, errors="coerce")
-                            )
-                        break
-
-                    except:
-                        pass
+        return df
+
+    def validasi_data(self, teks_asli, df) -> Dict[str, np.ndarray]:
+        """
+        Satu pass validasi vektor (di dalam siapkan_data, jadi sekali per versi):
+        bandingkan teks asli dengan hasil parse dan simpan sebagai bitmask.
+        """
+        def terisi(kolom):
+            teks = teks_asli[kolom].astype(str).str.strip()
+            return ~teks.isin(["", "-", "nan", "None", "NaT"]).to_numpy()
+
+        flag = np.zeros(len(df), dtype="uint8")
+        if "TGL REGISTRASI" in df.columns:
+            ada_reg = terisi("TGL REGISTRASI")
+            flag[~ada_reg] |= self.FLAG_KUALITAS["TGL REGISTRASI kosong"]
+            flag[ada_reg & df["TGL REGISTRASI"].isna().to_numpy()] |= self.FLAG_KUALITAS["TGL REGISTRASI tidak terbaca"]
+            sebelumnya = df["TGL REGISTRASI"].to_numpy(dtype="datetime64[ns]")
+        else:
+            flag[:] = self.FLAG_KUALITAS["TGL REGISTRASI kosong"]
+            sebelumnya = np.full(len(df), np.datetime64("NaT"), dtype="datetime64[ns]")
+
+        # Tahapan dibandingkan dengan tahap terisi sebelumnya (aturan yang sama dengan matriks_tanggal)
+        tidak_terbaca = np.zeros(len(df), dtype="uint16")
+        mundur = np.zeros(len(df), dtype="uint16")
+        for i, tahap in enumerate(self.SOP_TAHAPAN):
+            if tahap not in df.columns:
+                continue
+            tanggal = df[tahap].to_numpy(dtype="datetime64[ns]")
+            ada = ~np.isnat(tanggal)
+            tidak_terbaca[terisi(tahap) & ~ada] |= np.uint16(1 << i)
+            mundur[ada & ~np.isnat(sebelumnya) & (tanggal < sebelumnya)] |= np.uint16(1 << i)
+            sebelumnya = np.where(ada, tanggal, sebelumnya)
+        flag[tidak_terbaca > 0] |= self.FLAG_KUALITAS["Tanggal tahapan tidak terbaca"]
+        flag[mundur > 0] |= self.FLAG_KUALITAS["Tanggal tahapan mundur"]
+
+        kolom_retribusi = self.cari_kolom_retribusi(df)
+        if kolom_retribusi:
+            tanpa_angka = ~teks_asli[kolom_retribusi].astype(str).str.contains(r"\d", regex=True).to_numpy()
+            flag[terisi(kolom_retribusi) & tanpa_angka] |= self.FLAG_KUALITAS["Retribusi bukan angka"]
+
+        # SPPST "-" berarti tahap akhir dilewati (beda dengan kosong = masih diproses)
+        if "SPPST KADIS" in teks_asli.columns:
+            dilewati = (teks_asli["SPPST KADIS"].astype(str).str.strip() == "-").to_numpy()
+        else:
+            dilewati = np.zeros(len(df), dtype=bool)
+
+        return {
+            "FLAG DATA": flag, "TAHAP TIDAK TERBACA": tidak_terbaca,
+            "TAHAP MUNDUR": mundur, "SPPST DILEWATI": dilewati,
+        }
+
+    @cache_terukur(max_entries=2)
+    def ringkasan_kualitas(_self, versi, _df) -> Dict[str, pd.DataFrame]:
+        """Ringkasan bitmask kualitas data: per jenis masalah dan per tahapan"""
+        if "FLAG DATA" not in _df.columns:
+            kosong = pd.DataFrame(columns=["MASALAH", "JUMLAH BARIS"])
+            return {"masalah": kosong, "tahap": pd.DataFrame(columns=["TAHAP", "TIDAK TERBACA", "MUNDUR"]), "baris": _df.iloc[:0]}
+
+        flag = _df["FLAG DATA"].to_numpy()
+        tidak_terbaca = _df["TAHAP TIDAK TERBACA"].to_numpy()
+        mundur = _df["TAHAP MUNDUR"].to_numpy()
+        masalah = pd.DataFrame({
+            "MASALAH": list(_self.FLAG_KUALITAS),
+            "JUMLAH BARIS": [int(((flag & bit) > 0).sum()) for bit in _self.FLAG_KUALITAS.values()],
+        })
+        tahap = pd.DataFrame({
+            "TAHAP": list(_self.SOP_TAHAPAN),
+            "TIDAK TERBACA": [int(((tidak_terbaca >> i) & 1).sum()) for i in range(len(_self.SOP_TAHAPAN))],
+            "MUNDUR": [int(((mundur >> i) & 1).sum()) for i in range(len(_self.SOP_TAHAPAN))],
+        })
+
+        # Baris bermasalah (selain registrasi kosong yang wajar untuk berkas baru)
+        bermasalah = (flag & ~np.uint8(_self.FLAG_KUALITAS["TGL REGISTRASI kosong"])) > 0
+        kolom = [k for k in ["NO. REGISTRASI", "NAMA PEMOHON", "STATUS"] if k in _df.columns]
+        baris = _df.loc[bermasalah, kolom].copy()
+        baris["MASALAH"] = [
+            ", ".join(nama for nama, bit in _self.FLAG_KUALITAS.items() if f & bit)
+            for f in flag[bermasalah]
+        ]
+        return {"masalah": masalah, "tahap": tahap, "baris": baris.reset_index(drop=True)}
+
+    @cache_terukur(max_entries=2)
+    def laporan_memori(_self, versi, _df_raw, _df_siap):
+        """Pemakaian memori (bytes) per kolom sebelum dan sesudah persiapan"""
+        sebelum = _df_raw.memory_usage(deep=True, index=False)
+        sesudah = _df_siap.memory_usage(deep=True, index=False)
+        laporan = pd.DataFrame({"Sebelum (bytes)": sebelum, "Sesudah (bytes)": sesudah})
+        laporan = laporan.fillna(0).astype("int64")
+        laporan.loc["TOTAL"] = laporan.sum()
+        return laporan
+
+    def hari_selesai(self, df, m) -> np.ndarray:
+        """
+        Hari kerja registrasi -> selesai per baris (NaN = masih diproses):
+        SPPST KADIS kosong -> belum selesai; SPPST "-" -> pakai tahapan terakhir
+        yang terisi. Tanggal yang tidak terbaca (lihat FLAG DATA) dianggap belum selesai.
+        """
+        n = len(df)
+        tahapan = list(self.SOP_TAHAPAN.keys())
+        if "SPPST KADIS" not in df.columns:
+            return np.full(n, np.nan)
+
+        tanggal = m["tahapan"]
+        j_sppst = tahapan.index("SPPST KADIS")
+        dilewati = df["SPPST DILEWATI"].to_numpy(dtype=bool) if "SPPST DILEWATI" in df.columns else np.zeros(n, dtype=bool)
+        if "TAHAP TIDAK TERBACA" in df.columns:
+            tidak_terbaca = df["TAHAP TIDAK TERBACA"].to_numpy()[:, None] >> np.arange(len(tahapan))
+        else:
+            tidak_terbaca = np.zeros(tanggal.shape, dtype="uint16")
+
+        # Tahapan terakhir yang terisi, termasuk yang isinya tidak terbaca
+        terisi = ~np.isnat(tanggal) | (tidak_terbaca & 1).astype(bool)
+        terisi[:, j_sppst] = False
+        j_akhir = len(tahapan) - 1 - np.argmax(terisi[:, ::-1], axis=1)
+        tgl_akhir = np.where(terisi.any(axis=1), tanggal[np.arange(n), j_akhir], np.datetime64("NaT"))
+
+        selesai = np.where(dilewati, tgl_akhir, tanggal[:, j_sppst])
+        return self.hari_kerja_vektor(m["registrasi"], selesai)
+
+    def hitung_status(self, df, m) -> np.ndarray:
+        """STATUS per baris (vektor): hari_selesai <= BATAS_HARI_SOP -> Tepat waktu"""
+        total_hari = self.hari_selesai(df, m)
+        status = np.full(len(df), "Diproses", dtype=object)
+        ada = ~np.isnan(total_hari)
+        status[ada] = np.where(total_hari[ada] <= self.BATAS_HARI_SOP, "Tepat waktu", "Terlambat")
+        return status
+
+    def highlight_terlambat(self, tampil, lewat):
+        """
+        Gaya tabel (Styler.apply axis=None): merahkan tahapan yang bitnya menyala
+        di TAHAP MELEBIHI SOP (dihitung sekali di terapkan_sop).
+        """
+        styles = pd.DataFrame("", index=tampil.index, columns=tampil.columns)
+        for i, tahap in enumerate(self.SOP_TAHAPAN):
+            if tahap in tampil.columns:
+                styles.loc[((lewat >> i) & 1).astype(bool), tahap] = 'background-color: #fee2e2; color: #dc2626; font-weight: bold'
+        return styles
+
+    def tabel_bergaya(self, tampil, lewat):
+        """
+        Tabel dengan penanda merah tahap lewat SOP. Styler mahal dan dibatasi
+        Streamlit, jadi hasil besar ditampilkan tanpa warna.
+        """
+        if tampil.size > self.BATAS_SEL_GAYA:
+            st.caption(
+                f"ℹ️ Penanda merah hanya untuk hasil ≤ {self.BATAS_SEL_GAYA:,} sel; "
+                "persempit filter untuk melihatnya."
+            )
+            return tampil
+        return tampil.style.apply(self.highlight_terlambat, axis=None, lewat=lewat)
+
+    def highlight_tahap_lewat(self, row):
+        """Merahkan tahap berjalan / sisa hari pada tabel berkas berisiko"""
+        styles = [''] * len(row)
+        merah = 'background-color: #fee2e2; color: #dc2626; font-weight: bold'
+        if row.get("TAHAP LEWAT SOP"):
+            styles[row.index.get_loc("TAHAP BERJALAN")] = merah
+        if row.get("SISA HARI KERJA", 0) < 0:
+            styles[row.index.get_loc("SISA HARI KERJA")] = merah
+        return styles
+
+    def get_statistics(self) -> Dict:
+        """Hitung statistik utama"""
+        if self.partisi is not None:
+            jumlah = self.jumlah_status()
+            return {
+                "total": sum(jumlah.values()),
+                "selesai": jumlah.get("Tepat waktu", 0),
+                "diproses": jumlah.get("Diproses", 0),
+                "terlambat": jumlah.get("Terlambat", 0)
+            }
+
+        if self.df.empty:
+            return {"total": 0, "selesai": 0, "diproses": 0, "terlambat": 0}
             
-            if tgl_terakhir and tgl_registrasi:
-                # total_hari = (tgl_terakhir - tgl_registrasi).days
-                total_hari = self.hitung_hari_kerja(tgl_registrasi, tgl_sppst)
-                return "Tepat waktu" if total_hari <= 23 else "Terlambat"
-            else:
-                return "Diproses"
+        if "STATUS" not in self.df.columns:
+            return {"total": len(self.df), "selesai": 0, "diproses": 0, "terlambat": 0}
         
-        # Jika SPPST KADIS ada tanggalnya, hitung dari TGL REGISTRASI
-        try:
-            # tgl_sppst = pd.to_datetime(sppst_val, dayfirst=True)
-            tgl_sppst = self.normalize_workday(
-                pd.to_datetime(sppst_val, dayfirst=True, errors="coerce")
-                )
+        total = len(self.df)
+        if self.sql:
+            jumlah = self.sql.hitung_status()
+        else:
+            jumlah = self.df["STATUS"].value_counts().to_dict()
+        return {
+            "total": total,
+            "selesai": jumlah.get("Tepat waktu", 0),
+            "diproses": jumlah.get("Diproses", 0),
+            "terlambat": jumlah.get("Terlambat", 0)
+        }
 
-            if tgl_registrasi:
-                # total_hari = (tgl_sppst - tgl_registrasi).days
-                total_hari = self.hitung_hari_kerja(tgl_registrasi, tgl_sppst)
-                return "Tepat waktu" if total_hari <= 23 else "Terlambat"
-            else:
-                return "Diproses"
-        except:
-            return "Diproses"
-        
-    def hitung_hari_kerja(self, start_date, end_date):
-        """ Hitung jumlah hari kerja (Senin–Jumat)"""
-        if pd.isna(start_date) or pd.isna(end_date):
+    # ================================
+    # QUERY HALAMAN (pandas atau SQL)
+    # ================================
+    @cache_terukur(max_entries=1)
+    def siapkan_sql(_self, versi, _df):
+        """Muat frame siap pakai ke SQLite lokal sekali per versi data"""
+        penyimpanan = PenyimpananSQL(baca_konfigurasi("sql_path", "pbg_data.sqlite"), versi)
+        penyimpanan.muat(_df, _self.cari_kolom_retribusi(_df))
+        return penyimpanan
+
+    def frame_tahun(self, tahun: Optional[List[int]]):
+        """Frame untuk sebagian tahun registrasi (None = semua); mode partisi hanya membaca tahun itu"""
+        if self.partisi is None or tahun is None:
+            return self.df
+        return self.terapkan_sop(
+            self.kunci_frame(tahun), self.kode_sop, self.data_tahun(self.versi_dasar, tuple(str(t) for t in tahun))
+        )
+
+    def kunci_frame(self, tahun: Optional[List[int]]) -> str:
+        """Kunci cache (matriks_tanggal dll.) untuk frame yang dikembalikan frame_tahun"""
+        if self.partisi is None or tahun is None:
+            return self.versi_dasar
+        return f"{self.versi_dasar}:{','.join(str(t) for t in tahun)}"
+
+    def daftar_tahun(self) -> List[int]:
+        """Tahun registrasi yang ada di data, urut naik"""
+        if self.partisi is not None:
+            return sorted(int(t) for t in self.partisi if t != "-")
+        if "TGL REGISTRASI" not in self.df.columns:
+            return []
+        return sorted(int(t) for t in self.df["TGL REGISTRASI"].dt.year.dropna().unique())
+
+    def jumlah_status(self) -> Dict[str, int]:
+        """Jumlah permohonan per STATUS"""
+        if self.partisi is not None:
+            jumlah: Dict[str, int] = {}
+            for ringkasan in self.ringkasan_partisi(self.versi_dasar, self.kode_sop).values():
+                for status, n in ringkasan["status"].items():
+                    jumlah[status] = jumlah.get(status, 0) + n
+            return jumlah
+        if self.sql:
+            return self.sql.hitung_status()
+        jumlah = self.df["STATUS"].astype(str).value_counts()
+        return {str(k): int(v) for k, v in jumlah.items()}
+
+    def jumlah_bertanggal(self) -> Tuple[int, int]:
+        """(baris dengan TGL REGISTRASI, total baris)"""
+        if self.partisi is not None:
+            ringkasan = self.ringkasan_partisi(self.versi_dasar, self.kode_sop).values()
+            return sum(r["bertanggal"] for r in ringkasan), sum(sum(r["status"].values()) for r in ringkasan)
+        return int(self.df["TGL REGISTRASI"].notna().sum()), len(self.df)
+
+    def urutkan_aktivitas(self, df):
+        """Permohonan Terlambat/Diproses: Diproses dulu, lalu tanggal registrasi terbaru"""
+        df_priority = df[df["STATUS"].isin(["Terlambat", "Diproses"])].copy()
+        if "TGL REGISTRASI" not in df_priority.columns:
+            df_priority["TGL REGISTRASI"] = pd.NaT
+        df_priority["sort_priority"] = df_priority["STATUS"].astype(str).map({"Diproses": 1, "Terlambat": 2})
+        return df_priority.sort_values(["sort_priority", "TGL REGISTRASI"], ascending=[True, False])
+
+    def aktivitas_terbaru(self, n: int = 5):
+        """n permohonan teratas untuk kartu Aktivitas Terbaru"""
+        if self.partisi is None:
+            return self.urutkan_aktivitas(self.df).head(n)
+        # Tiap partisi sudah menyimpan 5 teratasnya; 5 teratas gabungan ada di antaranya
+        kandidat = pd.DataFrame(
+            [a for r in self.ringkasan_partisi(self.versi_dasar, self.kode_sop).values() for a in r["aktivitas"]],
+            columns=["NO. REGISTRASI", "NAMA PEMOHON", "STATUS", "TGL REGISTRASI"]
+        )
+        kandidat["TGL REGISTRASI"] = pd.to_datetime(kandidat["TGL REGISTRASI"])
+        return self.urutkan_aktivitas(kandidat).head(n)
+
+    def filter_pencarian(self, kolom: str, kata_kunci: str, status_filter: List[str],
+                         tahun: Optional[List[int]] = None):
+        """Baris yang cocok dengan kata kunci dan filter STATUS (opsional: hanya tahun tertentu)"""
+        if self.sql and kolom in PenyimpananSQL.KOLOM_CARI:
+            return self.df.iloc[self.sql.cari(kolom, kata_kunci, status_filter)]
+
+        df = self.frame_tahun(tahun)
+        mask = pd.Series(True, index=df.index)
+        if kata_kunci.strip():
+            mask &= df[kolom].astype(str).str.contains(kata_kunci, case=False, na=False, regex=False)
+        if status_filter:
+            mask &= df["STATUS"].isin(status_filter)
+        return df[mask]
+
+    def filter_rentang_tanggal(self, start_date, end_date):
+        """Baris dengan TGL REGISTRASI di antara dua tanggal (inklusif)"""
+        if self.sql:
+            return self.df.iloc[self.sql.rentang_tanggal(start_date, end_date)]
+        tahun = None
+        if self.partisi is not None:
+            # Hanya partisi tahun yang beririsan dengan rentang yang dibaca
+            tahun = [t for t in self.daftar_tahun() if start_date.year <= t <= end_date.year]
+        df = self.frame_tahun(tahun)
+        return df[
+            (df["TGL REGISTRASI"] >= start_date) &
+            (df["TGL REGISTRASI"] <= end_date)
+        ]
+
+    def hitung_bulanan_frame(self, df, tahun: Optional[int] = None):
+        """Jumlah permohonan per bulan per STATUS dari satu frame, urut bulan"""
+        df_mon = df[df["TGL REGISTRASI"].notna()]
+        if tahun is not None:
+            df_mon = df_mon[df_mon["TGL REGISTRASI"].dt.year == tahun]
+        bulan = df_mon["TGL REGISTRASI"].dt.to_period("M").astype(str).rename("Bulan")
+        status = df_mon["STATUS"].astype(str)
+        return (
+            df_mon.groupby([bulan, status]).size()
+            .reset_index(name="Jumlah")
+            .sort_values(["Bulan", "STATUS"], ignore_index=True)
+        )
+
+    def hitung_bulanan(self, pilih_tahun):
+        """Jumlah permohonan per bulan per STATUS, urut bulan"""
+        tahun = None if pilih_tahun == "Semua Tahun" else int(pilih_tahun)
+        if self.sql:
+            return self.sql.hitung_bulanan(tahun)
+        if self.partisi is None:
+            return self.hitung_bulanan_frame(self.df, tahun)
+
+        ringkasan = self.ringkasan_partisi(self.versi_dasar, self.kode_sop)
+        kunci = [t for t in ringkasan if t != "-" and (tahun is None or t == str(tahun))]
+        baris = [b for t in kunci for b in ringkasan[t]["bulanan"]]
+        return (
+            pd.DataFrame(baris, columns=["Bulan", "STATUS", "Jumlah"])
+            .astype({"Jumlah": "int64"})
+            .sort_values(["Bulan", "STATUS"], ignore_index=True)
+        )
+
+    def total_retribusi(self, tahun_pilihan) -> int:
+        """Total retribusi baris bertanggal registrasi, per tahun atau semua"""
+        if self.partisi is not None:
+            ringkasan = self.ringkasan_partisi(self.versi_dasar, self.kode_sop)
+            if tahun_pilihan == "Semua Tahun":
+                return sum(r["retribusi"] for t, r in ringkasan.items() if t != "-")
+            return ringkasan.get(str(tahun_pilihan), {}).get("retribusi", 0)
+
+        kolom_retribusi = self.cari_kolom_retribusi(self.df)
+        if kolom_retribusi is None or "TGL REGISTRASI" not in self.df.columns:
             return 0
+        tahun = None if tahun_pilihan == "Semua Tahun" else int(tahun_pilihan)
+        if self.sql:
+            return self.sql.total_retribusi(tahun)
+
+        tgl_reg = self.df["TGL REGISTRASI"]
+        mask = tgl_reg.notna() if tahun is None else tgl_reg.dt.year == tahun
+        return int(self.df.loc[mask, kolom_retribusi].sum())
+
+    # ================================
+    # LOG PERUBAHAN (sekali per versi data)
+    # ================================
+    @st.cache_resource
+    def log_perubahan(_self) -> LogPerubahan:
+        return LogPerubahan(
+            baca_konfigurasi(
+                "log_perubahan", os.path.join(baca_konfigurasi("cache_dir", ".pbg_cache"), "pbg_perubahan.jsonl")
+            ),
+            int(float(baca_konfigurasi("log_batas_mb", 5)) * 1e6),
+        )
 
-        start = np.datetime64(start_date.date())
-        end = np.datetime64(end_date.date()) 
+    def snapshot_perubahan(self, df, m) -> pd.DataFrame:
+        """Snapshot ringkas per permohonan: hash baris (tanpa kolom bantu), tahap terakhir, STATUS"""
+        kolom = [c for c in df.columns if c not in self.KOLOM_FLAG and c != "TOTAL HARI"]
+        no = df["NO. REGISTRASI"].astype(str) if "NO. REGISTRASI" in df.columns else pd.Series("", index=df.index)
+        return pd.DataFrame({
+            "KUNCI": PenulisStatus.kunci_baris(no),
+            "NO": no.to_numpy(),
+            "HASH": pd.util.hash_pandas_object(df[kolom], index=False).to_numpy(),
+            "TAHAP": m["tahap_akhir"].astype("int8"),
+            "STATUS": df["STATUS"].astype(str).to_numpy(),
+        })
+
+    def snapshot_versi(self) -> pd.DataFrame:
+        """Snapshot versi ini; mode partisi disusun per partisi tahun tanpa memuat frame penuh"""
+        if self.partisi is None:
+            return self.snapshot_perubahan(self.df, self.matriks_tanggal(self.versi_dasar, self.df))
+        snapshot = pd.concat([self.snapshot_perubahan(df, m) for df, m in self.telusuri_partisi()], ignore_index=True)
+        # Urutan nomor ganda dihitung ulang atas gabungan, sama seperti frame penuh
+        snapshot["KUNCI"] = PenulisStatus.kunci_baris(snapshot["NO"])
+        return snapshot
+
+    @st.cache_resource(max_entries=1)
+    def perbarui_log_perubahan(_self, versi) -> int:
+        """Bandingkan versi ini dengan snapshot sebelumnya lalu tambahkan kejadian ke log"""
+        return _self.log_perubahan().perbarui(
+            _self.versi_dasar, versi, _self.snapshot_versi(), list(_self.SOP_TAHAPAN)
+        )
 
-        return np.busday_count(start, end)    
+    def catat_perubahan(self):
+        """Catat perubahan versi ini bila belum (cek state dulu agar frame tidak dimuat tanpa perlu)"""
+        if self.log_perubahan().state().get("versi") != self.versi:
+            self.perbarui_log_perubahan(self.versi)
+
+    # ================================
+    # TULIS BALIK STATUS (opsional, sekali per versi)
+    # ================================
+    @st.cache_resource
+    def penulis_status(_self) -> PenulisStatus:
+        return PenulisStatus(
+            float(baca_konfigurasi("tulis_per_menit", 50)),
+            int(baca_konfigurasi("tulis_batch", 5000)),
+            baca_konfigurasi("tulis_status_timpa", "tidak") == "ya",
+            os.path.join(baca_konfigurasi("cache_dir", ".pbg_cache"), "tulis_status"),
+        )
 
-    def highlight_terlambat(self, row):
-        if row.get("STATUS") == "Diproses":
-            return [''] * len(row)
+    @st.cache_resource(max_entries=1)
+    def tulis_balik_status(_self, versi, _df) -> Dict:
+        """
+        Tulis STATUS & TOTAL HARI yang berubah ke sheet di thread latar (jeda
+        kuota tidak menahan run). Hasil diisi thread saat selesai; gagal
+        (mis. akun hanya baca) dicatat dan tidak diulang sampai versi berikutnya.
+        """
+        nilai = {"STATUS": _df["STATUS"].astype(str).to_numpy()}
+        if "TOTAL HARI" in _df.columns:
+            nilai["TOTAL HARI"] = _df["TOTAL HARI"].astype("string").fillna("").to_numpy(dtype=object)
+        no = _df["NO. REGISTRASI"].astype(str).to_numpy()
+        tab = _df["TAB ASAL"].astype(str).to_numpy() if "TAB ASAL" in _df.columns else None
+        penulis, metrik = _self.penulis_status(), _self.metrik_sheets()
+        hasil = {"sel": 0, "request": 0}
+
+        def jalankan():
+            jumlah = {"sel": 0, "request": 0}
+            try:
+                client = _self.klien_sheets()
+                for kunci_sheet, judul in _self.daftar_worksheet():
+                    # Urutan nomor ganda dihitung per tab, sama seperti isi tab itu di sheet
+                    pilih = slice(None) if tab is None else tab == _self.nama_tab(kunci_sheet, judul)
+                    sheet = _self.buka_worksheet(kunci_sheet, judul, client=client)
+                    satu = penulis.tulis(
+                        sheet, PenulisStatus.kunci_baris(no[pilih]), {k: v[pilih] for k, v in nilai.items()}, metrik
+                    )
+                    jumlah = {k: jumlah[k] + satu[k] for k in jumlah}
+                hasil.update(jumlah)
+            except Exception as e:
+                hasil["gagal"] = str(e)
+            hasil["waktu"] = datetime.now()
+
+        threading.Thread(target=jalankan, name=f"tulis-status-{versi}", daemon=True).start()
+        return hasil
+
+    # ================================
+    # LAPORAN PERIODE STANDAR (disiapkan di latar, sekali per versi)
+    # ================================
+    @st.cache_resource
+    def artefak_laporan(_self) -> ArtefakLaporan:
+        return ArtefakLaporan(
+            os.path.join(baca_konfigurasi("cache_dir", ".pbg_cache"), "laporan"),
+            batas_mb=float(baca_konfigurasi("laporan_batas_mb", 200)),
+            pekerja=int(baca_konfigurasi("laporan_pekerja", 2)),
+        )
 
-        styles = [''] * len(row)
+    def periode_laporan(self, hari_ini) -> Dict[str, Tuple[str, str]]:
+        """Periode standar {label: (mulai, akhir)}: 30 hari terakhir, lalu tiap tahun & bulan registrasi, terbaru dulu"""
+        periode = {
+            "30 hari terakhir": ((hari_ini - timedelta(days=30)).strftime("%Y-%m-%d"), hari_ini.strftime("%Y-%m-%d"))
+        }
+        for tahun in reversed(self.daftar_tahun()):
+            periode[f"Tahun {tahun}"] = (f"{tahun}-01-01", f"{tahun}-12-31")
+            for bulan in range(12, 0, -1):
+                awal = pd.Timestamp(tahun, bulan, 1)
+                if awal <= hari_ini:
+                    akhir = awal + pd.offsets.MonthEnd(0)
+                    periode[f"Bulan {awal:%Y-%m}"] = (f"{awal:%Y-%m-%d}", f"{akhir:%Y-%m-%d}")
+        return periode
+
+    def ringkasan_laporan(self, df) -> Dict:
+        """Angka kartu ringkasan halaman Laporan"""
+        status = df["STATUS"].astype(str)
+        total = len(df)
+        tepat = int((status == "Tepat waktu").sum())
+        return {
+            "total": total,
+            "tepat": tepat,
+            "diproses": int((status == "Diproses").sum()),
+            "terlambat": int((status == "Terlambat").sum()),
+            "persen": tepat / total * 100 if total else 0.0,
+        }
 
-        tahapan = list(self.SOP_TAHAPAN.keys())
+    def isi_laporan(self, df, mulai, akhir):
+        """(ringkasan, posisi baris di df, frame ekspor) untuk TGL REGISTRASI mulai..akhir (inklusif)"""
+        tgl = df["TGL REGISTRASI"]
+        indeks = np.flatnonzero(((tgl >= mulai) & (tgl <= akhir)).to_numpy())
+        pilih = df.iloc[indeks]
+        return self.ringkasan_laporan(pilih), indeks, pilih.drop(columns=self.KOLOM_FLAG, errors="ignore")
+
+    @st.cache_resource(max_entries=1)
+    def jadwalkan_laporan(_self, versi, hari_ini: str, _df) -> threading.Thread:
+        """Bangun artefak semua periode standar versi ini di thread latar (tidak menunggu)"""
+        periode = {f"{a}_{b}": (a, b) for a, b in _self.periode_laporan(pd.Timestamp(hari_ini)).values()}
+        return _self.artefak_laporan().bangun(
+            versi, periode, lambda a, b: _self.isi_laporan(_df, pd.Timestamp(a), pd.Timestamp(b))
+        )
+
+    @cache_terukur(st.cache_data, max_entries=2)
+    def baca_log_perubahan(_self, bagian: Tuple[Tuple[str, int], ...]) -> pd.DataFrame:
+        """Isi log kejadian (log + hasil rotasinya); di-cache per ukuran file (log hanya bertambah)"""
+        frames = [
+            pd.read_json(path, lines=True, dtype={"no": str, "dari": str, "ke": str, "versi": str})
+            for path, ukuran in bagian if ukuran > 0
+        ]
+        if not frames:
+            return pd.DataFrame(columns=["waktu", "versi", "no", "jenis", "dari", "ke"])
+        log = pd.concat(frames, ignore_index=True)
+        log["waktu"] = pd.to_datetime(log["waktu"])
+        log["jenis"] = pd.Categorical(log["jenis"], categories=LogPerubahan.JENIS)
+        return log
+
+    def perubahan_sejak(self, sejak) -> pd.DataFrame:
+        """Kejadian setelah waktu tertentu, terbaru dulu (hanya membaca log)"""
+        bagian = tuple((p, os.path.getsize(p)) for p in self.log_perubahan().bagian())
+        log = self.baca_log_perubahan(bagian)
+        return log[log["waktu"] > sejak].iloc[::-1]
+
+    # ================================
+    # SNAPSHOT STATIS (penonton baca-saja)
+    # ================================
+    def direktori_snapshot(self) -> Tuple[str, bool]:
+        """
+        (direktori, disajikan Streamlit?). Default: folder static/ di samping
+        baru.py, terbuka di /app/static/ bila server.enableStaticServing aktif.
+        """
+        bawaan = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+        direktori = baca_konfigurasi("snapshot_dir", bawaan)
+        return direktori, os.path.abspath(direktori) == bawaan
+
+    def html_snapshot(self, plotly_js: str) -> str:
+        """
+        Satu halaman HTML: metric card & donut STATUS, Aktivitas Terbaru,
+        tren bulanan semua tahun. Figure disisipkan sebagai JSON Plotly;
+        halaman memuat ulang dirinya tiap cache_ttl detik.
+        """
+        def grafik(chart_id, filter_grafik, config):
+            fig = self.buat_grafik(self.versi, chart_id, filter_grafik)
+            return fig.to_html(full_html=False, include_plotlyjs=False, config=config)
+
+        aktivitas = self.aktivitas_terbaru(5)
+        daftar = (
+            "".join(self.kartu_aktivitas(row) for _, row in aktivitas.iterrows())
+            if len(aktivitas) else self.kartu_aktivitas_kosong()
+        )
+        kartu = self.kartu_statistik(self.get_statistics()) + [
+            self.kartu_retribusi(self.total_retribusi("Semua Tahun"), "Semua Tahun")
+        ]
+        monitoring = ""
+        if self.partisi is not None or "TGL REGISTRASI" in self.df.columns:
+            monitoring = f"""
+            <div class="page-title-card">
+                <h2>Monitoring Permohonan</h2>
+                <p>Tren permohonan bulanan, semua tahun</p>
+            </div>
+            {grafik("tren_bulanan", "Semua Tahun", {"displayModeBar": False})}
+            {self.kotak_info_monitoring("Semua Tahun")}
+            """
+
+        return f"""<!DOCTYPE html>
+<html lang="id">
+<head>
+<meta charset="utf-8">
+<meta http-equiv="refresh" content="{int(float(baca_konfigurasi("cache_ttl", 300)))}">
+<title>i-CON PBG - Ringkasan</title>
+<script src="{plotly_js}"></script>
+{CSS_APLIKASI}
+<style>
+body {{ margin: 0; padding: 1.5rem 2rem; }}
+.baris {{ display: flex; gap: 1rem; margin-bottom: 1.5rem; }}
+.baris > div {{ flex: 1; min-width: 0; }}
+</style>
+</head>
+<body>
+<div class="page-title-card">
+    <h2>Dashboard Beranda</h2>
+    <p>Snapshot data {html.escape(self.versi)} · dibuat {datetime.now().strftime("%d/%m/%Y %H:%M")}</p>
+</div>
+<div class="baris">{"".join(f"<div>{k}</div>" for k in kartu)}</div>
+<div class="baris">
+    <div>
+        <div class="chart-card"><h3>📊 Distribusi Status Permohonan</h3><p>Proporsi berdasarkan status terkini</p></div>
+        {grafik("status", None, {"displayModeBar": False})}
+    </div>
+    <div>
+        <div class="activity-card-header"><h3>📢 Aktivitas Terbaru</h3><p>Permohonan yang perlu perhatian</p></div>
+        {daftar}
+    </div>
+</div>
+{monitoring}
+</body>
+</html>
+"""
+
+    @st.cache_resource(max_entries=1)
+    def tulis_snapshot(_self, versi) -> Dict:
+        """
+        Tulis beranda.html (atomik) sekali per versi data, plus plotly.js
+        lokal sekali per versi plotly, supaya penonton baca-saja cukup
+        membuka file statis tanpa sesi Streamlit.
+        """
+        import plotly
+        from plotly.offline import get_plotlyjs
+
+        direktori, statis = _self.direktori_snapshot()
+        plotly_js = f"plotly-{plotly.__version__}.min.js"
+
+        def tulis(nama, isi: str):
+            # Penonton tidak pernah melihat file setengah jadi
+            path = os.path.join(direktori, nama)
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(isi)
+            os.replace(tmp, path)
+            return path
 
-        # Ambil tanggal registrasi sebagai tahap awal
         try:
-            prev_date = self.normalize_workday(
-                pd.to_datetime(row["TGL REGISTRASI"], dayfirst=True, errors="coerce")
+            os.makedirs(direktori, exist_ok=True)
+            if not os.path.exists(os.path.join(direktori, plotly_js)):
+                tulis(plotly_js, get_plotlyjs())
+            path = tulis("beranda.html", _self.html_snapshot(plotly_js))
+        except OSError as e:
+            return {"gagal": str(e), "waktu": datetime.now()}
+        return {"path": path, "url": "app/static/beranda.html" if statis else None, "waktu": datetime.now()}
+
+    # ================================
+    # ANALITIK SLA (vektor, sekali per versi data)
+    # ================================
+    def hari_kerja_vektor(self, start, end) -> np.ndarray:
+        """
+        np.busday_count untuk array datetime64[D].
+        Pasangan yang memuat NaT menghasilkan NaN (bukan error).
+        """
+        start, end = np.broadcast_arrays(
+            np.asarray(start, dtype="datetime64[D]"),
+            np.asarray(end, dtype="datetime64[D]")
+        )
+        hasil = np.full(start.shape, np.nan)
+        ada = ~(np.isnat(start) | np.isnat(end))
+        hasil[ada] = np.busday_count(start[ada], end[ada])
+        return hasil
+
+    @cache_terukur(max_entries=4)
+    def matriks_tanggal(_self, versi, _df) -> Dict[str, np.ndarray]:
+        """
+        Tanggal registrasi & tahapan SOP sebagai datetime64[D] yang sudah digeser
+        ke hari kerja, plus durasi hari kerja tiap tahapan dari tanggal valid
+        sebelumnya. Durasi ini juga dasar bitmask TAHAP MELEBIHI SOP (highlight_terlambat).
+        """
+        return _self.hitung_matriks_tanggal(_df)
+
+    def hitung_matriks_tanggal(self, df) -> Dict[str, np.ndarray]:
+        """Isi matriks_tanggal tanpa cache (dipakai juga saat menelusuri partisi)"""
+        n = len(df)
+        tahapan = list(self.SOP_TAHAPAN.keys())
+
+        def kolom(nama):
+            if nama not in df.columns:
+                return np.full(n, np.datetime64("NaT"), dtype="datetime64[D]")
+            return np.busday_offset(df[nama].to_numpy(dtype="datetime64[D]"), 0, roll="forward")
+
+        registrasi = kolom("TGL REGISTRASI")
+        tanggal = np.empty((n, len(tahapan)), dtype="datetime64[D]")
+        for j, tahap in enumerate(tahapan):
+            tanggal[:, j] = kolom(tahap)
+
+        # Tahap tanpa tanggal dilewati, tanggal acuan tidak berubah
+        durasi = np.full(tanggal.shape, np.nan)
+        acuan = registrasi.copy()
+        for j in range(len(tahapan)):
+            durasi[:, j] = self.hari_kerja_vektor(acuan, tanggal[:, j])
+            acuan = np.where(np.isnat(tanggal[:, j]), acuan, tanggal[:, j])
+
+        terisi = ~np.isnat(tanggal)
+        tahap_akhir = np.where(
+            terisi.any(axis=1),
+            len(tahapan) - 1 - np.argmax(terisi[:, ::-1], axis=1),
+            -1
+        )
+        return {
+            "registrasi": registrasi,
+            "tahapan": tanggal,
+            "durasi": durasi,
+            "tanggal_akhir": acuan,
+            "tahap_akhir": tahap_akhir,
+        }
+
+    def linimasa_tahapan(self, kunci, df, posisi: int, hari_ini) -> pd.DataFrame:
+        """
+        Tahapan satu permohonan: tanggal, hari kerja aktual vs SOP, kumulatif
+        dari registrasi, keterangan. Hanya mengambil satu baris dari
+        matriks_tanggal frame ini (sudah dihitung untuk STATUS & highlight).
+        """
+        m = self.matriks_tanggal(kunci, df)
+        tahapan = list(self.SOP_TAHAPAN.keys())
+        sop = np.array(list(self.SOP_TAHAPAN.values()))
+        tanggal = m["tahapan"][posisi]
+        aktual = m["durasi"][posisi].copy()
+        akhir = m["tahap_akhir"][posisi]
+
+        kosong = np.isnat(tanggal)
+        with np.errstate(invalid="ignore"):
+            keterangan = np.where(kosong, "Belum", np.where(aktual > sop, "Lewat SOP", "Sesuai SOP")).astype(object)
+        # Kosong sebelum tahap terakhir yang terisi = dilewati ("-")
+        keterangan[:max(akhir, 0)][kosong[:max(akhir, 0)]] = "Dilewati"
+
+        # Tahap berjalan: hari kerja sejak tanggal terakhir sampai hari ini
+        if str(df["STATUS"].iloc[posisi]) == "Diproses" and akhir < len(tahapan) - 1 and not np.isnat(m["tanggal_akhir"][posisi]):
+            j = akhir + 1
+            aktual[j] = np.busday_count(m["tanggal_akhir"][posisi], np.datetime64(hari_ini, "D"))
+            keterangan[j] = "Berjalan, lewat SOP" if aktual[j] > sop[j] else "Berjalan"
+
+        return pd.DataFrame({
+            "TAHAPAN": tahapan,
+            "TANGGAL": pd.to_datetime([df[t].iloc[posisi] if t in df.columns else pd.NaT for t in tahapan]),
+            "HARI KERJA": pd.array(np.where(np.isnan(aktual), None, aktual), dtype="Int64"),
+            "SOP (HARI)": sop,
+            "KUMULATIF": pd.array(np.where(kosong, None, self.hari_kerja_vektor(m["registrasi"][posisi], tanggal)), dtype="Int64"),
+            "KUMULATIF SOP": np.cumsum(sop),
+            "KETERANGAN": keterangan,
+        })
+
+    @cache_terukur(max_entries=2)
+    def berkas_terbuka(_self, versi) -> Dict[str, np.ndarray]:
+        """Berkas Diproses versi ini; mode partisi dari ringkasan partisi tanpa memuat frame"""
+        if _self.partisi is not None:
+            bagian = [r["terbuka"] for r in _self.ringkasan_partisi(_self.versi_dasar, _self.kode_sop).values()]
+        else:
+            bagian = [_self.permohonan_terbuka(_self.df)]
+        return {
+            "registrasi": np.array([x for b in bagian for x in b["registrasi"]], dtype="int64").astype("datetime64[D]"),
+            "tahap": np.array([x for b in bagian for x in b["tahap"]], dtype="int64"),
+        }
+
+    def label_bulan(self, tanggal) -> np.ndarray:
+        """'YYYY-MM' per tanggal; tanpa TGL REGISTRASI -> 'Tanpa tanggal' (bukan kelompok 'NaT')"""
+        bulan = np.asarray(tanggal).astype("datetime64[M]")
+        return np.where(np.isnat(bulan), "Tanpa tanggal", bulan.astype(str)).astype(object)
+
+    @cache_terukur(max_entries=2)
+    def umur_berkas(_self, versi, hari_ini) -> Dict[str, pd.DataFrame]:
+        """
+        Umur berkas Diproses (hari kerja sejak TGL REGISTRASI) dalam kelompok
+        0–5, 6–10, 11–batas SOP, >batas SOP: total, per tahap berjalan dan per
+        bulan registrasi (kohort). Satu busday_count vektor per (versi, hari).
+        """
+        terbuka = _self.berkas_terbuka(versi)
+        umur = np.maximum(np.busday_count(terbuka["registrasi"], np.datetime64(hari_ini, "D")), 0)
+        batas = [5, 10, max(_self.BATAS_HARI_SOP, 11)]
+        label = ["0–5", "6–10", f"11–{batas[2]}", f">{batas[2]}"]
+        tahapan = list(_self.SOP_TAHAPAN.keys())
+
+        frame = pd.DataFrame({
+            "UMUR": pd.Categorical.from_codes(np.searchsorted(batas, umur), label),
+            "TAHAP": pd.Categorical.from_codes(terbuka["tahap"], tahapan),
+            "BULAN": _self.label_bulan(terbuka["registrasi"]),
+        })
+
+        def silang(kolom):
+            return (
+                frame.groupby([kolom, "UMUR"], observed=False).size()
+                .unstack(fill_value=0).reindex(columns=label, fill_value=0)
             )
-        except:
-            return styles
 
-        for tahap in tahapan:
-            col_idx = row.index.get_loc(tahap)
-            sop_hari = self.SOP_TAHAPAN[tahap]
-            nilai = str(row[tahap]).strip()
+        return {
+            "kelompok": frame["UMUR"].value_counts(sort=False).reindex(label),
+            "tahap": silang("TAHAP"),
+            "kohort": silang("BULAN").sort_index(),
+        }
 
-            # Jika tanggal TIDAK ada → skip, prev_date tidak berubah
-            if nilai == "-" or nilai == "":
-                continue
+    @cache_terukur(max_entries=2)
+    def proyeksi_tenggat(_self, versi, hari_ini, _df):
+        """
+        Proyeksi tenggat untuk berkas "Diproses": tenggat = registrasi + batas SOP
+        hari kerja, sisa hari kerja per hari_ini, dan tahap berjalan yang sudah
+        melewati SOP tahapnya. Hasil diurutkan dari yang paling berisiko, jadi
+        N teratas cukup diambil dengan head(N).
+        """
+        m = _self.matriks_tanggal(_self.versi_dasar, _df)
+        tahapan = np.array(list(_self.SOP_TAHAPAN.keys()), dtype=object)
+        sop = np.array(list(_self.SOP_TAHAPAN.values()))
+
+        diproses = (_df["STATUS"].astype(str) == "Diproses").to_numpy()
+        pos = np.flatnonzero(diproses & ~np.isnat(m["registrasi"]))
+
+        hari = np.datetime64(hari_ini, "D")
+        registrasi = m["registrasi"][pos]
+        tenggat = np.busday_offset(registrasi, _self.BATAS_HARI_SOP, roll="forward")
+        sisa = _self.BATAS_HARI_SOP - np.busday_count(registrasi, hari)
+
+        tahap_jalan = np.minimum(m["tahap_akhir"][pos] + 1, len(tahapan) - 1)
+        hari_di_tahap = np.busday_count(m["tanggal_akhir"][pos], hari)
+        lewat = hari_di_tahap - sop[tahap_jalan]
+
+        def ambil(kolom):
+            return _df[kolom].to_numpy()[pos] if kolom in _df.columns else ""
+
+        hasil = pd.DataFrame({
+            "NO. REGISTRASI": ambil("NO. REGISTRASI"),
+            "NAMA PEMOHON": ambil("NAMA PEMOHON"),
+            "TGL REGISTRASI": registrasi.astype("datetime64[ns]"),
+            "TENGGAT": tenggat.astype("datetime64[ns]"),
+            "SISA HARI KERJA": sisa,
+            "TAHAP BERJALAN": tahapan[tahap_jalan],
+            "HARI DI TAHAP": hari_di_tahap,
+            "SOP TAHAP": sop[tahap_jalan],
+            "TAHAP LEWAT SOP": lewat > 0,
+        }, index=_df.index[pos])
+
+        return hasil.sort_values(
+            ["SISA HARI KERJA", "HARI DI TAHAP"], ascending=[True, False], kind="stable"
+        )
 
-            # Jika tanggal ADA → hitung selisih hari kerja
-            try:
-                curr_date = self.normalize_workday(
-                    pd.to_datetime(nilai, dayfirst=True, errors="coerce")
-                )
-            except:
-                # Jika format salah dianggap tidak valid
-                continue
+    @cache_terukur(max_entries=2)
+    def agregat_tahapan(_self, versi, _df) -> Dict[str, pd.DataFrame]:
+        """
+        Agregat durasi hari kerja per tahapan (P50/P90/maks & rasio lewat SOP),
+        per bulan registrasi, per PEMROSES dan per PENILAI TEKNIS.
+        Dihitung sekali per versi data dari matriks durasi; tampilan hanya membaca ini.
+        """
+        m = _self.matriks_tanggal(_self.versi_dasar, _df)
+        tahapan = list(_self.SOP_TAHAPAN.keys())
+        sop = np.array(list(_self.SOP_TAHAPAN.values()))
+        durasi = m["durasi"]
+
+        # Bentuk panjang: satu baris per (permohonan, tahap) yang punya durasi
+        baris, kolom = np.nonzero(~np.isnan(durasi))
+        panjang = pd.DataFrame({
+            "TAHAP": pd.Categorical.from_codes(kolom, categories=tahapan),
+            "DURASI": durasi[baris, kolom],
+            "LEWAT": durasi[baris, kolom] > sop[kolom],
+            "BULAN": _self.label_bulan(m["registrasi"][baris]),
+        })
+        for nama in ["PEMROSES", "PENILAI TEKNIS TPT/TPA"]:
+            if nama in _df.columns:
+                panjang[nama] = _df[nama].to_numpy()[baris]
+
+        def ringkas(kunci):
+            g = panjang.groupby(kunci, observed=True)
+            hasil = pd.DataFrame({
+                "JUMLAH": g.size(),
+                "P50": g["DURASI"].quantile(0.5),
+                "P90": g["DURASI"].quantile(0.9),
+                "MAKS": g["DURASI"].max(),
+                "RASIO LEWAT SOP": g["LEWAT"].mean(),
+            })
+            return hasil.reset_index()
+
+        per_tahap = ringkas(["TAHAP"])
+        per_tahap.insert(1, "SOP", per_tahap["TAHAP"].astype(str).map(_self.SOP_TAHAPAN))
+
+        agregat = {"tahap": per_tahap, "bulan": ringkas(["BULAN", "TAHAP"])}
+        for nama in ["PEMROSES", "PENILAI TEKNIS TPT/TPA"]:
+            if nama in panjang.columns:
+                agregat[nama] = ringkas([nama, "TAHAP"])
+        return agregat
+
+    @cache_terukur(max_entries=2)
+    def dasar_simulasi(_self, versi, _df) -> Dict[str, np.ndarray]:
+        """
+        Bahan simulasi what-if (tidak bergantung SOP): hari kerja sampai selesai,
+        durasi per tahapan dan kode bulan registrasi per baris.
+        """
+        m = _self.matriks_tanggal(versi, _df)
+        bulan = m["registrasi"].astype("datetime64[M]")
+        ada_reg = ~np.isnat(bulan)
+        label, kode = np.unique(bulan[ada_reg], return_inverse=True)
+        kode_bulan = np.zeros(len(_df), dtype=np.int64)
+        kode_bulan[ada_reg] = kode
+        return {
+            "total": _self.hari_selesai(_df, m),
+            "durasi": m["durasi"],
+            "ada_reg": ada_reg,
+            "bulan": kode_bulan,
+            "label_bulan": np.array([str(b) for b in label], dtype=object),
+        }
+
+    @staticmethod
+    def hitung_terlambat_grid(hari, kelompok, n_kelompok: int, batas) -> np.ndarray:
+        """
+        Jumlah baris dengan hari > batas, untuk tiap batas (baris) x kelompok (kolom).
+        Histogram hari per kelompok dibuat sekali, lalu seluruh grid batas
+        dievaluasi dengan satu perkalian matriks. NaN pada hari tidak dihitung.
+        """
+        batas = np.asarray(batas, dtype=np.int64)
+        ada = ~np.isnan(hari)
+        if not ada.any():
+            return np.zeros((len(batas), n_kelompok), dtype=np.int64)
+
+        h = hari[ada].astype(np.int64)
+        awal = h.min()
+        lebar = int(h.max() - awal + 1)
+        hist = np.bincount(
+            kelompok[ada] * lebar + (h - awal), minlength=n_kelompok * lebar
+        ).reshape(n_kelompok, lebar)
+        nilai = np.arange(awal, awal + lebar)
+        return (nilai[None, :] > batas[:, None]).astype(np.int64) @ hist.T
+
+    def simulasi_sop(self, batas, tahap: Optional[str] = None) -> pd.DataFrame:
+        """
+        What-if: jumlah permohonan terlambat per batas hari kerja dan per bulan
+        registrasi. tahap=None -> batas total (berkas yang sudah selesai);
+        tahap diisi -> batas SOP satu tahapan (semua berkas dengan durasi tahap itu).
+        """
+        dasar = self.dasar_simulasi(self.versi_dasar, self.df)
+        if tahap is None:
+            hari = dasar["total"]
+        else:
+            hari = dasar["durasi"][:, list(self.SOP_TAHAPAN).index(tahap)]
+        hari = np.where(dasar["ada_reg"], hari, np.nan)
+
+        grid = self.hitung_terlambat_grid(hari, dasar["bulan"], len(dasar["label_bulan"]), batas)
+        hasil = pd.DataFrame(grid, index=pd.Index(list(batas), name="BATAS HARI"), columns=dasar["label_bulan"])
+        hasil.insert(0, "TOTAL", grid.sum(axis=1))
+        hasil.insert(1, "DASAR", int((~np.isnan(hari)).sum()))
+        return hasil
+
+    @st.cache_resource
+    def penyimpan_beban_kerja(_self) -> AgregatBebanKerja:
+        """Satu agregat beban kerja per proses, diperbarui antar versi data"""
+        return AgregatBebanKerja()
+
+    def beban_kerja(self) -> AgregatBebanKerja:
+        """Agregat beban kerja untuk versi data saat ini (update inkremental)"""
+        agregat = self.penyimpan_beban_kerja()
+        if agregat.versi != self.versi:
+            if self.partisi is None:
+                kontribusi = self.kontribusi_beban_kerja(self.df)
+            else:
+                # Kunci diberi awalan tahun agar nomor ganda antar-partisi tetap unik
+                kontribusi = pd.concat([
+                    self.kontribusi_beban_kerja(df).rename(index=lambda k, t=tahun: f"{t}|{k}")
+                    for tahun, (df, _) in zip(self.partisi, self.telusuri_partisi())
+                ])
+            agregat.perbarui(self.versi, kontribusi)
+        return agregat
+
+    def kontribusi_beban_kerja(self, df) -> pd.DataFrame:
+        if "TOTAL HARI" in df.columns:
+            total_hari = df["TOTAL HARI"].to_numpy(dtype="float64", na_value=np.nan)
+        else:
+            total_hari = np.full(len(df), np.nan)
+        return AgregatBebanKerja.hitung_kontribusi(df, total_hari)
+
+    # ================================
+    # GRAFIK (cache per versi data)
+    # ================================
+    @cache_terukur(max_entries=32)
+    def buat_grafik(_self, versi, chart_id, filter_grafik):
+        """
+        Figure Plotly di-cache per (versi data, chart id, filter), beserta
+        spec-nya (figur_beku). Rerun dengan data & filter yang sama tidak
+        membangun ulang figure maupun mengubahnya ulang menjadi dict.
+        """
+        if chart_id == "status":
+            fig = _self.grafik_status()
+        elif chart_id == "tren_bulanan":
+            fig = _self.grafik_tren_bulanan(filter_grafik)
+        elif chart_id == "bottleneck":
+            fig = _self.grafik_bottleneck()
+        elif chart_id == "umur":
+            fig = _self.grafik_umur(*filter_grafik)
+        else:
+            raise ValueError(f"Grafik tidak dikenal: {chart_id}")
+        return figur_beku(fig)
 
-            # Hitung selisih hari kerja dari prev_date
-            selisih = self.hitung_hari_kerja(prev_date, curr_date)
+    def grafik_status(self):
+        """Donut chart distribusi STATUS"""
+        import plotly.graph_objects as go
 
-            # Evaluasi: apakah melebihi SOP tahapan ini saja?
-            if selisih > sop_hari:
-                styles[col_idx] = 'background-color: #fee2e2; color: #dc2626; font-weight: bold'
+        stats = self.get_statistics()
+        status_counts = pd.Series(self.jumlah_status(), dtype="int64").sort_values(ascending=False)
+        status_counts = status_counts[status_counts > 0]
+        colors = {
+            'Tepat waktu': '#10b981',
+            'Diproses': '#f59e0b',
+            'Terlambat': '#ef4444'
+        }
+        
+        fig = go.Figure(data=[go.Pie(
+            labels=status_counts.index,
+            values=status_counts.values,
+            hole=0.55,
+            marker=dict(
+                colors=[colors.get(x, '#94a3b8') for x in status_counts.index],
+                line=dict(color='white', width=3)
+            ),
+            textposition='none',  
+            hovertemplate='<b style="font-size:14px">%{label}</b><br>' +
+                        'Jumlah: <b>%{value}</b><br>' +
+                        'Persentase: <b>%{percent}</b><extra></extra>',
+            hoverlabel=dict(
+                bgcolor='white',
+                font=dict(size=13, color='#1e293b', family='Inter'),
+                bordercolor='#e2e8f0'
+            )
+        )])
+        
+        fig.update_layout(
+            showlegend=False,
+            height=380,
+            margin=dict(t=10, b=10, l=10, r=10),
+            paper_bgcolor='white',
+            plot_bgcolor='white',
+            font=dict(family='Inter', size=13, color='#1e293b'),
+            annotations=[dict(
+                text=f'<b style="font-size:32px; color:#1e293b">{stats.get("total", 0)}</b><br>' +
+                    '<span style="font-size:14px; color:#64748b">Total</span><br>' +
+                    '<span style="font-size:14px; color:#64748b">Permohonan</span>',
+                x=0.5,
+                y=0.5,
+                font_size=16,
+                showarrow=False,
+                align='center'
+            )]
+        )
+
+        return fig
+
+    def grafik_tren_bulanan(self, pilih_tahun):
+        """Grafik batang tren permohonan bulanan per STATUS"""
+        import plotly.express as px
+
+        # Hitung jumlah per bulan per status (sudah urut bulan)
+        monthly_counts = self.hitung_bulanan(pilih_tahun)
+
+        # Judul grafik dinamis
+        judul_grafik = (
+            f"Tren Permohonan Bulanan - Tahun {pilih_tahun}"
+            if pilih_tahun != "Semua Tahun"
+            else "Tren Permohonan Bulanan - Semua Tahun"
+        )
+
+        # ============ GRAFIK ============
 
-            # Update prev_date ke tanggal tahap valid terbaru
-            prev_date = curr_date
+        fig = px.bar(
+            monthly_counts,
+            x="Bulan",
+            y="Jumlah",
+            color="STATUS",
+            barmode="group",
+            color_discrete_map={
+                "Tepat waktu": "#10b981",
+                "Diproses": "#f59e0b",
+                "Terlambat": "#ef4444"
+            },
+            text="Jumlah",
+            title=judul_grafik
+        )
 
-        return styles
+        fig.update_traces(textposition="outside", textfont_size=11)
+
+        fig.update_layout(
+            height=500,
+            font=dict(family="Inter", size=12),
+            margin=dict(t=60, b=60, l=60, r=40),
+            hovermode="x unified",
+            yaxis_title="Jumlah Permohonan",
+            xaxis_title="Status (Bulan-Tahun)",
+            legend_title="",
+            plot_bgcolor="white",
+            paper_bgcolor="white",
+            showlegend=True,
+            legend=dict(
+                orientation="h",
+                yanchor="bottom",
+                y=-0.2,
+                xanchor="center",
+                x=0.5
+            )
+        )
 
-    def get_statistics(self) -> Dict:
-        """Hitung statistik utama"""
-        if self.df.empty:
-            return {"total": 0, "selesai": 0, "diproses": 0, "terlambat": 0}
-            
-        if "STATUS" not in self.df.columns:
-            return {"total": len(self.df), "selesai": 0, "diproses": 0, "terlambat": 0}
-        
-        total = len(self.df)
-        return {
-            "total": total,
-            "selesai": len(self.df[self.df["STATUS"] == "Tepat waktu"]),
-            "diproses": len(self.df[self.df["STATUS"] == "Diproses"]),
-            "terlambat": len(self.df[self.df["STATUS"] == "Terlambat"])
-        }
+        return fig
+
+    def grafik_bottleneck(self):
+        """Grafik P50/P90 durasi per tahapan dibanding SOP"""
+        import plotly.graph_objects as go
+
+        per_tahap = self.agregat_tahapan(self.versi, self.df)["tahap"]
+        tahap = per_tahap["TAHAP"].astype(str)
+
+        fig = go.Figure()
+        fig.add_trace(go.Bar(x=tahap, y=per_tahap["P50"], name="P50", marker_color="#0094E8"))
+        fig.add_trace(go.Bar(x=tahap, y=per_tahap["P90"], name="P90", marker_color="#f59e0b"))
+        fig.add_trace(go.Scatter(
+            x=tahap, y=per_tahap["SOP"], name="SOP", mode="markers",
+            marker=dict(color="#ef4444", size=12, symbol="line-ew-open", line=dict(width=3))
+        ))
+        fig.update_layout(
+            barmode="group",
+            height=450,
+            font=dict(family="Inter", size=12),
+            margin=dict(t=30, b=120, l=60, r=20),
+            yaxis_title="Hari Kerja",
+            plot_bgcolor="white",
+            paper_bgcolor="white",
+            legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="center", x=0.5)
+        )
+        return fig
+
+    def grafik_umur(self, hari_ini, tampilan):
+        """Stacked bar umur berkas Diproses per tahap berjalan atau per bulan registrasi"""
+        import plotly.graph_objects as go
+
+        silang = self.umur_berkas(self.versi, hari_ini)["tahap" if tampilan == "Per Tahap" else "kohort"]
+        warna = ["#10b981", "#0094E8", "#f59e0b", "#ef4444"]
+        per_tahap = tampilan == "Per Tahap"
+
+        fig = go.Figure()
+        for kelompok, w in zip(silang.columns, warna):
+            sumbu = dict(y=silang.index.astype(str), x=silang[kelompok]) if per_tahap else dict(x=silang.index.astype(str), y=silang[kelompok])
+            fig.add_trace(go.Bar(name=f"{kelompok} hari", marker_color=w, orientation="h" if per_tahap else "v", **sumbu))
+        fig.update_layout(
+            barmode="stack",
+            height=450,
+            font=dict(family="Inter", size=12),
+            margin=dict(t=30, b=40, l=220 if per_tahap else 60, r=20),
+            xaxis_title="Jumlah Berkas" if per_tahap else "Bulan Registrasi",
+            yaxis_title=None if per_tahap else "Jumlah Berkas",
+            yaxis=dict(autorange="reversed") if per_tahap else {},
+            plot_bgcolor="white",
+            paper_bgcolor="white",
+            legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="center", x=0.5)
+        )
+        return fig
 
     def render_sidebar(self):
         """Render sidebar navigation"""
@@ -263,7 +2948,8 @@ class PBGMonitoringApp:
                 {"name": "Beranda", "icon": "🏠"},
                 {"name": "Pencarian", "icon": "🔍"},
                 {"name": "Monitoring", "icon": "📊"},
-                {"name": "Laporan", "icon": "📄"}
+                {"name": "Laporan", "icon": "📄"},
+                {"name": "Analitik", "icon": "📈"}
                 ]
             
             for item in menu_items:
@@ -274,19 +2960,81 @@ class PBGMonitoringApp:
             # Footer
             st.markdown("---")
             st.caption(f"📅 Update: {datetime.now().strftime('%d/%m/%Y %H:%M')}")
+            if self.hasil_snapshot is not None:
+                if "gagal" in self.hasil_snapshot:
+                    st.warning(f"Snapshot HTML gagal ditulis: {self.hasil_snapshot['gagal']}")
+                else:
+                    tautan = self.hasil_snapshot["url"] or self.hasil_snapshot["path"]
+                    st.caption(
+                        f"🖥️ [Snapshot baca-saja]({tautan}) · "
+                        f"{self.hasil_snapshot['waktu'].strftime('%H:%M')}"
+                    )
+
+            with st.expander("📡 Sheets API"):
+                metrik = self.metrik_sheets()
+                if baca_konfigurasi("cache_backend", "memori") == "disk":
+                    interval = self.cache_bersama().interval_terkini()
+                else:
+                    interval = metrik.interval
+                st.caption(
+                    f"Refresh tiap {interval / 60:.1f} menit · "
+                    f"{metrik.jumlah_berubah} dari {metrik.jumlah_fetch} fetch membawa data baru"
+                )
+                st.dataframe(
+                    metrik.tabel().style.format({"RATA-RATA (ms)": "{:.0f}"}),
+                    use_container_width=True, hide_index=True
+                )
+                if self.hasil_tulis is not None:
+                    if "waktu" not in self.hasil_tulis:
+                        st.caption("Tulis balik STATUS sedang berjalan di latar…")
+                    elif "gagal" in self.hasil_tulis:
+                        st.warning(f"Tulis balik STATUS gagal: {self.hasil_tulis['gagal']}")
+                    else:
+                        st.caption(
+                            f"Tulis balik {self.hasil_tulis['waktu'].strftime('%H:%M')}: "
+                            f"{self.hasil_tulis['sel']:,} sel dalam {self.hasil_tulis['request']} request"
+                        )
+
+            with st.expander("🗄️ Cache"):
+                registri = self.registri_cache()
+                batas = f" dari {registri.batas / 1e6:.0f} MB" if registri.batas > 0 else " (tanpa batas)"
+                st.caption(f"{registri.total() / 1e6:.1f} MB{batas}")
+                st.dataframe(
+                    registri.tabel().style.format({"UKURAN (MB)": "{:.2f}", "HIT RATE": "{:.0%}"}),
+                    use_container_width=True, hide_index=True
+                )
+
+            with st.expander("🧠 Memori Data"):
+                if self.df_raw is None:
+                    # Frame dibaca dari cache bersama, data mentah tidak ada di proses ini
+                    if self._df is None:
+                        st.caption(f"Partisi tahun: {', '.join(self.partisi)} (belum dimuat penuh)")
+                        return
+                    st.caption(f"{self._df.memory_usage(deep=True).sum() / 1e6:.2f} MB (cache bersama)")
+                    return
+                laporan = self.laporan_memori(self.versi, self.df_raw, self.df)
+                st.caption(
+                    f"{laporan.loc['TOTAL', 'Sebelum (bytes)'] / 1e6:.2f} MB → "
+                    f"{laporan.loc['TOTAL', 'Sesudah (bytes)'] / 1e6:.2f} MB"
+                )
+                st.dataframe(laporan, use_container_width=True)
+
+    @st.cache_resource
+    def logo_base64(_self, path: str) -> str:
+        """Logo header sebagai base64 (dibaca sekali per proses)"""
+        import base64
+
+        try:
+            with open(path, "rb") as f:
+                return base64.b64encode(f.read()).decode()
+        except OSError:
+            return ""
 
     def render_header(self):
         """Render header utama"""
-    import base64
-    
-    # Encode logo
-    try:
-        with open("3.png", "rb") as f:
-            encoded_logo = base64.b64encode(f.read()).decode()
-    except:
-        encoded_logo = ""
-    
-    st.markdown(f"""
+        encoded_logo = self.logo_base64("3.png")
+
+        st.markdown(f"""
 <div class="main-header">
     <div class="header-content">
         <div class="header-left">
@@ -303,6 +3051,144 @@ class PBGMonitoringApp:
 </div>
 """, unsafe_allow_html=True)
 
+    # ================================
+    # KARTU HTML (halaman & snapshot statis)
+    # ================================
+    def kartu_metrik(self, ikon: str, nilai, label: str, warna: str, gaya_nilai: str = "") -> str:
+        """Satu metric card Beranda (nilai & label di-escape, bisa berasal dari sheet)"""
+        return f"""
+        <div class="metric-card" style="border-left-color: {warna};">
+            <div class="metric-icon">{ikon}</div>
+            <div class="metric-value" style="color: {warna};{gaya_nilai}">{html.escape(str(nilai))}</div>
+            <div class="metric-label">{html.escape(str(label))}</div>
+        </div>
+        """
+
+    def kartu_statistik(self, stats: Dict) -> List[str]:
+        """Empat metric card status: total, diproses, tepat waktu, terlambat"""
+        return [
+            self.kartu_metrik("📋", stats.get('total', 0), "Total Permohonan", "#3b82f6"),
+            self.kartu_metrik("⏳", stats.get('diproses', 0), "Sedang Diproses", "#f59e0b"),
+            self.kartu_metrik("✅", stats.get('selesai', 0), "Tepat Waktu", "#10b981"),
+            self.kartu_metrik("⚠️", stats.get('terlambat', 0), "Terlambat", "#ef4444"),
+        ]
+
+    def kartu_retribusi(self, total_retribusi, tahun_pilihan) -> str:
+        """Metric card total retribusi (format rupiah)"""
+        total_rp = f"Rp {total_retribusi:,.0f}".replace(",", ".")
+        return self.kartu_metrik("🪙", total_rp, f"Total Retribusi ({tahun_pilihan})", "#6366f1", " font-size:22px;")
+
+    def kartu_aktivitas(self, row) -> str:
+        """Kartu satu permohonan di Aktivitas Terbaru (semua isi sheet di-escape)"""
+        status = str(row["STATUS"])
+        nama_pemohon = html.escape(str(row.get("NAMA PEMOHON", "-")))
+        no_reg = html.escape(str(row["NO. REGISTRASI"]))
+        tgl_reg = row["TGL REGISTRASI"]
+
+        # Format tanggal
+        if pd.notna(tgl_reg):
+            try:
+                tgl_formatted = tgl_reg.strftime("%d/%m/%Y")
+            except:
+                tgl_formatted = "-"
+        else:
+            tgl_formatted = "-"
+
+        # Icon dan warna berdasarkan status
+        if status == "Diproses":
+            icon = "⏳"
+            color = "#f59e0b"
+            bg_color = "#fffbeb"
+            border_color = "#f59e0b"
+        else:  # Terlambat
+            icon = "⚠️"
+            color = "#ef4444"
+            bg_color = "#fef2f2"
+            border_color = "#ef4444"
+
+        return f"""
+        <div class="activity-item-card" style="
+            background: {bg_color};
+            border-left: 3px solid {border_color};
+            padding: 10px 12px;
+            margin-bottom: 10px;
+            border-radius: 8px;
+            box-shadow: 0 2px 4px rgba(0, 0, 0, 0.04);
+        ">
+            <div style="display: flex; align-items: flex-start; gap: 10px;">
+                <div style="
+                    width: 30px;
+                    height: 30px;
+                    background: white;
+                    border-radius: 6px;
+                    display: flex;
+                    align-items: center;
+                    justify-content: center;
+                    font-size: 16px;
+                    flex-shrink: 0;
+                    box-shadow: 0 2px 4px rgba(0, 0, 0, 0.06);
+                ">
+                    {icon}
+                </div>
+                <div style="flex: 1; min-width: 0;">
+                    <div style="
+                        color: #1e293b;
+                        font-size: 11px;
+                        font-weight: 700;
+                        margin-bottom: 1px;
+                        white-space: nowrap;
+                        overflow: hidden;
+                        text-overflow: ellipsis;
+                    ">
+                        {no_reg}
+                    </div>
+                    <div style="
+                        color: #64748b;
+                        font-size: 10px;
+                        margin-bottom: 3px;
+                        white-space: nowrap;
+                        overflow: hidden;
+                        text-overflow: ellipsis;
+                    ">
+                        {nama_pemohon}
+                    </div>
+                    <div style="display: flex; align-items: center; justify-content: space-between; gap: 6px;">
+                        <span style="
+                            background: {color};
+                            color: white;
+                            padding: 2px 8px;
+                            border-radius: 10px;
+                            font-size: 9px;
+                            font-weight: 600;
+                            white-space: nowrap;
+                        ">
+                            {html.escape(status)}
+                        </span>
+                        <span style="
+                            color: #94a3b8;
+                            font-size: 9px;
+                            font-weight: 500;
+                        ">
+                            📅 {html.escape(tgl_formatted)}
+                        </span>
+                    </div>
+                </div>
+            </div>
+        </div>
+        """
+
+    def kartu_aktivitas_kosong(self) -> str:
+        """Pengganti daftar Aktivitas Terbaru bila tidak ada yang perlu perhatian"""
+        return """
+        <div class="empty-activity">
+            <div style="text-align: center; padding: 2rem 1rem; color: #94a3b8;">
+                <div style="font-size: 40px; margin-bottom: 12px;">✨</div>
+                <div style="font-size: 12px; font-weight: 600; color: #64748b;">Tidak ada permohonan yang memerlukan perhatian</div>
+                <div style="font-size: 10px; color: #94a3b8; margin-top: 4px;">Semua permohonan telah selesai tepat waktu</div>
+            </div>
+        </div>
+        """
+
     def render_beranda(self):
         """Render halaman beranda"""
         st.markdown("""
@@ -316,120 +3202,13 @@ class PBGMonitoringApp:
         
         # Metric Cards - 4 kolom
         col1, col2, col3, col4, col5 = st.columns(5)
-        
-        with col1:
-            st.markdown(f"""
-            <div class="metric-card" style="border-left-color: #3b82f6;">
-                <div class="metric-icon">📋</div>
-                <div class="metric-value" style="color: #3b82f6;">{stats.get('total', 0)}</div>
-                <div class="metric-label">Total Permohonan</div> 
-           </div>
-            """, unsafe_allow_html=True)
-
-        with col2:
-            st.markdown(f"""
-            <div class="metric-card" style="border-left-color: #f59e0b;">
-                <div class="metric-icon">⏳</div>
-                <div class="metric-value" style="color: #f59e0b;">{stats.get('diproses', 0)}</div>
-                <div class="metric-label">Sedang Diproses</div> 
-           </div>
-            """, unsafe_allow_html=True)
-        
-        with col3:
-            st.markdown(f"""
-            <div class="metric-card" style="border-left-color: #10b981;">
-                <div class="metric-icon">✅</div>
-                <div class="metric-value" style="color: #10b981;">{stats.get('selesai', 0)}</div>
-                <div class="metric-label">Tepat Waktu</div>
-           </div>
-            """, unsafe_allow_html=True)
-        
-        with col4:
-            st.markdown(f"""
-            <div class="metric-card" style="border-left-color: #ef4444;">
-                <div class="metric-icon">⚠️</div>
-                <div class="metric-value" style="color: #ef4444;">{stats.get('terlambat', 0)}</div>
-                <div class="metric-label">Terlambat</div>
-            </div>
-            """, unsafe_allow_html=True)
-                # ==========================
 
-                # ==========================
+        for kolom, kartu in zip([col1, col2, col3, col4], self.kartu_statistik(stats)):
+            with kolom:
+                st.markdown(kartu, unsafe_allow_html=True)
 
         with col5:
-            # --- Cari kolom retribusi yang benar ---
-            kolom_retribusi = None
-            for k in ["BESARAN RETRIBUSI (Rp)", "NILAI RETRIBUSI", "TOTAL RETRIBUSI"]:
-                if k in self.df.columns:
-                    kolom_retribusi = k
-                    break
-
-            if kolom_retribusi is None:
-                st.error("Kolom retribusi tidak ditemukan.")
-                kolom_retribusi = None
-
-            # --- Normalisasi tanggal registrasi ---
-            if "TGL REGISTRASI" in self.df.columns:
-                df_temp = self.df.copy()
-                df_temp["TGL_REG"] = pd.to_datetime(df_temp["TGL REGISTRASI"], errors="coerce", dayfirst=True)
-                df_temp = df_temp[df_temp["TGL_REG"].notna()]
-            else:
-                df_temp = self.df.copy()
-                df_temp["TGL_REG"] = None
-
-            # --- Ambil daftar tahun unik ---
-            if df_temp["TGL_REG"].notna().any():
-                tahun_list = sorted(df_temp["TGL_REG"].dt.year.dropna().unique())
-            else:
-                tahun_list = []
-
-            tahun_list = ["Semua Tahun"] + tahun_list
-
-            # --- Dropdown pilih tahun ---
-            tahun_pilihan = st.selectbox("Tahun", tahun_list, key="tahun_retribusi")
-
-            # --- Filter berdasarkan tahun ---
-            if tahun_pilihan == "Semua Tahun":
-                df_filtered = df_temp.copy()
-            else:
-                df_filtered = df_temp[df_temp["TGL_REG"].dt.year == tahun_pilihan]
-
-            def to_int(x):
-                if pd.isna(x):
-                    return 0
-
-                s = str(x).strip()
-                s = re.sub(r"[^0-9.,]", "", s)
-
-                if "," in s:
-                    s = s.split(",")[0]
-
-                s = s.replace(".", "")
-
-                try:
-                    return int(s)
-                except:
-                    return 0
-
-            if kolom_retribusi:
-                df_filtered["RET_INT"] = df_filtered[kolom_retribusi].apply(to_int)
-                total_retribusi = df_filtered["RET_INT"].sum()
-            else:
-                total_retribusi = 0
-
-            # --- Format rupiah ---
-            total_rp = f"Rp {total_retribusi:,.0f}".replace(",", ".")
-
-            # --- Tampilkan metric card ---
-            st.markdown(f"""
-            <div class="metric-card" style="border-left-color: #6366f1;">
-                <div class="metric-icon">🪙</div>
-                <div class="metric-value" style="color: #6366f1; font-size:22px;">
-                    {total_rp}
-                </div>
-                <div class="metric-label">Total Retribusi ({tahun_pilihan})</div>
-            </div>
-            """, unsafe_allow_html=True)
+            self.render_kartu_retribusi()
 #END RETRIBUSI
         st.markdown("<br>", unsafe_allow_html=True)
         
@@ -445,50 +3224,7 @@ class PBGMonitoringApp:
             </div>
             """, unsafe_allow_html=True)
             
-            status_counts = self.df["STATUS"].value_counts()
-            colors = {
-                'Tepat waktu': '#10b981',
-                'Diproses': '#f59e0b',
-                'Terlambat': '#ef4444'
-            }
-            
-            fig = go.Figure(data=[go.Pie(
-                labels=status_counts.index,
-                values=status_counts.values,
-                hole=0.55,
-                marker=dict(
-                    colors=[colors.get(x, '#94a3b8') for x in status_counts.index],
-                    line=dict(color='white', width=3)
-                ),
-                textposition='none',  
-                hovertemplate='<b style="font-size:14px">%{label}</b><br>' +
-                            'Jumlah: <b>%{value}</b><br>' +
-                            'Persentase: <b>%{percent}</b><extra></extra>',
-                hoverlabel=dict(
-                    bgcolor='white',
-                    font=dict(size=13, color='#1e293b', family='Inter'),
-                    bordercolor='#e2e8f0'
-                )
-            )])
-            
-            fig.update_layout(
-                showlegend=False,
-                height=380,
-                margin=dict(t=10, b=10, l=10, r=10),
-                paper_bgcolor='white',
-                plot_bgcolor='white',
-                font=dict(family='Inter', size=13, color='#1e293b'),
-                annotations=[dict(
-                    text=f'<b style="font-size:32px; color:#1e293b">{stats.get("total", 0)}</b><br>' +
-                        '<span style="font-size:14px; color:#64748b">Total</span><br>' +
-                        '<span style="font-size:14px; color:#64748b">Permohonan</span>',
-                    x=0.5,
-                    y=0.5,
-                    font_size=16,
-                    showarrow=False,
-                    align='center'
-                )]
-            )
+            fig = self.buat_grafik(self.versi, "status", None)
             
             st.plotly_chart(fig, use_container_width=True, config={'displayModeBar': False})
         
@@ -500,137 +3236,123 @@ class PBGMonitoringApp:
                 <p>Permohonan yang perlu perhatian</p>
             </div>
             """, unsafe_allow_html=True)
-            if "TGL REGISTRASI" not in self.df.columns:
-            # Filter data: prioritaskan Terlambat, lalu Diproses
-                self.df["TGL REGISTRASI"] = ""
-
-            self.df["TGL REGISTRASI"] = pd.to_datetime(
-                self.df["TGL REGISTRASI"], 
-                errors="coerce",
-                dayfirst=True
-            )
-            
-            # Ambil data terlambat dan diproses saja
-            df_priority = self.df[self.df["STATUS"].isin(["Terlambat", "Diproses"])].copy()
-            
-            # Sort: Terlambat dulu, lalu tanggal terbaru
-            df_priority["sort_priority"] = df_priority["STATUS"].map({"Diproses": 1, "Terlambat": 2})
-            df_sorted = df_priority.sort_values(
-                ["sort_priority", "TGL REGISTRASI"], 
-                ascending=[True, False]
-                ).head(5)
+            # Ambil data terlambat dan diproses saja, Diproses dulu lalu tanggal terbaru
+            df_sorted = self.aktivitas_terbaru(5)
             
             if len(df_sorted) == 0:
-                st.markdown("""
-                <div class="empty-activity">
-                    <div style="text-align: center; padding: 2rem 1rem; color: #94a3b8;">
-                        <div style="font-size: 40px; margin-bottom: 12px;">✨</div>
-                        <div style="font-size: 12px; font-weight: 600; color: #64748b;">Tidak ada permohonan yang memerlukan perhatian</div>
-                        <div style="font-size: 10px; color: #94a3b8; margin-top: 4px;">Semua permohonan telah selesai tepat waktu</div>
-                    </div>
-                </div>
-                """, unsafe_allow_html=True)
+                st.markdown(self.kartu_aktivitas_kosong(), unsafe_allow_html=True)
             else:
                 st.markdown('<div class="activity-container">', unsafe_allow_html=True)
                 
                 for idx, row in df_sorted.iterrows():
-                    status = row["STATUS"]
-                    nama_pemohon = row.get("NAMA PEMOHON", "-")
-                    tgl_reg = row["TGL REGISTRASI"]
-                    
-                    # Format tanggal
-                    if pd.notna(tgl_reg):
-                        try:
-                            tgl_formatted = tgl_reg.strftime("%d/%m/%Y")
-                        except:
-                            tgl_formatted = "-"
-                    else:
-                        tgl_formatted = "-"
-                    
-                    # Icon dan warna berdasarkan status
-                    if status == "Diproses":
-                        icon = "⏳"
-                        color = "#f59e0b"
-                        bg_color = "#fffbeb"
-                        border_color = "#f59e0b"
-                    else:  # Terlambat
-                        icon = "⚠️"
-                        color = "#ef4444"
-                        bg_color = "#fef2f2"
-                        border_color = "#ef4444"
-                    
-                    st.markdown(f"""
-                    <div class="activity-item-card" style="
-                        background: {bg_color};
-                        border-left: 3px solid {border_color};
-                        padding: 10px 12px;
-                        margin-bottom: 10px;
-                        border-radius: 8px;
-                        box-shadow: 0 2px 4px rgba(0, 0, 0, 0.04);
-                    ">
-                        <div style="display: flex; align-items: flex-start; gap: 10px;">
-                            <div style="
-                                width: 30px;
-                                height: 30px;
-                                background: white;
-                                border-radius: 6px;
-                                display: flex;
-                                align-items: center;
-                                justify-content: center;
-                                font-size: 16px;
-                                flex-shrink: 0;
-                                box-shadow: 0 2px 4px rgba(0, 0, 0, 0.06);
-                            ">
-                                {icon}
-                            </div>
-                            <div style="flex: 1; min-width: 0;">
-                                <div style="
-                                    color: #1e293b;
-                                    font-size: 11px;
-                                    font-weight: 700;
-                                    margin-bottom: 1px;
-                                    white-space: nowrap;
-                                    overflow: hidden;
-                                    text-overflow: ellipsis;
-                                ">
-                                    {row['NO. REGISTRASI']}
-                                </div>
-                                <div style="
-                                    color: #64748b;
-                                    font-size: 10px;
-                                    margin-bottom: 3px;
-                                    white-space: nowrap;
-                                    overflow: hidden;
-                                    text-overflow: ellipsis;
-                                ">
-                                    {nama_pemohon}
-                                </div>
-                                <div style="display: flex; align-items: center; justify-content: space-between; gap: 6px;">
-                                    <span style="
-                                        background: {color};
-                                        color: white;
-                                        padding: 2px 8px;
-                                        border-radius: 10px;
-                                        font-size: 9px;
-                                        font-weight: 600;
-                                        white-space: nowrap;
-                                    ">
-                                        {status}
-                                    </span>
-                                    <span style="
-                                        color: #94a3b8;
-                                        font-size: 9px;
-                                        font-weight: 500;
-                                    ">
-                                        📅 {tgl_formatted}
-                                    </span>
-                                </div>
-                            </div>
-                        </div>
-                    </div>
-                    """, unsafe_allow_html=True)
+                    st.markdown(self.kartu_aktivitas(row), unsafe_allow_html=True)
                 
                 st.markdown('</div>', unsafe_allow_html=True)
+
+        self.render_umur_berkas()
+        self.render_perubahan()
+
+    @st.fragment
+    def render_umur_berkas(self):
+        """Umur berkas yang masih Diproses: kelompok hari kerja, per tahap / kohort bulan (fragment)"""
+        hari_ini = datetime.now().strftime("%Y-%m-%d")
+        umur = self.umur_berkas(self.versi, hari_ini)
+
+        st.markdown("### ⏳ Umur Berkas Diproses")
+        st.caption("Hari kerja sejak TGL REGISTRASI sampai hari ini")
+        kolom = st.columns(len(umur["kelompok"]))
+        for col, (kelompok, jumlah) in zip(kolom, umur["kelompok"].items()):
+            with col:
+                st.metric(f"{kelompok} hari", int(jumlah))
+
+        tampilan = st.radio("Tampilan", ["Per Tahap", "Kohort Bulan Registrasi"], horizontal=True, key="tampilan_umur")
+        if umur["kelompok"].sum() == 0:
+            st.info("ℹ️ Tidak ada berkas yang sedang diproses")
+            return
+        st.plotly_chart(
+            self.buat_grafik(self.versi, "umur", (hari_ini, tampilan)),
+            use_container_width=True, config={'displayModeBar': False}
+        )
+
+    def terakhir_dibaca(self) -> Optional[datetime]:
+        """Waktu "Tandai sudah dibaca" terakhir, disimpan di URL (?dibaca=) agar bertahan saat reload/bookmark"""
+        try:
+            return datetime.strptime(st.query_params.get("dibaca", ""), "%Y%m%d%H%M%S")
+        except ValueError:
+            return None
+
+    @st.fragment
+    def render_perubahan(self):
+        """Perubahan data sejak terakhir ditandai dibaca, dibaca dari log kejadian (fragment)"""
+        dibaca = self.terakhir_dibaca()
+
+        st.markdown("### 🔔 Perubahan Sejak Terakhir Dibaca")
+        col1, col2 = st.columns([3, 1])
+        with col1:
+            pilihan = st.radio(
+                "Sejak", ["Terakhir dibaca", "7 hari", "30 hari"], horizontal=True, key="sejak_perubahan"
+            )
+        sejak = {
+            # Belum pernah ditandai (atau URL tanpa ?dibaca=): 1 hari terakhir
+            "Terakhir dibaca": dibaca or datetime.now() - timedelta(days=1),
+            "7 hari": datetime.now() - timedelta(days=7),
+            "30 hari": datetime.now() - timedelta(days=30),
+        }[pilihan]
+        with col2:
+            if st.button("✔️ Tandai sudah dibaca", use_container_width=True):
+                sejak = datetime.now().replace(microsecond=0)
+                st.query_params["dibaca"] = sejak.strftime("%Y%m%d%H%M%S")
+        if pilihan == "Terakhir dibaca" and dibaca is None and "dibaca" not in st.query_params:
+            st.caption("Belum pernah ditandai dibaca di tautan ini: menampilkan 1 hari terakhir")
+
+        perubahan = self.perubahan_sejak(sejak)
+        if perubahan.empty:
+            st.caption(f"Tidak ada perubahan sejak {sejak.strftime('%d/%m/%Y %H:%M')}")
+            return
+
+        label = {
+            "baru": "🆕 Baru", "tahap": "➡️ Pindah Tahap", "selesai": "🏁 Sampai SPPST",
+            "status": "🔄 Ganti Status", "ubah": "✏️ Data Diubah", "hapus": "🗑️ Dihapus",
+        }
+        jumlah = perubahan["jenis"].value_counts()
+        kolom = st.columns(len(LogPerubahan.JENIS))
+        for k, jenis in zip(kolom, LogPerubahan.JENIS):
+            with k:
+                st.metric(label[jenis], int(jumlah.get(jenis, 0)))
+
+        jadi_terlambat = (perubahan["jenis"] == "status") & (perubahan["ke"] == "Terlambat")
+        if jadi_terlambat.any():
+            st.warning(f"⚠️ {int(jadi_terlambat.sum())} permohonan baru saja menjadi Terlambat")
+
+        pilih = st.multiselect("Jenis", list(label), format_func=label.get, key="jenis_perubahan")
+        if pilih:
+            perubahan = perubahan[perubahan["jenis"].isin(pilih)]
+        st.dataframe(
+            perubahan[["waktu", "no", "jenis", "dari", "ke"]].rename(columns={
+                "waktu": "WAKTU", "no": "NO. REGISTRASI", "jenis": "JENIS", "dari": "DARI", "ke": "KE"
+            }).head(500),
+            use_container_width=True, hide_index=True, height=300
+        )
+
+    @st.fragment
+    def render_kartu_retribusi(self):
+        """Kartu total retribusi per tahun (fragment: ganti tahun hanya menggambar ulang kartu ini)"""
+        # --- Cari kolom retribusi yang benar (mode partisi: sudah diringkas per tahun) ---
+        if self.partisi is None and self.cari_kolom_retribusi(self.df) is None:
+            st.error("Kolom retribusi tidak ditemukan.")
+
+        # --- Ambil daftar tahun unik ---
+        tahun_list = ["Semua Tahun"] + self.daftar_tahun()
+
+        # --- Dropdown pilih tahun ---
+        tahun_pilihan = st.selectbox("Tahun", tahun_list, key="tahun_retribusi")
+
+        # --- Total per tahun (pandas atau SQL) ---
+        total_retribusi = self.total_retribusi(tahun_pilihan)
+
+        # --- Tampilkan metric card ---
+        st.markdown(self.kartu_retribusi(total_retribusi, tahun_pilihan), unsafe_allow_html=True)
+
     def render_pencarian(self):
         """Render halaman pencarian"""
         st.markdown("""
@@ -640,6 +3362,11 @@ class PBGMonitoringApp:
         </div>
         """, unsafe_allow_html=True)
 
+        self.render_hasil_pencarian()
+
+    @st.fragment
+    def render_hasil_pencarian(self):
+        """Form dan tabel hasil pencarian (fragment: ketikan tidak menjalankan ulang seluruh app)"""
         col1, col2, col3 = st.columns([1, 1, 1])
 
         with col1:
@@ -659,49 +3386,52 @@ class PBGMonitoringApp:
                 default=["Tepat waktu", "Diproses", "Terlambat"]
             )
                     
-        # Proses pencarian
-        result = self.df.copy()
-        
-        # Filter berdasarkan kata kunci
-        if search_input.strip():
-            if search_option == "STATUS":
-                result = result[result["STATUS"].str.contains(search_input, case=False, na=False)]
-            else:
-                result = result[result[search_option].astype(str).str.contains(search_input, case=False, na=False)]
-
-        if status_filter:
-            result = result[result["STATUS"].isin(status_filter)]
+        # Mode partisi: default hanya tahun berjalan agar tahun lama tidak ikut dimuat
+        tahun_cari = None
+        if self.partisi is not None:
+            daftar = self.daftar_tahun()
+            opsi = ["Semua Tahun"] + [str(t) for t in reversed(daftar)]
+            default = str(datetime.now().year) if datetime.now().year in daftar else opsi[min(1, len(opsi) - 1)]
+            pilih = st.selectbox("Tahun Registrasi", opsi, index=opsi.index(default))
+            if pilih != "Semua Tahun":
+                tahun_cari = [int(pilih)]
+
+        # Proses pencarian (kata kunci + filter status)
+        result = self.filter_pencarian(search_option, search_input, status_filter, tahun_cari)
 
         if result.empty:
             st.warning("⚠️ Tidak ada data yang cocok dengan kriteria pencarian.")
             return
 
-        # Hitung total hari
-        def hitung_total_hari(row):
-            try:
-                tgl_reg = pd.to_datetime(row["TGL REGISTRASI"], dayfirst=True)
-                tgl_sppst = pd.to_datetime(row["SPPST KADIS"], dayfirst=True)
-                # return (tgl_sppst - tgl_reg).days
-                return self.hitung_hari_kerja(tgl_reg, tgl_sppst)
-
-            except:
-                return None
+        # Frame asal hasil (untuk linimasa baris yang dipilih)
+        if self.sql and search_option in PenyimpananSQL.KOLOM_CARI:
+            tahun_cari = None
+        sumber = self.frame_tahun(tahun_cari)
+        posisi = sumber.index.get_indexer(result.index)
 
-        result["TOTAL HARI"] = result.apply(hitung_total_hari, axis=1).astype('Int64')
+        # TOTAL HARI sudah dihitung sekali di siapkan_data()
 
         # ===============================
         # RESET INDEX AGAR MULAI DARI 1
         # ===============================
-        result = result.reset_index(drop=True)
+        lewat_sop = result["TAHAP MELEBIHI SOP"].to_numpy()
+        result = result.drop(columns=self.KOLOM_FLAG, errors="ignore").reset_index(drop=True)
         result.index = result.index + 1
 
         # Tampilkan hasil
         st.success(f"✅ Ditemukan {len(result)} hasil pencarian")
 
-        st.dataframe(
-            result.style.apply(self.highlight_terlambat, axis=1),
+        # Key ikut filter & versi data: hasil berubah -> tabel baru, pilihan baris lama tidak terbawa
+        kunci_tabel = hashlib.sha1(
+            repr((self.versi, search_option, search_input, status_filter, tahun_cari)).encode("utf-8")
+        ).hexdigest()[:12]
+        event = st.dataframe(
+            self.tabel_bergaya(result, lewat_sop),
             use_container_width=True,
-            height=400
+            height=400,
+            on_select="rerun",
+            selection_mode="single-row",
+            key=f"tabel_pencarian_{kunci_tabel}"
         )
 
         st.markdown("""
@@ -713,6 +3443,54 @@ class PBGMonitoringApp:
         </div>
         """, unsafe_allow_html=True)
 
+        # Detail hanya dibangun untuk baris yang dibuka
+        if event.selection.rows and event.selection.rows[0] < len(posisi):
+            baris = event.selection.rows[0]
+            self.render_linimasa(self.kunci_frame(tahun_cari), sumber, int(posisi[baris]))
+        else:
+            st.caption("Pilih satu baris untuk melihat linimasa tahapannya.")
+
+    def render_linimasa(self, kunci, df, posisi: int):
+        """Linimasa tahapan satu permohonan: tabel + grafik hari kerja aktual vs SOP"""
+        import plotly.graph_objects as go
+
+        linimasa = self.linimasa_tahapan(kunci, df, posisi, datetime.now().strftime("%Y-%m-%d"))
+        no = df["NO. REGISTRASI"].iloc[posisi] if "NO. REGISTRASI" in df.columns else ""
+        nama = df["NAMA PEMOHON"].iloc[posisi] if "NAMA PEMOHON" in df.columns else ""
+        st.markdown(f"#### 🗂️ Linimasa {no} — {nama}")
+
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("STATUS", str(df["STATUS"].iloc[posisi]))
+        lewat = linimasa["KETERANGAN"].str.contains("lewat SOP", case=False).to_numpy()
+        kumulatif = linimasa["KUMULATIF"].max()
+        with col2:
+            st.metric("Hari Kerja s.d. Tahap Terakhir", "-" if pd.isna(kumulatif) else int(kumulatif))
+        with col3:
+            st.metric("Tahap Lewat SOP", int(lewat.sum()))
+
+        fig = go.Figure()
+        fig.add_trace(go.Bar(
+            y=linimasa["TAHAPAN"], x=linimasa["HARI KERJA"], name="Aktual", orientation="h",
+            marker_color=np.where(lewat, "#ef4444", "#0094E8")
+        ))
+        fig.add_trace(go.Scatter(
+            y=linimasa["TAHAPAN"], x=linimasa["SOP (HARI)"], name="SOP", mode="markers",
+            marker=dict(color="#1e293b", size=14, symbol="line-ns-open", line=dict(width=3))
+        ))
+        fig.update_layout(
+            height=450,
+            font=dict(family="Inter", size=12),
+            margin=dict(t=30, b=40, l=220, r=20),
+            xaxis_title="Hari Kerja",
+            yaxis=dict(autorange="reversed"),
+            plot_bgcolor="white",
+            paper_bgcolor="white",
+            legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="center", x=0.5)
+        )
+        st.plotly_chart(fig, use_container_width=True)
+        st.dataframe(linimasa, use_container_width=True, hide_index=True)
+
     def render_monitoring(self):
         """Render halaman monitoring"""
         st.markdown("""
@@ -722,119 +3500,62 @@ class PBGMonitoringApp:
         </div>
         """, unsafe_allow_html=True)
 
-        if "TGL REGISTRASI" in self.df.columns:
+        if self.partisi is not None or "TGL REGISTRASI" in self.df.columns:
 
-            df_mon = self.df.copy()
+        # Hitung hanya yg ada tanggal (sudah datetime64 di frame siap pakai)
+            jumlah_valid, jumlah_total = self.jumlah_bertanggal()
 
-        # Konversi tanggal dd-mm-yyyy
-            df_mon["TGL REGISTRASI"] = pd.to_datetime(
-                df_mon["TGL REGISTRASI"], 
-                dayfirst=True, 
-                errors="coerce"
-            )
+        # Info jumlah data valid
+            st.info(f"ℹ️ Total data yang memiliki tanggal registrasi: **{jumlah_valid}** dari {jumlah_total} permohonan")
 
-        # Filter hanya yg ada tanggal
-            df_mon = df_mon[df_mon["TGL REGISTRASI"].notna()].copy()
+            self.render_grafik_monitoring()
 
-        # Info jumlah data valid
-            st.info(f"ℹ️ Total data yang memiliki tanggal registrasi: **{len(df_mon)}** dari {len(self.df)} permohonan")
+        else:
+            st.error("⚠️ Kolom 'TGL REGISTRASI' tidak ditemukan dalam data")
 
+    @st.fragment
+    def render_grafik_monitoring(self):
+        """Filter tahun, grafik tren bulanan dan ringkasan (fragment: ganti tahun hanya menggambar ulang bagian ini)"""
         # ============ FILTER TAHUN ============
-            tahun_list = sorted(df_mon["TGL REGISTRASI"].dt.year.unique())
+        tahun_list = self.daftar_tahun()
 
-            pilih_tahun = st.selectbox(
-                "📅 Pilih Tahun Permohonan",
-                options=["Semua Tahun"] + list(map(str, tahun_list)),
-                index=0
-            )
-
-        # Terapkan filter tahun
-            if pilih_tahun != "Semua Tahun":
-                df_mon = df_mon[df_mon["TGL REGISTRASI"].dt.year == int(pilih_tahun)]
+        pilih_tahun = st.selectbox(
+            "📅 Pilih Tahun Permohonan",
+            options=["Semua Tahun"] + list(map(str, tahun_list)),
+            index=0
+        )
 
         # ======================================
 
-        # Buat kolom bulan
-            df_mon["Bulan"] = df_mon["TGL REGISTRASI"].dt.to_period("M").astype(str)
-
-        # Hitung jumlah per bulan per status
-            monthly_counts = df_mon.groupby(["Bulan", "STATUS"]).size().reset_index(name="Jumlah")
-
-        # Sort
-            monthly_counts["Sort_Date"] = pd.to_datetime(monthly_counts["Bulan"], format="%Y-%m")
-            monthly_counts = monthly_counts.sort_values("Sort_Date")
-
-        # Judul grafik dinamis
-            judul_grafik = (
-                f"Tren Permohonan Bulanan - Tahun {pilih_tahun}"
-                if pilih_tahun != "Semua Tahun"
-                else "Tren Permohonan Bulanan - Semua Tahun"
-            )
-
-        # ============ GRAFIK ============
-
-            fig = px.bar(
-                monthly_counts,
-                x="Bulan",
-                y="Jumlah",
-                color="STATUS",
-                barmode="group",
-                color_discrete_map={
-                    "Tepat waktu": "#10b981",
-                    "Diproses": "#f59e0b",
-                    "Terlambat": "#ef4444"
-                },
-                text="Jumlah",
-                title=judul_grafik
-            )
-
-            fig.update_traces(textposition="outside", textfont_size=11)
-
-            fig.update_layout(
-                height=500,
-                font=dict(family="Inter", size=12),
-                margin=dict(t=60, b=60, l=60, r=40),
-                hovermode="x unified",
-                yaxis_title="Jumlah Permohonan",
-                xaxis_title="Status (Bulan-Tahun)",
-                legend_title="",
-                plot_bgcolor="white",
-                paper_bgcolor="white",
-                showlegend=True,
-                legend=dict(
-                    orientation="h",
-                    yanchor="bottom",
-                    y=-0.2,
-                    xanchor="center",
-                    x=0.5
-                )
-            )
+        fig = self.buat_grafik(self.versi, "tren_bulanan", pilih_tahun)
 
-            st.plotly_chart(fig, use_container_width=True, config={"displayModeBar": True})
+        st.plotly_chart(fig, use_container_width=True, config={"displayModeBar": True})
 
         # ============ RINGKASAN ============
 
-            total_data_monitoring = len(df_mon)
-            tepat_waktu = len(df_mon[df_mon["STATUS"] == "Tepat waktu"])
-            diproses = len(df_mon[df_mon["STATUS"] == "Diproses"])
-            terlambat = len(df_mon[df_mon["STATUS"] == "Terlambat"])
-
-            pct_tepat = (tepat_waktu / total_data_monitoring * 100) if total_data_monitoring else 0
-            pct_diproses = (diproses / total_data_monitoring * 100) if total_data_monitoring else 0
-            pct_terlambat = (terlambat / total_data_monitoring * 100) if total_data_monitoring else 0
-
-            st.markdown(f"""
-            <div class="info-box">
-                📊 <strong>Info Data Monitoring:</strong><br>
-                <strong>Total: {total_data_monitoring} permohonan</strong> | 
-                <span style="color: #10b981; font-weight: 600;"> Tepat Waktu: {tepat_waktu} ({pct_tepat:.1f}%)</span> | 
-                <span style="color: #f59e0b; font-weight: 600;"> Diproses: {diproses} ({pct_diproses:.1f}%)</span> | 
-                <span style="color: #ef4444; font-weight: 600;"> Terlambat: {terlambat} ({pct_terlambat:.1f}%)</span>
-            </div>
-            """, unsafe_allow_html=True)
-
-        else:
-            st.error("⚠️ Kolom 'TGL REGISTRASI' tidak ditemukan dalam data")
+        st.markdown(self.kotak_info_monitoring(pilih_tahun), unsafe_allow_html=True)
+
+    def kotak_info_monitoring(self, pilih_tahun) -> str:
+        """Info box jumlah & persentase per STATUS untuk tahun terpilih"""
+        jumlah = self.hitung_bulanan(pilih_tahun).groupby("STATUS")["Jumlah"].sum()
+        total_data_monitoring = int(jumlah.sum())
+        tepat_waktu = int(jumlah.get("Tepat waktu", 0))
+        diproses = int(jumlah.get("Diproses", 0))
+        terlambat = int(jumlah.get("Terlambat", 0))
+
+        pct_tepat = (tepat_waktu / total_data_monitoring * 100) if total_data_monitoring else 0
+        pct_diproses = (diproses / total_data_monitoring * 100) if total_data_monitoring else 0
+        pct_terlambat = (terlambat / total_data_monitoring * 100) if total_data_monitoring else 0
+
+        return f"""
+        <div class="info-box">
+            📊 <strong>Info Data Monitoring:</strong><br>
+            <strong>Total: {total_data_monitoring} permohonan</strong> | 
+            <span style="color: #10b981; font-weight: 600;"> Tepat Waktu: {tepat_waktu} ({pct_tepat:.1f}%)</span> | 
+            <span style="color: #f59e0b; font-weight: 600;"> Diproses: {diproses} ({pct_diproses:.1f}%)</span> | 
+            <span style="color: #ef4444; font-weight: 600;"> Terlambat: {terlambat} ({pct_terlambat:.1f}%)</span>
+        </div>
+        """
 
 
     def render_laporan(self):
@@ -846,70 +3567,79 @@ class PBGMonitoringApp:
         </div>
         """, unsafe_allow_html=True)
     
-        col1, col2, col3 = st.columns([2, 2, 1])
+        self.render_filter_laporan()
+
+    @st.fragment
+    def render_filter_laporan(self):
+        """Filter tanggal, ringkasan dan unduhan laporan (fragment)"""
+        laporan_siap = baca_konfigurasi("laporan_siap", "tidak") == "ya" and self.partisi is None
+        periode = self.periode_laporan(pd.Timestamp(datetime.now().date())) if laporan_siap else {}
+        pilih_periode = "Rentang tanggal"
+        if periode:
+            pilih_periode = st.selectbox("📆 Periode", ["Rentang tanggal"] + list(periode), key="periode_laporan")
+
+        if pilih_periode != "Rentang tanggal":
+            start_date, end_date = periode[pilih_periode]
+            tampilkan = True
+        else:
+            col1, col2, col3 = st.columns([2, 2, 1])
     
-        with col1:
-            start_date = st.date_input(
-                "📅 Tanggal Mulai",
-                datetime.now() - timedelta(days=30)
-        )
+            with col1:
+                start_date = st.date_input(
+                    "📅 Tanggal Mulai",
+                    datetime.now() - timedelta(days=30)
+            )
     
-        with col2:
-            end_date = st.date_input(
-                "📅 Tanggal Akhir",
-                datetime.now()
-           )
+            with col2:
+                end_date = st.date_input(
+                    "📅 Tanggal Akhir",
+                    datetime.now()
+               )
     
-        with col3:
-            st.markdown("<br>", unsafe_allow_html=True)
-            tampilkan = st.button("📊 Tampilkan", use_container_width=True)
+            with col3:
+                st.markdown("<br>", unsafe_allow_html=True)
+                tampilkan = st.button("📊 Tampilkan", use_container_width=True)
     
         if tampilkan:
-        # Format Tanggal
-            self.df["TGL REGISTRASI"] = pd.to_datetime(
-                self.df["TGL REGISTRASI"].astype(str),
-                dayfirst=True,          # <= Fix utama
-                errors="coerce"
-            )
-
         # Konversi dari date_input ke datetime
             start_date = pd.to_datetime(start_date)
             end_date = pd.to_datetime(end_date)
 
-        # Filtering data
-            df_filtered = self.df[
-                (self.df["TGL REGISTRASI"] >= start_date) & 
-                (self.df["TGL REGISTRASI"] <= end_date)
-            ]
+        # Periode standar yang sudah disiapkan di latar -> tanpa filter & encode ulang
+            kode = f"{start_date:%Y-%m-%d}_{end_date:%Y-%m-%d}"
+            artefak = self.artefak_laporan().baca(self.versi, kode) if laporan_siap else None
+            if artefak is not None:
+                df_filtered = self.df.iloc[artefak["indeks"]]
+                ringkasan = artefak
+            else:
+                df_filtered = self.filter_rentang_tanggal(start_date, end_date)
+                ringkasan = self.ringkasan_laporan(df_filtered)
+            lewat_sop = df_filtered["TAHAP MELEBIHI SOP"].to_numpy()
+            df_filtered = df_filtered.drop(columns=self.KOLOM_FLAG, errors="ignore")
         
             if not df_filtered.empty:
             # Summary metrics
                 col_sum1, col_sum2, col_sum3, col_sum4, col_sum5 = st.columns(5)
             
-                filtered_total = len(df_filtered)
-                filtered_selesai = len(df_filtered[df_filtered["STATUS"] == 'Tepat waktu'])
-                filtered_diproses = len(df_filtered[df_filtered["STATUS"] == "Diproses"])
-                filtered_terlambat = len(df_filtered[df_filtered["STATUS"] == "Terlambat"])
-                # filtered_presentasi = len(df_filtered[df_filtered['STATUS'] == 'Tepat waktu']) / len(df_filtered) * 100
-                filtered_presentasi = f"{(len(df_filtered[df_filtered['STATUS'] == 'Tepat waktu']) / len(df_filtered) * 100):.1f}%"
+                filtered_total = ringkasan["total"]
 
                 with col_sum1:
                     st.metric("Total Permohonan", filtered_total)
                 with col_sum2:
-                    st.metric("Tepat Waktu", filtered_selesai)
+                    st.metric("Tepat Waktu", ringkasan["tepat"])
                 with col_sum3:
-                    st.metric("Diproses", filtered_diproses)
+                    st.metric("Diproses", ringkasan["diproses"])
                 with col_sum4:
-                    st.metric("Terlambat", filtered_terlambat, delta_color="inverse")
+                    st.metric("Terlambat", ringkasan["terlambat"], delta_color="inverse")
                 with col_sum5:
-                    st.metric("Prosentase", filtered_presentasi)
+                    st.metric("Prosentase", f"{ringkasan['persen']:.1f}%")
             
                 st.markdown("<br>", unsafe_allow_html=True)
             
                 st.success(f"✅ Ditemukan **{filtered_total}** permohonan dalam periode yang dipilih")
             
                 st.dataframe(
-                    df_filtered.style.apply(self.highlight_terlambat, axis=1),
+                    self.tabel_bergaya(df_filtered, lewat_sop),
                     use_container_width=True,
                     height=400
                 )
@@ -920,34 +3650,217 @@ class PBGMonitoringApp:
                     <span style="font-size: 13px; color: #64748b;">
                         = Tahapan melebihi akumulasi waktu SOP dari tanggal registrasi
                     </span>
-                /div>
+                </div>
                 """, unsafe_allow_html=True)
             
             # ================================
             # ONLY DOWNLOAD LAPORAN
             # ================================
-            csv = df_filtered.to_csv(index=False).encode("utf-8")
-            st.download_button(
-                label="📥 Download Laporan (CSV)",
-                data=csv,
-                file_name=f"Laporan_PBG_{start_date}_to_{end_date}.csv",
-                mime="text/csv",
-                use_container_width=True
-            )
+                if artefak is not None:
+                    csv = self.artefak_laporan().unduhan(self.versi, kode, "csv")
+                else:
+                    csv = df_filtered.to_csv(index=False).encode("utf-8")
+                st.download_button(
+                    label="📥 Download Laporan (CSV)",
+                    data=csv,
+                    file_name=f"Laporan_PBG_{start_date}_to_{end_date}.csv",
+                    mime="text/csv",
+                    use_container_width=True
+                )
+                if artefak is not None:
+                    st.download_button(
+                        label="📥 Download Laporan (Parquet)",
+                        data=self.artefak_laporan().unduhan(self.versi, kode, "parquet"),
+                        file_name=f"Laporan_PBG_{start_date}_to_{end_date}.parquet",
+                        mime="application/vnd.apache.parquet",
+                        use_container_width=True
+                    )
+
+            else:
+                st.warning("⚠️ Tidak ada data dalam rentang tanggal yang dipilih")
+
+    def render_analitik(self):
+        """Render halaman analitik SLA"""
+        st.markdown("""
+        <div class="page-title-card">
+            <h2>📈 Analitik SLA</h2>
+            <p>Proyeksi tenggat dan analisis keterlambatan berdasarkan SOP</p>
+        </div>
+        """, unsafe_allow_html=True)
+
+        if "TGL REGISTRASI" not in self.df.columns:
+            st.error("⚠️ Kolom 'TGL REGISTRASI' tidak ditemukan dalam data")
+            return
 
+        tab_berisiko, tab_bottleneck, tab_beban, tab_simulasi, tab_kualitas = st.tabs(
+            ["⏰ Berkas Berisiko", "🚧 Bottleneck Tahapan", "👥 Beban Kerja", "🧮 Simulasi SOP", "🧪 Kualitas Data"]
+        )
+        with tab_berisiko:
+            self.render_berkas_berisiko()
+        with tab_bottleneck:
+            self.render_bottleneck()
+        with tab_beban:
+            self.render_beban_kerja()
+        with tab_simulasi:
+            self.render_simulasi_sop()
+        with tab_kualitas:
+            self.render_kualitas_data()
+
+    @st.fragment
+    def render_berkas_berisiko(self):
+        """Antrian berkas Diproses yang paling dekat/lewat tenggat (fragment)"""
+        proyeksi = self.proyeksi_tenggat(self.versi, datetime.now().strftime("%Y-%m-%d"), self.df)
+
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric("Berkas Diproses", len(proyeksi))
+        with col2:
+            st.metric("Lewat Tenggat", int((proyeksi["SISA HARI KERJA"] < 0).sum()))
+        with col3:
+            st.metric("Sisa ≤ 5 Hari Kerja", int(proyeksi["SISA HARI KERJA"].between(0, 5).sum()))
+        with col4:
+            st.metric("Tahap Lewat SOP", int(proyeksi["TAHAP LEWAT SOP"].sum()))
+
+        if proyeksi.empty:
+            st.info("ℹ️ Tidak ada berkas yang sedang diproses")
+            return
+
+        top_n = st.slider("Tampilkan N berkas paling berisiko", 5, 100, 20, step=5)
+        st.dataframe(
+            proyeksi.head(top_n).style.apply(self.highlight_tahap_lewat, axis=1),
+            use_container_width=True,
+            hide_index=True
+        )
+
+    @st.fragment
+    def render_bottleneck(self):
+        """Analisis bottleneck dari agregat durasi tahapan (fragment)"""
+        agregat = self.agregat_tahapan(self.versi, self.df)
+        format_kolom = {"P50": "{:.1f}", "P90": "{:.1f}", "MAKS": "{:.0f}", "RASIO LEWAT SOP": "{:.1%}"}
+
+        dimensi = st.radio(
+            "Kelompokkan",
+            ["Per Tahap", "Per Bulan", "Per Pemroses", "Per Penilai Teknis"],
+            horizontal=True
+        )
+
+        if dimensi == "Per Tahap":
+            st.plotly_chart(
+                self.buat_grafik(self.versi, "bottleneck", None),
+                use_container_width=True, config={"displayModeBar": False}
+            )
+            tabel = agregat["tahap"]
         else:
-            st.warning("⚠️ Tidak ada data dalam rentang tanggal yang dipilih")
+            kunci = {"Per Bulan": "bulan", "Per Pemroses": "PEMROSES", "Per Penilai Teknis": "PENILAI TEKNIS TPT/TPA"}[dimensi]
+            if kunci not in agregat:
+                st.warning(f"⚠️ Kolom '{kunci}' tidak ditemukan dalam data")
+                return
+            tabel = agregat[kunci]
+            pilih_tahap = st.selectbox("Tahapan", ["Semua Tahapan"] + list(self.SOP_TAHAPAN.keys()))
+            if pilih_tahap != "Semua Tahapan":
+                tabel = tabel[tabel["TAHAP"] == pilih_tahap]
+
+        st.dataframe(
+            tabel.style.format(format_kolom),
+            use_container_width=True,
+            hide_index=True
+        )
+
+    @st.fragment
+    def render_beban_kerja(self):
+        """Beban kerja per petugas dari agregat per versi data (fragment)"""
+        agregat = self.beban_kerja()
+
+        col1, col2 = st.columns([1, 1])
+        with col1:
+            kolom = st.selectbox("Jenis petugas", AgregatBebanKerja.KOLOM_PETUGAS, key="beban_petugas")
+        with col2:
+            cari_nama = st.text_input("Filter nama petugas", "", key="beban_nama")
+
+        tabel = agregat.tabel(kolom)
+        if tabel.empty:
+            st.warning(f"⚠️ Kolom '{kolom}' tidak ditemukan dalam data")
+            return
+        if cari_nama.strip():
+            tabel = tabel[tabel["PETUGAS"].str.contains(cari_nama, case=False, regex=False)]
+
+        st.dataframe(
+            tabel.style.format({"RATA-RATA HARI KERJA": "{:.1f}", "RASIO TERLAMBAT": "{:.1%}"}, na_rep="-"),
+            use_container_width=True,
+            hide_index=True
+        )
+
+    @st.fragment
+    def render_simulasi_sop(self):
+        """What-if batas SOP total / per tahapan (fragment)"""
+        col1, col2 = st.columns([1, 1])
+        with col1:
+            sasaran = st.selectbox("Batas yang disimulasikan", ["Total SOP"] + list(self.SOP_TAHAPAN), key="simulasi_sasaran")
+        tahap = None if sasaran == "Total SOP" else sasaran
+        sekarang = self.BATAS_HARI_SOP if tahap is None else self.SOP_TAHAPAN[tahap]
+        with col2:
+            rentang = st.slider(
+                "Rentang batas (hari kerja)", 0, max(60, sekarang * 3),
+                (max(0, sekarang - 5), sekarang + 10), key="simulasi_rentang"
+            )
+
+        mulai = time.perf_counter()
+        hasil = self.simulasi_sop(range(rentang[0], rentang[1] + 1), tahap)
+        lama_ms = (time.perf_counter() - mulai) * 1000
+
+        ringkas = hasil[["TOTAL", "DASAR"]].copy()
+        ringkas["RASIO TERLAMBAT"] = ringkas["TOTAL"] / ringkas["DASAR"].where(ringkas["DASAR"] > 0)
+        st.caption(f"Batas saat ini: {sekarang} hari kerja · {len(hasil)} skenario dihitung dalam {lama_ms:.1f} ms")
+        st.dataframe(
+            ringkas.style.format({"RASIO TERLAMBAT": "{:.1%}"}, na_rep="-"),
+            use_container_width=True
+        )
+        with st.expander("Per bulan registrasi"):
+            st.dataframe(hasil.drop(columns=["TOTAL", "DASAR"]), use_container_width=True)
+
+    @st.fragment
+    def render_kualitas_data(self):
+        """Ringkasan nilai yang gagal divalidasi saat data disiapkan (fragment)"""
+        kualitas = self.ringkasan_kualitas(self.versi, self.df)
+
+        col1, col2 = st.columns([1, 1])
+        with col1:
+            st.dataframe(kualitas["masalah"], use_container_width=True, hide_index=True)
+        with col2:
+            tahap = kualitas["tahap"]
+            st.dataframe(
+                tahap[(tahap["TIDAK TERBACA"] > 0) | (tahap["MUNDUR"] > 0)],
+                use_container_width=True,
+                hide_index=True
+            )
+
+        baris = kualitas["baris"]
+        if baris.empty:
+            st.success("✅ Tidak ada tanggal atau retribusi yang gagal dibaca")
+            return
+
+        pilih = st.multiselect("Filter masalah", list(self.FLAG_KUALITAS)[1:], key="filter_kualitas")
+        if pilih:
+            baris = baris[baris["MASALAH"].apply(lambda m: any(p in m for p in pilih))]
+        st.caption(f"{len(baris)} permohonan perlu diperiksa di sheet")
+        st.dataframe(baris, use_container_width=True, hide_index=True, height=300)
 
     def run(self):
         """Jalankan aplikasi utama"""
-        # Load data
-        self.df = self.load_data()
-        if "STATUS" not in self.df.columns:
-            self.df["STATUS"] = self.df.apply(self.hitung_status, axis=1)
-        else:
-            # Jika ada tapi kosong, regenerasi
-            if self.df["STATUS"].isna().all() or (self.df["STATUS"] == "").all():
-                self.df["STATUS"] = self.df.apply(self.hitung_status, axis=1)
+        # Load data (frame siap pakai dibagi antar sesi per versi data)
+        self.muat_data()
+        self.catat_perubahan()
+        # Tiga pekerjaan latar ini butuh frame penuh; mode partisi melewatinya agar
+        # setiap run tidak memuat semua tahun
+        if self.partisi is None:
+            if baca_konfigurasi("query_engine", "pandas") == "sqlite":
+                self.sql = self.siapkan_sql(self.versi, self.df)
+            if baca_konfigurasi("tulis_status", "tidak") == "ya":
+                self.hasil_tulis = self.tulis_balik_status(self.versi, self.df)
+            if baca_konfigurasi("laporan_siap", "tidak") == "ya" and "TGL REGISTRASI" in self.df.columns:
+                self.jadwalkan_laporan(self.versi, datetime.now().strftime("%Y-%m-%d"), self.df)
+        if baca_konfigurasi("snapshot_html", "tidak") == "ya":
+            self.hasil_snapshot = self.tulis_snapshot(self.versi)
         
         # Render komponen
         self.render_sidebar()
@@ -964,11 +3877,14 @@ class PBGMonitoringApp:
             self.render_monitoring()
         elif current_menu == "Laporan":
             self.render_laporan()
+        elif current_menu == "Analitik":
+            self.render_analitik()
 
 # ================================
 # CSS STYLING (Tetap sama seperti sebelumnya)
 # ================================
-st.markdown("""
+# Dipakai juga oleh snapshot HTML statis (tulis_snapshot)
+CSS_APLIKASI = """
 <style>
 @import url('https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700;800&display=swap');
 
@@ -1276,6 +4192,8 @@ st.markdown("""
     border: none;
 }
 </style>
+"""
+st.markdown(CSS_APLIKASI + """
 <script>
 document.body.style.zoom = "0.75"; 
 document.body.style.transform = "scale(0.75)";
@@ -0,0 +1,59 @@
+"""
+Ukur ambil data dari beberapa worksheet: berurutan vs. paralel.
+
+Sheet palsu dibuat dengan T tab (n baris per tab) dan jeda jaringan tiruan
+per panggilan baca. `ambil_data_sheet` dijalankan dengan fetch_pekerja = 1
+(berurutan) dan fetch_pekerja = T (paralel); hasil keduanya harus sama dan
+waktu paralel mestinya mendekati satu tab, bukan jumlah semua tab.
+
+    python benchmarks/ambil_tab.py                        # 4 tab x 5000 baris, jeda 0,5 s
+    python benchmarks/ambil_tab.py --tab 8 --baris 20000 --latensi 1.5
+    PBG_FETCH_MODE=kolom python benchmarks/ambil_tab.py
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+import warnings
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import sheet_palsu  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tab", type=int, default=4, help="jumlah worksheet")
+    parser.add_argument("--baris", type=int, default=5000, help="baris per worksheet")
+    parser.add_argument("--latensi", type=float, default=0.5, help="jeda tiruan per panggilan baca (detik)")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    warnings.filterwarnings("ignore")
+    judul = [f"Tab {i + 1}" for i in range(args.tab)]
+    os.environ["PBG_WORKSHEET"] = ",".join(judul)
+    from baru import PBGMonitoringApp
+
+    print(f"{args.tab} tab x {args.baris:,} baris, jeda {args.latensi} s per panggilan")
+    print(f"  {'mode':<12}{'pekerja':>9}{'baris':>10}{'waktu (s)':>11}")
+    hasil = {}
+    for mode, pekerja in (("berurutan", 1), ("paralel", args.tab)):
+        client = sheet_palsu.pasang(args.baris, tab=judul, latensi=args.latensi)
+        os.environ["PBG_FETCH_PEKERJA"] = str(pekerja)
+        app = PBGMonitoringApp()
+        # Di luar `streamlit run` tidak ada st.secrets; client palsu langsung dipakai
+        app.klien_sheets = lambda: client
+        mulai = time.perf_counter()
+        hasil[mode] = app.ambil_data_sheet()
+        waktu = time.perf_counter() - mulai
+        print(f"  {mode:<12}{pekerja:>9}{len(hasil[mode]):>10,}{waktu:>11.2f}")
+
+    assert hasil["berurutan"].equals(hasil["paralel"]), "hasil paralel berbeda dengan berurutan"
+    assert len(hasil["paralel"]) == args.tab * args.baris
+
+
+if __name__ == "__main__":
+    main()
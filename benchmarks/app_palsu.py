@@ -0,0 +1,20 @@
+"""
+Titik masuk `streamlit run` untuk uji beban: arahkan gspread ke sheet palsu
+(sekali per proses server) lalu jalankan baru.py seperti biasa.
+
+    PBG_BEBAN_BARIS=10000 streamlit run benchmarks/app_palsu.py
+"""
+import os
+import runpy
+import sys
+
+BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCHMARKS)
+
+import sheet_palsu  # noqa: E402
+
+# Modul tetap di sys.modules antar rerun, jadi sheet palsu hanya dibuat sekali
+if getattr(sheet_palsu, "client_server", None) is None:
+    sheet_palsu.client_server = sheet_palsu.pasang(int(os.environ.get("PBG_BEBAN_BARIS", 10000)))
+
+runpy.run_path(os.path.join(os.path.dirname(BENCHMARKS), "baru.py"), run_name="__main__")
@@ -0,0 +1,254 @@
+"""
+Uji beban sesi bersamaan terhadap server Streamlit lokal.
+
+Server dijalankan (`streamlit run benchmarks/app_palsu.py`) dengan gspread
+diarahkan ke sheet palsu, lalu N sesi disimulasikan lewat websocket
+/_stcore/stream memakai protokol BackMsg/ForwardMsg Streamlit sendiri
+(tanpa browser). Tiap sesi mengulang alur staf: buka Beranda, klik menu
+Pencarian, ketik beberapa kata kunci (rerun fragment), klik Laporan lalu
+Tampilkan, kembali ke Beranda. Latensi satu langkah = kirim rerun sampai
+script_finished. Untuk tiap N dilaporkan throughput, persentil latensi,
+jumlah error dan RSS puncak proses server.
+
+    python benchmarks/beban.py                          # N = 1 2 4 8 16, 20 detik per N
+    python benchmarks/beban.py --sesi 1 4 16 32 --durasi 30 --baris 50000
+    python benchmarks/beban.py --jeda 0 --rinci          # tanpa waktu berpikir, per langkah
+    PBG_CACHE_BACKEND=disk python benchmarks/beban.py    # env PBG_* diteruskan ke server
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def port_bebas() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def rss_mb(pid: int) -> float:
+    """RSS proses dari /proc (Linux); 0 bila tidak tersedia"""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for baris in f:
+                if baris.startswith("VmRSS:"):
+                    return int(baris.split()[1]) / 1024
+    except OSError:
+        pass
+    return 0.0
+
+
+def jalankan_server(port: int, baris: int, direktori: str) -> subprocess.Popen:
+    """streamlit run app_palsu.py dengan kredensial palsu; tunggu sampai /_stcore/health siap"""
+    secrets = os.path.join(direktori, "secrets.toml")
+    with open(secrets, "w", encoding="utf-8") as f:
+        f.write('[google_credentials]\ntype = "service_account"\nproject_id = "palsu"\n')
+    proses = subprocess.Popen(
+        [
+            sys.executable, "-m", "streamlit", "run", os.path.join(ROOT, "benchmarks", "app_palsu.py"),
+            "--server.headless", "true", "--server.port", str(port), "--secrets.files", secrets,
+            "--browser.gatherUsageStats", "false", "--server.fileWatcherType", "none",
+        ],
+        cwd=ROOT, env={**os.environ, "PBG_BEBAN_BARIS": str(baris)},
+        stdout=open(os.path.join(direktori, "server.log"), "wb"), stderr=subprocess.STDOUT,
+    )
+    batas = time.time() + 60
+    while time.time() < batas:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/_stcore/health", timeout=1) as r:
+                if r.status == 200:
+                    return proses
+        except OSError:
+            time.sleep(0.2)
+    proses.kill()
+    raise RuntimeError(f"Server tidak siap, lihat {direktori}/server.log")
+
+
+class Sesi:
+    """Satu sesi browser palsu: simpan state widget, kirim rerun, tunggu script_finished"""
+
+    def __init__(self, ws):
+        self.ws = ws
+        self.widget = {}  # label -> (id, fragment_id)
+        self.nilai = {}   # id -> WidgetState (nilai tetap, bukan trigger)
+        self.error = 0
+
+    async def rerun(self, ubah=None, trigger=None, fragment_id: str = "") -> float:
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+        if ubah:
+            self.nilai.update(ubah)
+        msg = BackMsg()
+        msg.rerun_script.query_string = ""
+        msg.rerun_script.fragment_id = fragment_id
+        for state in list(self.nilai.values()) + ([trigger] if trigger is not None else []):
+            msg.rerun_script.widget_states.widgets.append(state)
+
+        mulai = time.perf_counter()
+        await self.ws.send(msg.SerializeToString())
+        while True:
+            fmsg = ForwardMsg()
+            fmsg.ParseFromString(await self.ws.recv())
+            jenis = fmsg.WhichOneof("type")
+            # Rerun yang dipicu aplikasi (st.rerun) selesai dini lalu berjalan lagi
+            if jenis == "script_finished" and fmsg.script_finished != ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                return time.perf_counter() - mulai
+            if jenis != "delta" or fmsg.delta.WhichOneof("type") != "new_element":
+                continue
+            elemen = fmsg.delta.new_element
+            isi = getattr(elemen, elemen.WhichOneof("type"))
+            if elemen.WhichOneof("type") == "exception":
+                self.error += 1
+            elif getattr(isi, "id", "") and getattr(isi, "label", ""):
+                self.widget[isi.label] = (isi.id, fmsg.delta.fragment_id)
+
+    def cari_widget(self, teks: str):
+        """Widget dengan key = teks (akhiran id, mis. tombol menu), atau label yang memuat teks"""
+        for cocok in (lambda label, wid: wid.endswith(f"-{teks}"), lambda label, wid: teks in label):
+            for label, (wid, fragment) in self.widget.items():
+                if cocok(label, wid):
+                    return wid, fragment
+        return None, ""
+
+    async def klik(self, teks: str) -> float:
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+        wid, fragment = self.cari_widget(teks)
+        if wid is None:
+            raise LookupError(f"Widget '{teks}' tidak ada di halaman")
+        return await self.rerun(trigger=WidgetState(id=wid, trigger_value=True), fragment_id=fragment)
+
+    async def ketik(self, label: str, isi: str) -> float:
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+        wid, fragment = self.cari_widget(label)
+        if wid is None:
+            raise LookupError(f"Widget '{label}' tidak ada di halaman")
+        return await self.rerun(ubah={wid: WidgetState(id=wid, string_value=isi)}, fragment_id=fragment)
+
+
+def alur(nomor: int):
+    """Langkah satu putaran staf: (nama langkah, fungsi async(sesi) -> detik)"""
+    kata = f"PBG-{nomor % 1000:03d}"
+    return [
+        ("menu Pencarian", lambda s: s.klik("Pencarian")),
+        ("cari", lambda s: s.ketik("Masukkan kata kunci", kata[:5])),
+        ("cari", lambda s: s.ketik("Masukkan kata kunci", kata[:7])),
+        ("cari", lambda s: s.ketik("Masukkan kata kunci", kata)),
+        ("menu Laporan", lambda s: s.klik("Laporan")),
+        ("tampilkan", lambda s: s.klik("Tampilkan")),
+        ("menu Beranda", lambda s: s.klik("Beranda")),
+    ]
+
+
+async def satu_sesi(url: str, nomor: int, selesai_pada: float, jeda: float, hasil: list, error: list):
+    import websockets
+
+    rng = random.Random(nomor)
+    async with websockets.connect(url, subprotocols=["streamlit"], max_size=None, open_timeout=60) as ws:
+        sesi = Sesi(ws)
+        hasil.append(("Beranda (buka)", await sesi.rerun()))
+        putaran = 0
+        while time.time() < selesai_pada:
+            for nama, langkah in alur(nomor * 100 + putaran):
+                if time.time() >= selesai_pada:
+                    break
+                if jeda:
+                    await asyncio.sleep(rng.expovariate(1 / jeda))
+                try:
+                    hasil.append((nama, await langkah(sesi)))
+                except LookupError as e:
+                    error.append(str(e))
+                    break
+            putaran += 1
+        error.extend(["exception di halaman"] * sesi.error)
+
+
+async def satu_tingkat(url: str, n: int, durasi: float, jeda: float, pid: int):
+    """Jalankan n sesi bersamaan selama durasi detik; sampel RSS server tiap 0,2 detik"""
+    hasil, error, rss = [], [], []
+    selesai_pada = time.time() + durasi
+
+    async def sampel_rss():
+        while time.time() < selesai_pada + 5:
+            rss.append(rss_mb(pid))
+            await asyncio.sleep(0.2)
+
+    pengukur = asyncio.create_task(sampel_rss())
+    mulai = time.perf_counter()
+    await asyncio.gather(*(satu_sesi(url, i, selesai_pada, jeda, hasil, error) for i in range(n)))
+    lama = time.perf_counter() - mulai
+    pengukur.cancel()
+    return hasil, error, lama, max(rss, default=0.0), rss_mb(pid)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sesi", type=int, nargs="+", default=[1, 2, 4, 8, 16], help="jumlah sesi bersamaan per tingkat")
+    parser.add_argument("--durasi", type=float, default=20, help="detik per tingkat")
+    parser.add_argument("--baris", type=int, default=10_000, help="jumlah baris sheet palsu")
+    parser.add_argument("--jeda", type=float, default=0.5, help="rata-rata waktu berpikir antar langkah (detik, 0 = tanpa jeda)")
+    parser.add_argument("--rinci", action="store_true", help="tampilkan persentil per langkah")
+    parser.add_argument("--json", help="simpan hasil ke file JSON")
+    args = parser.parse_args()
+
+    port = port_bebas()
+    url = f"ws://127.0.0.1:{port}/_stcore/stream"
+    laporan = []
+    with tempfile.TemporaryDirectory() as direktori:
+        server = jalankan_server(port, args.baris, direktori)
+        try:
+            # Pemanasan: fetch + persiapan data pertama tidak dihitung
+            asyncio.run(satu_tingkat(url, 1, 0, 0, server.pid))
+            print(f"{args.baris:,} baris, jeda rata-rata {args.jeda} s, {args.durasi:.0f} s per tingkat")
+            print(f"  {'sesi':>5}{'rerun':>8}{'rerun/s':>9}{'p50 ms':>9}{'p90 ms':>9}{'p99 ms':>9}{'maks ms':>9}{'error':>7}{'RSS puncak MB':>15}")
+            for n in args.sesi:
+                hasil, error, lama, rss_puncak, rss_akhir = asyncio.run(
+                    satu_tingkat(url, n, args.durasi, args.jeda, server.pid)
+                )
+                ms = np.array([d for _, d in hasil]) * 1000
+                p50, p90, p99 = np.percentile(ms, [50, 90, 99]) if len(ms) else (0, 0, 0)
+                print(
+                    f"  {n:>5}{len(ms):>8}{len(ms) / lama:>9.1f}{p50:>9.0f}{p90:>9.0f}{p99:>9.0f}"
+                    f"{ms.max(initial=0):>9.0f}{len(error):>7}{rss_puncak:>15.0f}"
+                )
+                per_langkah = {}
+                for nama, d in hasil:
+                    per_langkah.setdefault(nama, []).append(d * 1000)
+                if args.rinci:
+                    for nama, nilai in per_langkah.items():
+                        q = np.percentile(nilai, [50, 90, 99])
+                        print(f"        {nama:<16}{len(nilai):>6} x  p50 {q[0]:>6.0f}  p90 {q[1]:>6.0f}  p99 {q[2]:>6.0f} ms")
+                for e in dict.fromkeys(error):
+                    print(f"        ! {e}")
+                laporan.append({
+                    "sesi": n, "rerun": len(ms), "rerun_per_detik": len(ms) / lama,
+                    "p50_ms": p50, "p90_ms": p90, "p99_ms": p99, "error": len(error),
+                    "rss_puncak_mb": rss_puncak, "rss_akhir_mb": rss_akhir,
+                    "per_langkah": {k: {"jumlah": len(v), "p50_ms": float(np.percentile(v, 50)),
+                                        "p90_ms": float(np.percentile(v, 90))} for k, v in per_langkah.items()},
+                })
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"baris": args.baris, "jeda": args.jeda, "durasi": args.durasi, "tingkat": laporan}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Periksa anggaran memori cache (cache_batas_mb) selama satu sesi aktif.
+
+Satu sesi AppTest terhadap sheet palsu berpindah menu dan filter (tahun
+Beranda & Monitoring, pilihan Analitik) berulang kali tanpa jeda, jadi
+semua entri selalu "baru dipakai" (di dalam RegistriCache.LINDUNG_DETIK).
+Setelah setiap rerun total cache dibaca dari sidebar (🗄️ Cache).
+
+Gagal (exit code 1) bila total pernah melewati
+RegistriCache.LEWAT_LINDUNG x anggaran, atau ada exception di halaman.
+
+    python benchmarks/cache_batas.py
+    python benchmarks/cache_batas.py --baris 50000 --batas 40 --putaran 5
+"""
+import argparse
+import logging
+import os
+import re
+import sys
+import warnings
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import sheet_palsu  # noqa: E402
+
+
+def total_cache(at) -> float:
+    """Total cache (MB) dari caption sidebar "x MB dari y MB" """
+    for caption in at.sidebar.caption:
+        cocok = re.match(r"([\d.]+) MB dari ", caption.value)
+        if cocok:
+            return float(cocok.group(1))
+    raise RuntimeError("caption cache tidak ada di sidebar")
+
+
+def pilih_semua(widget):
+    """Rerun untuk setiap pilihan selectbox/radio"""
+    for pilihan in widget.options:
+        if hasattr(widget, "select"):
+            widget.select(pilihan).run()
+        else:
+            widget.set_value(pilihan).run()
+
+
+LANGKAH = [
+    ("Beranda", lambda at: pilih_semua(at.selectbox(key="tahun_retribusi"))),
+    ("Monitoring", lambda at: pilih_semua(next(s for s in at.selectbox if "Tahun" in s.label))),
+    ("Laporan", None),
+    ("Analitik", lambda at: [pilih_semua(r) for r in at.radio]),
+    ("Pencarian", lambda at: at.text_input[0].input("PBG-0001").run()),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--baris", type=int, default=20000, help="jumlah baris sheet palsu")
+    parser.add_argument("--batas", type=float, default=20, help="cache_batas_mb")
+    parser.add_argument("--putaran", type=int, default=3, help="berapa kali semua menu dilalui")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    warnings.filterwarnings("ignore")
+    os.chdir(ROOT)
+    os.environ["PBG_CACHE_BATAS_MB"] = str(args.batas)
+    sheet_palsu.pasang(args.baris)
+    from streamlit.testing.v1 import AppTest
+    from baru import RegistriCache
+
+    at = AppTest.from_file(os.path.join(ROOT, "baru.py"), default_timeout=600)
+    at.secrets["google_credentials"] = sheet_palsu.KREDENSIAL_PALSU
+    at.run()
+
+    plafon = args.batas * RegistriCache.LEWAT_LINDUNG
+    gagal, tertinggi = [], 0.0
+    print(f"{args.baris:,} baris, cache_batas_mb={args.batas:g} (plafon {plafon:g} MB)")
+    print(f"  {'putaran':<9}{'menu':<12}{'total (MB)':>11}")
+    for putaran in range(args.putaran):
+        for menu, interaksi in LANGKAH:
+            at.button(key=menu).click().run()
+            if interaksi:
+                interaksi(at)
+            # Sidebar digambar sebelum halaman: satu rerun lagi untuk membaca total setelahnya
+            at.run()
+            total = total_cache(at)
+            tertinggi = max(tertinggi, total)
+            gagal += [f"{putaran} {menu}: {e.value}" for e in at.exception]
+            if total > plafon:
+                gagal.append(f"{putaran} {menu}: {total:.1f} MB > {plafon:g} MB")
+            print(f"  {putaran:<9}{menu:<12}{total:>11.1f}")
+
+    tabel = next(d.value for d in at.sidebar.dataframe if "CACHE" in getattr(d.value, "data", d.value).columns)
+    print()
+    print(getattr(tabel, "data", tabel).to_string(index=False, float_format="{:.2f}".format))
+    print(f"\nTertinggi {tertinggi:.1f} MB")
+
+    if gagal:
+        print("\nGAGAL:")
+        for g in gagal:
+            print(f"  {g}")
+        sys.exit(1)
+    print("Total cache tetap di bawah plafon")
+
+
+if __name__ == "__main__":
+    main()
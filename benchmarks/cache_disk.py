@@ -0,0 +1,218 @@
+"""
+Periksa cache_backend=disk dengan beberapa proses lokal pada satu cache_dir.
+
+Setiap langkah menjalankan proses terpisah (`--anak`) yang memuat data lewat
+`PBGMonitoringApp.muat_data` dari sheet palsu yang sama, lalu melaporkan
+versi, jumlah fetch ke sheet dan ringkasan isi frame.
+
+Serentak: N proses dimulai bersamaan pada cache_dir kosong. Tepat satu
+proses boleh mengambil data dan menulis file versi; semua harus mendapat
+isi frame yang sama. Per proses dilaporkan ukuran frame, memori anonim
+yang bertambah selama muat_data (salinan, termasuk terapkan_sop dan cache
+Streamlit) dan selama CacheDisk.baca saja (baca), serta halaman file
+Arrow yang ter-map (map) dan yang dibagi dengan proses lain (dibagi).
+Proses yang mengambil data juga menyiapkan frame sendiri, jadi
+salinannya besar. Angka memori hanya di Linux (/proc/self/smaps).
+
+Ganti tata letak: cache_dir yang sama dipakai berurutan dengan tata letak
+utuh -> partisi_tahun (dan sebaliknya), masih di dalam TTL. Setiap langkah
+harus berhasil dan isi frame harus sama (versi yang hanya ada dalam tata
+letak lain ditulis ulang, bukan dibaca).
+
+Gagal (exit code 1) bila ada yang berbeda.
+
+    python benchmarks/cache_disk.py
+    python benchmarks/cache_disk.py --baris 50000 --proses 8
+"""
+import argparse
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import sheet_palsu  # noqa: E402
+
+
+def memori(path: str = "") -> dict:
+    """
+    Memori anonim proses (MB, = salinan privat) dan, bila path diisi, Rss &
+    halaman yang dibagi (Shared_Clean + Shared_Dirty) mapping file itu (MB).
+    File yang baru ditulis masih dirty di page cache, jadi keduanya dihitung.
+    """
+    hasil = {"anonim": 0.0, "map": 0.0, "dibagi": 0.0}
+    milik_path = False
+    with open("/proc/self/smaps") as f:
+        for baris in f:
+            kolom = baris.split()
+            if "-" in kolom[0] and not kolom[0].endswith(":"):
+                milik_path = bool(path) and baris.rstrip().endswith(path)
+            elif kolom[0] == "Anonymous:":
+                hasil["anonim"] += int(kolom[1]) / 1024
+            elif milik_path and kolom[0] == "Rss:":
+                hasil["map"] += int(kolom[1]) / 1024
+            elif milik_path and kolom[0] in ("Shared_Clean:", "Shared_Dirty:"):
+                hasil["dibagi"] += int(kolom[1]) / 1024
+    return hasil
+
+
+def anak(baris: int, tunggu: int):
+    """
+    Satu proses: muat data lalu cetak ringkasan sebagai JSON. Dengan tunggu=N
+    proses menunggu sampai N proses selesai memuat sebelum membaca smaps,
+    agar halaman file yang dibagi terlihat sebagai Shared_Clean.
+    """
+    logging.disable(logging.WARNING)
+    warnings.filterwarnings("ignore")
+    import pandas as pd
+    from baru import CacheDisk, PBGMonitoringApp
+
+    client = sheet_palsu.pasang(baris)
+    app = PBGMonitoringApp()
+    # Di luar `streamlit run` tidak ada st.secrets; client palsu langsung dipakai
+    app.klien_sheets = lambda: client
+    import pyarrow.ipc  # noqa: F401  (import malas baru.py tidak ikut terhitung sebagai salinan)
+
+    awal = memori()["anonim"]
+    app.muat_data()
+    df = app.df
+    salinan = memori()["anonim"] - awal
+
+    isi = df.drop(columns=app.KOLOM_FLAG, errors="ignore").astype(str)
+    isi = isi[sorted(isi.columns)].sort_values(["NO. REGISTRASI"], ignore_index=True)
+    hash_isi = int(pd.util.hash_pandas_object(isi, index=False).sum())
+    fetch = client.spreadsheet.sheet1.panggilan.count("get_all_records") if client.spreadsheet else 0
+
+    direktori = os.environ["PBG_CACHE_DIR"]
+    baca = 0.0
+    if os.path.exists(os.path.join(direktori, f"{app.versi_dasar}.arrow")):
+        # Salinan oleh CacheDisk.baca saja (tanpa persiapan lain di muat_data)
+        awal = memori()["anonim"]
+        dibaca = CacheDisk(direktori).baca(app.versi_dasar)
+        baca = memori()["anonim"] - awal
+        del dibaca
+
+    def tunggu_semua(tahap):
+        # Barrier antar proses lewat file penanda di cache_dir
+        open(os.path.join(direktori, f"{tahap}.{os.getpid()}"), "w").close()
+        batas = time.time() + 60
+        while len([f for f in os.listdir(direktori) if f.startswith(f"{tahap}.")]) < tunggu and time.time() < batas:
+            time.sleep(0.05)
+
+    if tunggu:
+        tunggu_semua("siap")
+    peta = memori(os.path.join(direktori, f"{app.versi_dasar}.arrow"))
+    if tunggu:
+        # Tetap hidup sampai semua proses selesai membaca smaps
+        tunggu_semua("selesai")
+    print(json.dumps({
+        "versi": app.versi_dasar,
+        "baris": len(df),
+        "fetch": fetch,
+        "isi": hash_isi,
+        "frame": df.memory_usage(index=False, deep=True).sum() / 1e6,
+        "salinan": salinan,
+        "baca": baca,
+        "map": peta["map"],
+        "dibagi": peta["dibagi"],
+    }))
+
+
+def perintah(baris: int, tunggu: int = 0) -> list:
+    return [sys.executable, os.path.abspath(__file__), "--anak", "--baris", str(baris), "--tunggu", str(tunggu)]
+
+
+def baca_hasil(returncode: int, stdout: str, stderr: str) -> dict:
+    if returncode != 0:
+        return {"gagal": stderr.strip().splitlines()[-1] if stderr.strip() else "exit code"}
+    return json.loads(stdout.strip().splitlines()[-1])
+
+
+def jalankan(baris: int, env: dict) -> dict:
+    hasil = subprocess.run(perintah(baris), env={**os.environ, **env}, capture_output=True, text=True)
+    return baca_hasil(hasil.returncode, hasil.stdout, hasil.stderr)
+
+
+def serentak(baris: int, n: int, env: dict) -> list:
+    """n proses dimulai bersamaan pada cache_dir yang sama"""
+    proses = [
+        subprocess.Popen(perintah(baris, n), env={**os.environ, **env},
+                         stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+        for _ in range(n)
+    ]
+    hasil = []
+    for p in proses:
+        stdout, stderr = p.communicate()
+        hasil.append(baca_hasil(p.returncode, stdout, stderr))
+    return hasil
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--baris", type=int, default=5000, help="jumlah baris sheet palsu")
+    parser.add_argument("--proses", type=int, default=4, help="jumlah proses serentak")
+    parser.add_argument("--anak", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--tunggu", type=int, default=0, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.anak:
+        anak(args.baris, args.tunggu)
+        return
+
+    beda = []
+    with tempfile.TemporaryDirectory() as direktori:
+        env = {"PBG_CACHE_BACKEND": "disk", "PBG_CACHE_DIR": direktori, "PBG_CACHE_TTL": "600",
+               "PBG_LOG_PERUBAHAN": os.path.join(direktori, "perubahan.jsonl")}
+        hasil = serentak(args.baris, args.proses, env)
+        arrow = [f for f in os.listdir(direktori) if f.endswith(".arrow")]
+
+    print(f"{args.baris:,} baris, {args.proses} proses serentak pada satu cache_dir (MB)")
+    print(f"  {'proses':<8}{'fetch':>7}{'frame':>8}{'salinan':>9}{'baca':>7}{'map':>7}{'dibagi':>8}")
+    for i, h in enumerate(hasil):
+        if "gagal" in h:
+            beda.append(f"proses {i}: {h['gagal']}")
+            print(f"  {i:<8}{'gagal':>7}")
+            continue
+        print(f"  {i:<8}{h['fetch']:>7}{h['frame']:>8.1f}{h['salinan']:>9.1f}{h['baca']:>7.1f}{h['map']:>7.1f}{h['dibagi']:>8.1f}")
+    hasil = [h for h in hasil if "gagal" not in h]
+    if sum(h["fetch"] for h in hasil) != 1 or len(arrow) != 1:
+        beda.append(f"{sum(h['fetch'] for h in hasil)} fetch dan {len(arrow)} file versi (harus tepat 1)")
+    if len({(h["versi"], h["baris"], h["isi"]) for h in hasil}) > 1:
+        beda.append("isi frame berbeda antar proses")
+    print()
+
+    print(f"{args.baris:,} baris, ganti tata letak pada satu cache_dir")
+    print(f"  {'tata letak':<26}{'fetch':>7}{'baris':>9}")
+    for urutan in (("utuh", "partisi"), ("partisi", "utuh")):
+        with tempfile.TemporaryDirectory() as direktori:
+            dasar = {"PBG_CACHE_BACKEND": "disk", "PBG_CACHE_DIR": direktori, "PBG_CACHE_TTL": "600",
+                     "PBG_LOG_PERUBAHAN": os.path.join(direktori, "perubahan.jsonl")}
+            hasil = []
+            for tata in urutan:
+                satu = jalankan(args.baris, {**dasar, "PBG_PARTISI_TAHUN": "ya" if tata == "partisi" else "tidak"})
+                label = f"{' -> '.join(urutan)}: {tata}"
+                if "gagal" in satu:
+                    beda.append(f"{label}: {satu['gagal']}")
+                    print(f"  {label:<26}{'gagal':>7}")
+                    continue
+                print(f"  {label:<26}{satu['fetch']:>7}{satu['baris']:>9,}")
+                hasil.append(satu)
+            if len({(h["versi"], h["baris"], h["isi"]) for h in hasil}) > 1:
+                beda.append(f"{' -> '.join(urutan)}: isi frame berbeda antar tata letak")
+
+    if beda:
+        print("\nBERBEDA:")
+        for b in beda:
+            print(f"  {b}")
+        sys.exit(1)
+    print("Semua langkah berhasil dengan isi yang sama")
+
+
+if __name__ == "__main__":
+    main()
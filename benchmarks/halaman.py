@@ -0,0 +1,155 @@
+"""
+Benchmark end-to-end render halaman dengan `streamlit.testing` AppTest.
+
+Aplikasi dijalankan headless terhadap sheet palsu (benchmarks/sheet_palsu.py)
+untuk beberapa ukuran data. Setiap langkah adalah satu rerun penuh script
+seperti yang dialami pengguna: buka menu dari sidebar, ganti tahun, cari,
+klik Tampilkan. Waktu diukur pada putaran tanpa tracemalloc; puncak memori
+Python pada putaran kedua dengan tracemalloc. Cache Streamlit dikosongkan
+di awal setiap putaran, jadi langkah pertama = kunjungan dingin.
+
+Gagal (exit code 1) bila ada exception di halaman atau anggaran di
+benchmarks/anggaran_halaman.json terlampaui.
+
+    python benchmarks/halaman.py                      # ukuran 1000, 10000, 50000
+    python benchmarks/halaman.py --ukuran 2000 --analitik
+    PBG_CACHE_BACKEND=disk python benchmarks/halaman.py --anggaran anggaran_saya.json
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+import tracemalloc
+import warnings
+from datetime import date
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import sheet_palsu  # noqa: E402
+
+
+def buka_menu(nama):
+    def langkah(at):
+        at.button(key=nama).click().run()
+    return langkah
+
+
+def ganti_tahun_retribusi(at):
+    pilihan = at.selectbox(key="tahun_retribusi")
+    pilihan.select(pilihan.options[-1]).run()
+
+
+def cari_kata_kunci(at):
+    at.text_input[0].input("PBG-0001").run()
+
+
+def ganti_tahun_monitoring(at):
+    pilihan = next(s for s in at.selectbox if "Tahun" in s.label)
+    pilihan.select(pilihan.options[-1]).run()
+
+
+def klik_tampilkan(at):
+    at.date_input[0].set_value(date(2024, 1, 1))
+    at.date_input[1].set_value(date(2024, 12, 31))
+    next(b for b in at.button if "Tampilkan" in b.label).click().run()
+
+
+LANGKAH = [
+    ("Beranda (dingin)", lambda at: at.run()),
+    ("Beranda", lambda at: at.run()),
+    ("Beranda: ganti tahun", ganti_tahun_retribusi),
+    ("Pencarian", buka_menu("Pencarian")),
+    ("Pencarian: cari", cari_kata_kunci),
+    ("Monitoring", buka_menu("Monitoring")),
+    ("Monitoring: ganti tahun", ganti_tahun_monitoring),
+    ("Laporan", buka_menu("Laporan")),
+    ("Laporan: tampilkan", klik_tampilkan),
+]
+LANGKAH_ANALITIK = [("Analitik", buka_menu("Analitik"))]
+
+
+def satu_putaran(langkah, ukur_memori: bool):
+    """Jalankan semua langkah pada satu sesi; kembalikan {langkah: nilai} dan daftar error"""
+    import streamlit as st
+    from streamlit.testing.v1 import AppTest
+
+    st.cache_data.clear()
+    st.cache_resource.clear()
+    at = AppTest.from_file(os.path.join(ROOT, "baru.py"), default_timeout=600)
+    at.secrets["google_credentials"] = sheet_palsu.KREDENSIAL_PALSU
+
+    hasil, error = {}, []
+    if ukur_memori:
+        tracemalloc.start()
+    try:
+        for nama, jalankan in langkah:
+            if ukur_memori:
+                tracemalloc.reset_peak()
+                mulai = tracemalloc.get_traced_memory()[0]
+            t0 = time.perf_counter()
+            jalankan(at)
+            waktu = (time.perf_counter() - t0) * 1000
+            hasil[nama] = (tracemalloc.get_traced_memory()[1] - mulai) / 1e6 if ukur_memori else waktu
+            error += [f"{nama}: {e.value}" for e in at.exception]
+    finally:
+        if ukur_memori:
+            tracemalloc.stop()
+    return hasil, error
+
+
+def anggaran_untuk(anggaran: dict, ukuran: int, langkah: str) -> dict:
+    """Anggaran langkah: entri langkah > '*' pada ukuran itu (kunci = ukuran data)"""
+    per_ukuran = anggaran.get(str(ukuran), anggaran.get("*", {}))
+    return {**per_ukuran.get("*", {}), **per_ukuran.get(langkah, {})}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ukuran", type=int, nargs="+", default=[1000, 10000, 50000], help="jumlah baris sheet palsu")
+    parser.add_argument("--analitik", action="store_true", help="ikut ukur halaman Analitik")
+    parser.add_argument(
+        "--anggaran", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "anggaran_halaman.json"),
+        help="file JSON anggaran waktu_ms / memori_mb"
+    )
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    warnings.filterwarnings("ignore")
+    os.chdir(ROOT)
+    with open(args.anggaran, encoding="utf-8") as f:
+        anggaran = json.load(f)
+    langkah = LANGKAH + (LANGKAH_ANALITIK if args.analitik else [])
+
+    gagal = []
+    for ukuran in args.ukuran:
+        sheet_palsu.pasang(ukuran)
+        waktu, error_waktu = satu_putaran(langkah, ukur_memori=False)
+        memori, error_memori = satu_putaran(langkah, ukur_memori=True)
+        gagal += [f"[{ukuran}] {e}" for e in dict.fromkeys(error_waktu + error_memori)]
+
+        print(f"\n{ukuran:,} baris")
+        print(f"  {'langkah':<26}{'waktu (ms)':>12}{'memori (MB)':>13}  anggaran")
+        for nama, _ in langkah:
+            batas = anggaran_untuk(anggaran, ukuran, nama)
+            lewat = []
+            if "waktu_ms" in batas and waktu[nama] > batas["waktu_ms"]:
+                lewat.append(f"waktu > {batas['waktu_ms']} ms")
+            if "memori_mb" in batas and memori[nama] > batas["memori_mb"]:
+                lewat.append(f"memori > {batas['memori_mb']} MB")
+            gagal += [f"[{ukuran}] {nama}: {x}" for x in lewat]
+            tanda = "LEWAT: " + ", ".join(lewat) if lewat else "ok"
+            print(f"  {nama:<26}{waktu[nama]:>12.0f}{memori[nama]:>13.1f}  {tanda}")
+
+    if gagal:
+        print("\nGAGAL:")
+        for g in gagal:
+            print(f"  {g}")
+        sys.exit(1)
+    print("\nSemua langkah dalam anggaran")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Ukur biaya import baru.py dengan `python -X importtime`.
+
+Setiap percobaan menjalankan interpreter baru (proses dingin) lalu
+`import baru`, kemudian meringkas waktu kumulatif modul aplikasi dan
+paket berat yang ikut ter-import.
+
+    python benchmarks/importtime.py            # 5 percobaan, median
+    python benchmarks/importtime.py --ulang 10 --top 15
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PAKET_BERAT = [
+    "streamlit", "pandas", "numpy", "plotly", "plotly.express",
+    "plotly.graph_objects", "gspread", "google.oauth2", "pyarrow",
+]
+
+
+def satu_percobaan() -> dict:
+    """Jalankan `import baru` sekali; kembalikan {modul: (self_us, kumulatif_us)}"""
+    proses = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import baru"],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    hasil = {}
+    for baris in proses.stderr.splitlines():
+        if not baris.startswith("import time:") or "self [us]" in baris:
+            continue
+        self_us, kumulatif_us, modul = baris[len("import time:"):].split("|")
+        hasil[modul.strip()] = (int(self_us), int(kumulatif_us))
+    return hasil
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ulang", type=int, default=5, help="jumlah percobaan (default 5)")
+    parser.add_argument("--top", type=int, default=10, help="jumlah modul self-time terbesar yang ditampilkan")
+    args = parser.parse_args()
+
+    percobaan = [satu_percobaan() for _ in range(args.ulang)]
+
+    def median(modul, idx):
+        nilai = [p[modul][idx] for p in percobaan if modul in p]
+        return statistics.median(nilai) / 1000 if nilai else None
+
+    print(f"Median dari {args.ulang} percobaan (ms, kumulatif)")
+    print(f"  {'baru (total)':<24}{median('baru', 1):>10.1f}")
+    for paket in PAKET_BERAT:
+        nilai = median(paket, 1)
+        print(f"  {paket:<24}{'tidak di-import' if nilai is None else f'{nilai:10.1f}':>10}")
+
+    terakhir = percobaan[-1]
+    print(f"\n{args.top} modul dengan self-time terbesar (percobaan terakhir, ms)")
+    for modul, (self_us, _) in sorted(terakhir.items(), key=lambda x: -x[1][0])[: args.top]:
+        print(f"  {modul:<48}{self_us / 1000:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+"""
+Google Sheets palsu untuk benchmark & harness lokal (tanpa jaringan/kredensial).
+
+`pasang(n)` mengganti `gspread.authorize` dan
+`Credentials.from_service_account_info` sehingga `PBGMonitoringApp.buka_worksheet`
+menerima worksheet sintetis berisi n permohonan dengan format yang sama
+dengan sheet asli (tanggal dd/mm/yyyy, "-" untuk tahap dilewati, retribusi
+"Rp 1.500.000,00", STATUS & TOTAL HARI kosong). batch_update menulis
+langsung ke baris sehingga tulis balik STATUS bisa diperiksa.
+
+`pasang(n, tab=[...], latensi=...)` membuat beberapa tab (n baris per tab,
+nomor registrasi tidak bentrok) dan menambahkan jeda jaringan tiruan pada
+setiap panggilan baca, untuk mengukur ambil paralel antar-tab.
+"""
+import random
+import re
+import time
+from datetime import date, timedelta
+from typing import Dict, List, Optional
+
+TAHAPAN = [
+    "VERIFIKASI BERKAS", "PERBAIKAN BERKAS I", "MELENGKAPI PERBAIKAN BERKAS I",
+    "VERIFIKASI SUBKO/TPT", "VERIFIKASI TPA", "PERBAIKAN BERKAS II", "VERIFIKASI KABID",
+    "PERBAIKAN BERKAS III", "PENILAIAN TEKNIS TPT/TPA", "PERHITUNGAN VOLUME",
+    "TTD GAMBAR KABID", "TTD GAMBAR KADIS", "SCAN GAMBAR + BA TPT/TPA",
+    "KONSULTASI TPA + INPUT RETRIBUSI", "SPPST KADIS",
+]
+KREDENSIAL_PALSU = {"type": "service_account", "project_id": "palsu"}
+
+
+def buat_baris(
+    n: int, seed: int = 1, awal: date = date(2023, 1, 2), rentang_hari: int = 1000, nomor_awal: int = 0
+) -> List[Dict[str, str]]:
+    """n baris permohonan sintetis (deterministik per seed)"""
+    r = random.Random(seed)
+    baris = []
+    for i in range(nomor_awal, nomor_awal + n):
+        tgl_reg = awal + timedelta(days=r.randint(0, rentang_hari))
+        data = {
+            "NO. REGISTRASI": f"PBG-{i:06d}",
+            "NAMA PEMOHON": f"Pemohon {i}",
+            "TGL REGISTRASI": tgl_reg.strftime("%d/%m/%Y"),
+        }
+        # 70% selesai semua tahap, sisanya berhenti di tengah
+        sampai = len(TAHAPAN) if r.random() < 0.7 else r.randint(0, len(TAHAPAN) - 1)
+        tanggal = tgl_reg
+        for j, tahap in enumerate(TAHAPAN):
+            if j >= sampai:
+                data[tahap] = ""
+            elif r.random() < 0.2 and tahap != "SPPST KADIS":
+                data[tahap] = "-"
+            else:
+                tanggal += timedelta(days=r.randint(0, 4))
+                data[tahap] = tanggal.strftime("%d/%m/%Y")
+        data["PEMROSES"] = r.choice(["Andi", "Budi", "Citra", "Dewi"])
+        data["SURVEY SUBKO"] = r.choice(["Eko", "Fajar", "Gita"])
+        data["PENILAI TEKNIS TPT/TPA"] = r.choice(["Hadi", "Indah", "Joko"])
+        data["BESARAN RETRIBUSI (Rp)"] = f"Rp {r.randint(1, 90) * 100000:,}".replace(",", ".") + ",00"
+        data["ALAMAT"] = f"Jl. Contoh No. {i}"
+        data["STATUS"] = ""
+        data["TOTAL HARI"] = ""
+        baris.append(data)
+    return baris
+
+
+def huruf_ke_kolom(huruf: str) -> int:
+    """'A' -> 1, 'AA' -> 27"""
+    nilai = 0
+    for c in huruf:
+        nilai = nilai * 26 + (ord(c) - 64)
+    return nilai
+
+
+def sel_a1(teks: str):
+    """'K2' -> (11, 2), 'K' -> (11, None)"""
+    huruf, angka = re.fullmatch(r"([A-Z]+)(\d*)", teks).groups()
+    return huruf_ke_kolom(huruf), int(angka) if angka else None
+
+
+class WorksheetPalsu:
+    """Subset API gspread.Worksheet yang dipakai aplikasi; mencatat setiap panggilan"""
+
+    def __init__(self, baris: List[Dict[str, str]], title: str = "Sheet1", id: int = 0, latensi: float = 0.0):
+        self.baris = baris
+        self.title = title
+        self.id = id
+        self.latensi = latensi
+        self.spreadsheet_id = "sheet-palsu"
+        self.panggilan: List[str] = []
+        self.tulisan: List[int] = []
+
+    def _grid(self) -> List[List[str]]:
+        header = list(self.baris[0].keys()) if self.baris else []
+        return [header] + [[str(b.get(k, "")) for k in header] for b in self.baris]
+
+    def get_all_records(self):
+        self.panggilan.append("get_all_records")
+        time.sleep(self.latensi)
+        return [dict(b) for b in self.baris]
+
+    def row_values(self, row: int):
+        self.panggilan.append("row_values")
+        grid = self._grid()
+        return grid[row - 1] if row <= len(grid) else []
+
+    def batch_get(self, ranges):
+        """Rentang 'A1:C' / 'A:C'; sel kosong di ujung baris dan baris kosong di akhir dipotong seperti Sheets"""
+        self.panggilan.append("batch_get")
+        time.sleep(self.latensi)
+        grid = self._grid()
+        hasil = []
+        for rentang in ranges:
+            (k1, b1), (k2, _) = map(sel_a1, rentang.split(":"))
+            blok = [row[k1 - 1:k2] for row in grid[(b1 or 1) - 1:]]
+            blok = [row[:max((i + 1 for i, v in enumerate(row) if v != ""), default=0)] for row in blok]
+            while blok and not blok[-1]:
+                blok.pop()
+            hasil.append(blok)
+        return hasil
+
+    def batch_update(self, data, raw=True, **kwargs):
+        """Tulis rentang satu kolom 'K2:K9' ke baris; jumlah sel per panggilan dicatat di self.tulisan"""
+        self.panggilan.append("batch_update")
+        header = list(self.baris[0].keys()) if self.baris else []
+        sel = 0
+        for r in data:
+            (k, b1), _ = map(sel_a1, r["range"].split(":"))
+            for i, (v,) in enumerate(r["values"]):
+                self.baris[b1 - 2 + i][header[k - 1]] = "" if v is None else str(v)
+                sel += 1
+        self.tulisan.append(sel)
+        return {"totalUpdatedCells": sel}
+
+
+class SpreadsheetPalsu:
+    def __init__(self, tab: Dict[str, List[Dict[str, str]]], latensi: float = 0.0):
+        self.tab = {
+            judul: WorksheetPalsu(baris, judul, i, latensi) for i, (judul, baris) in enumerate(tab.items())
+        }
+        self.sheet1 = next(iter(self.tab.values()))
+
+    def worksheet(self, judul: str) -> WorksheetPalsu:
+        import gspread
+
+        if judul not in self.tab:
+            raise gspread.exceptions.WorksheetNotFound(judul)
+        return self.tab[judul]
+
+
+class ClientPalsu:
+    def __init__(self, tab: Dict[str, List[Dict[str, str]]], latensi: float = 0.0):
+        self.tab = tab
+        self.latensi = latensi
+        self.spreadsheet = None
+
+    @property
+    def baris(self) -> List[Dict[str, str]]:
+        return next(iter(self.tab.values()))
+
+    def open_by_key(self, key):
+        # Satu spreadsheet per client agar panggilan worksheet bisa diperiksa
+        if self.spreadsheet is None:
+            self.spreadsheet = SpreadsheetPalsu(self.tab, self.latensi)
+        return self.spreadsheet
+
+
+def pasang(n: int, seed: int = 1, tab: Optional[List[str]] = None, latensi: float = 0.0) -> ClientPalsu:
+    """
+    Arahkan gspread ke sheet palsu berisi n baris (per tab bila `tab` diisi);
+    kembalikan client-nya. `latensi` = detik jeda per panggilan baca.
+    """
+    import gspread
+    from google.oauth2 import service_account
+
+    judul = tab or ["Sheet1"]
+    client = ClientPalsu(
+        {j: buat_baris(n, seed + i, nomor_awal=i * n) for i, j in enumerate(judul)}, latensi
+    )
+    gspread.authorize = lambda creds: client
+    service_account.Credentials.from_service_account_info = staticmethod(lambda info, scopes=None: object())
+    return client
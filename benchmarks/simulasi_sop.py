@@ -0,0 +1,60 @@
+"""
+Ukur waktu simulasi what-if batas SOP (PBGMonitoringApp.hitung_terlambat_grid).
+
+Data sintetis: N baris hari kerja sampai selesai (sebagian NaN = masih
+diproses) tersebar di beberapa bulan registrasi. Seluruh grid batas
+dievaluasi sekaligus, lalu dicek terhadap perbandingan langsung N x batas.
+
+    python benchmarks/simulasi_sop.py                  # 1 juta baris, batas 10..50
+    python benchmarks/simulasi_sop.py --baris 200000 --ulang 20
+"""
+import argparse
+import logging
+import os
+import statistics
+import sys
+import time
+import warnings
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--baris", type=int, default=1_000_000, help="jumlah baris sintetis (default 1 juta)")
+    parser.add_argument("--bulan", type=int, default=60, help="jumlah bulan registrasi (default 60)")
+    parser.add_argument("--ulang", type=int, default=10, help="jumlah percobaan (default 10)")
+    args = parser.parse_args()
+
+    # Import baru di luar `streamlit run` hanya memunculkan peringatan
+    logging.disable(logging.WARNING)
+    warnings.filterwarnings("ignore")
+    from baru import PBGMonitoringApp
+
+    rng = np.random.default_rng(0)
+    hari = rng.gamma(4.0, 5.0, args.baris).round()
+    hari[rng.random(args.baris) < 0.25] = np.nan
+    bulan = rng.integers(0, args.bulan, args.baris)
+    batas = np.arange(10, 51)
+
+    waktu = []
+    for _ in range(args.ulang):
+        mulai = time.perf_counter()
+        grid = PBGMonitoringApp.hitung_terlambat_grid(hari, bulan, args.bulan, batas)
+        waktu.append((time.perf_counter() - mulai) * 1000)
+
+    # Cek kebenaran: perbandingan langsung per batas
+    langsung = np.stack([
+        np.bincount(bulan[hari > b], minlength=args.bulan) for b in batas
+    ])
+    assert np.array_equal(grid, langsung), "hasil grid berbeda dengan perbandingan langsung"
+
+    print(f"{args.baris:,} baris x {len(batas)} batas x {args.bulan} bulan")
+    print(f"  median {statistics.median(waktu):.1f} ms, min {min(waktu):.1f} ms ({args.ulang} percobaan)")
+
+
+if __name__ == "__main__":
+    main()
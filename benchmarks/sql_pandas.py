@@ -0,0 +1,104 @@
+"""
+Periksa query_engine=sqlite memberi hasil yang sama dengan pandas.
+
+Frame dari sheet palsu dimuat sekali, lalu setiap query halaman (pencarian
+per kolom + filter STATUS, rentang tanggal, hitungan bulanan, jumlah STATUS,
+total retribusi) dijalankan lewat pandas dan lewat PenyimpananSQL; hasilnya
+harus identik. Terakhir versi data kedua dimuat ke file SQLite yang sama:
+query versi pertama harus tetap mengembalikan baris versi pertama.
+Gagal (exit code 1) bila ada yang berbeda.
+
+    python benchmarks/sql_pandas.py                     # 5000 baris
+    python benchmarks/sql_pandas.py --baris 50000
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+import warnings
+from datetime import date
+
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import sheet_palsu  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--baris", type=int, default=5000, help="jumlah baris sheet palsu")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    warnings.filterwarnings("ignore")
+    from baru import PBGMonitoringApp, PenyimpananSQL
+
+    client = sheet_palsu.pasang(args.baris)
+    app = PBGMonitoringApp()
+    # Di luar `streamlit run` tidak ada st.secrets; client palsu langsung dipakai
+    app.klien_sheets = lambda: client
+    app.muat_data()
+
+    tahun = ["Semua Tahun"] + [str(t) for t in app.daftar_tahun()]
+    status_semua = ["Tepat waktu", "Diproses", "Terlambat"]
+    kasus = [
+        (f"cari {kolom} '{kata}' {status}", lambda a, k=kolom, w=kata, s=status: a.filter_pencarian(k, w, s).index)
+        for kolom, kata in [("NO. REGISTRASI", "PBG-0001"), ("NO. REGISTRASI", "pbg-00"), ("NAMA PEMOHON", "emohon 12"),
+                            ("PEMROSES", "andi"), ("SURVEY SUBKO", ""), ("PENILAI TEKNIS TPT/TPA", "JOKO")]
+        for status in [status_semua, ["Terlambat"], []]
+    ] + [
+        (f"rentang {a}..{b}", lambda x, a=a, b=b: x.filter_rentang_tanggal(pd.Timestamp(a), pd.Timestamp(b)).index)
+        for a, b in [(date(2023, 1, 1), date(2023, 12, 31)), (date(2024, 2, 29), date(2024, 3, 1)), (date(2030, 1, 1), date(2030, 2, 1))]
+    ] + [
+        (f"bulanan {t}", lambda a, t=t: a.hitung_bulanan(t)) for t in tahun
+    ] + [
+        (f"retribusi {t}", lambda a, t=t: a.total_retribusi(t)) for t in tahun
+    ] + [
+        ("jumlah STATUS", lambda a: a.jumlah_status()),
+    ]
+
+    beda = []
+    with tempfile.TemporaryDirectory() as direktori:
+        path = os.path.join(direktori, "pbg.sqlite")
+        mulai = time.perf_counter()
+        sql = PenyimpananSQL(path, app.versi)
+        sql.muat(app.df, app.cari_kolom_retribusi(app.df))
+        print(f"{args.baris:,} baris, muat SQLite {time.perf_counter() - mulai:.2f} s")
+
+        for nama, query in kasus:
+            app.sql = None
+            harapan = query(app)
+            app.sql = sql
+            hasil = query(app)
+            if isinstance(harapan, pd.DataFrame):
+                sama = harapan.reset_index(drop=True).astype(str).equals(hasil.reset_index(drop=True).astype(str))
+            elif isinstance(harapan, pd.Index):
+                sama = harapan.equals(hasil)
+            else:
+                sama = harapan == hasil
+            if not sama:
+                beda.append(nama)
+        print(f"  {len(kasus) - len(beda)} dari {len(kasus)} query sama")
+
+        # Versi lain di file yang sama tidak boleh menggeser posisi baris versi ini
+        posisi = sql.cari("NO. REGISTRASI", "pbg-00", [])
+        lain = PenyimpananSQL(path, app.versi + "-lain")
+        lain.muat(app.df.iloc[::-1].reset_index(drop=True), None)
+        if not (sql.cari("NO. REGISTRASI", "pbg-00", []) == posisi).all():
+            beda.append("versi kedua mengubah posisi baris versi pertama")
+
+    if beda:
+        print("\nBERBEDA:")
+        for b in beda:
+            print(f"  {b}")
+        sys.exit(1)
+    print("Semua query SQL sama dengan pandas")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Ukur tulis balik STATUS (PenulisStatus) terhadap worksheet palsu.
+
+Putaran pertama menulis STATUS & TOTAL HARI semua baris, putaran kedua
+(isi sudah sama) tidak boleh menulis apa pun, lalu sebagian permohonan
+"Diproses" menjadi "Tepat waktu" dan hanya sel itu yang boleh ditulis
+(sel tulisan aplikasi sendiri tetap diperbarui). Berikutnya sebagian
+STATUS diisi manual dan sebagian dikosongkan: isian manual harus tetap,
+sel kosong terisi; dengan timpa isian manual ikut ditimpa. Yang dilaporkan: jumlah
+request batch_update vs. jumlah sel (= request bila ditulis per sel),
+serta perkiraan lama jeda kuota pada tulis_per_menit.
+
+    python benchmarks/tulis_status.py                     # 20000 baris, 1% berubah
+    python benchmarks/tulis_status.py --baris 100000 --batch 10000
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+import warnings
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import sheet_palsu  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--baris", type=int, default=20_000, help="jumlah baris sheet palsu")
+    parser.add_argument("--berubah", type=float, default=0.01, help="porsi baris yang berubah di putaran ketiga")
+    parser.add_argument("--batch", type=int, default=5000, help="sel maksimum per request (tulis_batch)")
+    parser.add_argument("--per-menit", type=float, default=50, help="kuota request tulis per menit (tulis_per_menit)")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    warnings.filterwarnings("ignore")
+    from baru import PenulisStatus
+
+    ws = sheet_palsu.WorksheetPalsu(sheet_palsu.buat_baris(args.baris))
+    kunci = PenulisStatus.kunci_baris([b["NO. REGISTRASI"] for b in ws.baris])
+    rng = np.random.default_rng(0)
+    nilai = {
+        "STATUS": rng.choice(["Diproses", "Tepat waktu", "Terlambat"], args.baris).astype(object),
+        "TOTAL HARI": rng.integers(5, 60, args.baris).astype(str).astype(object),
+    }
+    with tempfile.TemporaryDirectory() as direktori:
+        # Tanpa jeda supaya yang terukur hanya kerja lokal; jeda kuota dihitung terpisah
+        penulis = PenulisStatus(float("inf"), args.batch, direktori=direktori)
+
+        # Putaran ketiga: sebagian permohonan "Diproses" selesai -> "Tepat waktu"
+        ubah = (rng.random(args.baris) < args.berubah * 3) & (nilai["STATUS"] == "Diproses")
+        putaran = [("semua baris", None), ("tanpa perubahan", None), (f"{ubah.mean():.1%} selesai", ubah)]
+        print(f"{args.baris:,} baris, maks {args.batch:,} sel/request")
+        print(f"  {'putaran':<18}{'sel':>9}{'request':>9}{'waktu (ms)':>12}{'jeda kuota (s)':>16}")
+        for nama, mask in putaran:
+            if mask is not None:
+                nilai["STATUS"] = np.where(mask, "Tepat waktu", nilai["STATUS"]).astype(object)
+            mulai = time.perf_counter()
+            hasil = penulis.tulis(ws, kunci, nilai)
+            waktu = (time.perf_counter() - mulai) * 1000
+            jeda = max(hasil["request"] - 1, 0) * 60 / args.per_menit
+            print(f"  {nama:<18}{hasil['sel']:>9,}{hasil['request']:>9}{waktu:>12.0f}{jeda:>16.1f}")
+
+        salah = sum(b["STATUS"] != s for b, s in zip(ws.baris, nilai["STATUS"]))
+        assert salah == 0, f"{salah} baris STATUS di sheet berbeda dengan hasil hitung (tulisan aplikasi harus diperbarui)"
+
+        # Isian manual petugas dibiarkan; sel kosong diisi; tulisan aplikasi tetap diperbarui
+        manual = rng.random(args.baris) < args.berubah
+        kosong = ~manual & (rng.random(args.baris) < args.berubah)
+        for b, m, k in zip(ws.baris, manual, kosong):
+            b["STATUS"] = "Manual" if m else "" if k else b["STATUS"]
+        nilai["STATUS"] = np.where(nilai["STATUS"] == "Diproses", "Terlambat", nilai["STATUS"]).astype(object)
+        hasil = penulis.tulis(ws, kunci, nilai)
+        print(f"  {'isian manual':<18}{hasil['sel']:>9,}{hasil['request']:>9}")
+        assert all(b["STATUS"] == ("Manual" if m else s) for b, s, m in zip(ws.baris, nilai["STATUS"], manual))
+
+        # tulis_status_timpa: isian manual ikut ditimpa
+        hasil = PenulisStatus(float("inf"), args.batch, timpa=True, direktori=direktori).tulis(ws, kunci, nilai)
+        print(f"  {'timpa':<18}{hasil['sel']:>9,}{hasil['request']:>9}")
+        assert all(b["STATUS"] == s for b, s in zip(ws.baris, nilai["STATUS"]))
+
+if __name__ == "__main__":
+    main()